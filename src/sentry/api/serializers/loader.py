@@ -0,0 +1,125 @@
+"""
+Batched loading of the attribute sources of a serializer.
+
+``get_attrs`` declares every source it needs for the list of items it
+serializes, each loading its values for all the items at once, and then loads
+them together:
+
+>>> loader = AttrsLoader("group")
+>>> loader.add("share_ids", get_share_ids, item_list)
+>>> loader.add_snuba("seen_stats", seen_stats_params, process_seen_stats, "group.seen-stats")
+>>> loader.load()
+>>> loader.results["share_ids"]
+
+Snuba sources are prepared up front and sent together with one
+``bulk_raw_query``, which runs the queries concurrently, each under the referrer
+of its source. Database sources run one after another on the calling thread, as
+connections and transactions are thread local. A source that depends on the
+results of another is added after the first ``load`` and loaded with a second
+one.
+
+Every source is timed in its own span of the current transaction.
+"""
+
+from collections import OrderedDict
+from copy import deepcopy
+
+import sentry_sdk
+
+from sentry.utils import snuba
+
+
+class AttrsLoader:
+    def __init__(self, name):
+        self.name = name
+        self.results = {}
+        self._sources = OrderedDict()
+        self._snuba_sources = OrderedDict()
+
+    def add(self, name, func, *args, **kwargs):
+        """
+        Declare a source whose values are returned by ``func(*args, **kwargs)``.
+        """
+        assert name not in self.results, f"{name} is already loaded"
+        self._sources[name] = (func, args, kwargs)
+
+    def add_snuba(self, name, snuba_params, process, referrer, empty_outside_retention=False):
+        """
+        Declare a source whose values are returned by ``process`` from the
+        response body of the Snuba query ``snuba_params``, sent with
+        ``referrer``.
+
+        With ``empty_outside_retention``, a query outside of the retention or
+        the activity of the queried groups is processed as an empty response
+        instead of raising, like ``snuba.query`` does.
+        """
+        assert name not in self.results, f"{name} is already loaded"
+        self._snuba_sources[name] = (snuba_params, process, referrer, empty_outside_retention)
+
+    def load(self, use_cache=False):
+        """
+        Load all the declared sources that were not loaded yet into
+        ``results``.
+        """
+        snuba_sources, self._snuba_sources = self._snuba_sources, OrderedDict()
+        sources, self._sources = self._sources, OrderedDict()
+
+        if snuba_sources:
+            with sentry_sdk.start_span(
+                op="serialize.get_attrs.snuba",
+                description=f"{self.name}: {', '.join(snuba_sources)}",
+            ):
+                bodies = dict(zip(snuba_sources, self._query_snuba(snuba_sources, use_cache)))
+
+            for name, (_, process, _, _) in snuba_sources.items():
+                with sentry_sdk.start_span(
+                    op="serialize.get_attrs.source", description=f"{self.name}.{name}"
+                ):
+                    self.results[name] = process(bodies[name])
+
+        for name, (func, args, kwargs) in sources.items():
+            with sentry_sdk.start_span(
+                op="serialize.get_attrs.source", description=f"{self.name}.{name}"
+            ):
+                self.results[name] = func(*args, **kwargs)
+
+        return self.results
+
+    def _query_snuba(self, snuba_sources, use_cache):
+        try:
+            return snuba.bulk_raw_query(
+                [
+                    self._get_snuba_params(snuba_params, referrer)
+                    for snuba_params, _, referrer, _ in snuba_sources.values()
+                ],
+                use_cache=use_cache,
+            )
+        except (snuba.QueryOutsideRetentionError, snuba.QueryOutsideGroupActivityError):
+            if len(snuba_sources) == 1:
+                # No need to send the only query again to know which one failed
+                _, _, _, empty_outside_retention = next(iter(snuba_sources.values()))
+                if empty_outside_retention:
+                    return [{"data": []}]
+                raise
+
+        # One of the queries failed the whole batch, find out which
+        bodies = []
+        for snuba_params, _, referrer, empty_outside_retention in snuba_sources.values():
+            try:
+                bodies.extend(
+                    snuba.bulk_raw_query(
+                        [self._get_snuba_params(snuba_params, referrer)], use_cache=use_cache
+                    )
+                )
+            except (snuba.QueryOutsideRetentionError, snuba.QueryOutsideGroupActivityError):
+                if not empty_outside_retention:
+                    raise
+                bodies.append({"data": []})
+        return bodies
+
+    def _get_snuba_params(self, snuba_params, referrer):
+        # Preparing a query modifies its params, keep them intact in case the
+        # queries have to be sent again one by one.
+        snuba_params = deepcopy(snuba_params)
+        snuba_params.referrer = referrer
+        return snuba_params
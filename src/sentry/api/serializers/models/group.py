@@ -16,6 +16,7 @@ from sentry import tagstore, tsdb
 from sentry.app import env
 from sentry.api.event_search import convert_search_filter_to_snuba_query
 from sentry.api.serializers import Serializer, register, serialize
+from sentry.api.serializers.loader import AttrsLoader
 from sentry.api.serializers.models.actor import ActorSerializer
 from sentry.api.fields.actor import Actor
 from sentry.auth.superuser import is_active_superuser
@@ -51,7 +52,7 @@ from sentry.utils import snuba
 from sentry.utils.db import attach_foreignkey
 from sentry.utils.safe import safe_execute
 from sentry.utils.compat import map, zip
-from sentry.utils.snuba import Dataset, raw_query
+from sentry.utils.snuba import Dataset
 from sentry.reprocessing2 import get_progress
 
 SUBSCRIPTION_REASON_MAP = {
@@ -113,6 +114,20 @@ class GroupSerializerBase(Serializer):
         """
         raise NotImplementedError
 
+    def _add_seen_stats_sources(self, loader, item_list, user):
+        """
+        Declares the sources of `_get_seen_stats` with `loader`, see
+        `_get_loaded_seen_stats`.
+        """
+        loader.add("seen_stats", self._get_seen_stats, item_list, user)
+
+    def _get_loaded_seen_stats(self, loader, item_list):
+        """
+        Returns the result of `_get_seen_stats` from the sources declared by
+        `_add_seen_stats_sources`, once loaded.
+        """
+        return loader.results["seen_stats"]
+
     @staticmethod
     def _get_start_from_seen_stats(seen_stats):
         # Try to figure out what is a reasonable time frame to look into stats,
@@ -133,7 +148,7 @@ class GroupSerializerBase(Serializer):
             datetime.now(pytz.utc) - timedelta(days=90),
         )
 
-    def _get_group_snuba_stats(self, item_list, seen_stats):
+    def _add_group_snuba_stats_source(self, loader, item_list, seen_stats):
         start = self._get_start_from_seen_stats(seen_stats)
 
         filter_keys = {}
@@ -141,25 +156,27 @@ class GroupSerializerBase(Serializer):
             filter_keys.setdefault("project_id", []).append(item.project_id)
             filter_keys.setdefault("group_id", []).append(item.id)
 
-        rv = raw_query(
-            dataset=Dataset.Events,
-            selected_columns=[
-                "group_id",
-                [
-                    "argMax",
-                    [["has", ["exception_stacks.mechanism_handled", 0]], "timestamp"],
-                    "unhandled",
+        loader.add_snuba(
+            "snuba_stats",
+            snuba.SnubaQueryParams(
+                dataset=Dataset.Events,
+                selected_columns=[
+                    "group_id",
+                    [
+                        "argMax",
+                        [["has", ["exception_stacks.mechanism_handled", 0]], "timestamp"],
+                        "unhandled",
+                    ],
                 ],
-            ],
-            groupby=["group_id"],
-            filter_keys=filter_keys,
-            start=start,
-            orderby="group_id",
+                groupby=["group_id"],
+                filter_keys=filter_keys,
+                start=start,
+                orderby="group_id",
+            ),
+            lambda rv: {x["group_id"]: {"unhandled": x["unhandled"]} for x in rv["data"]},
             referrer="group.unhandled-flag",
         )
 
-        return {x["group_id"]: {"unhandled": x["unhandled"]} for x in rv["data"]}
-
     def _get_subscriptions(self, item_list, user):
         """
         Returns a mapping of group IDs to a two-tuple of (subscribed: bool,
@@ -233,95 +250,85 @@ class GroupSerializerBase(Serializer):
 
         return results
 
-    def get_attrs(self, item_list, user):
-        from sentry.plugins.base import plugins
-        from sentry.integrations import IntegrationFeatures
-        from sentry.models import PlatformExternalIssue
-
-        GroupMeta.objects.populate_cache(item_list)
-
-        attach_foreignkey(item_list, Group.project)
-
-        if user.is_authenticated() and item_list:
-            bookmarks = set(
-                GroupBookmark.objects.filter(user=user, group__in=item_list).values_list(
-                    "group_id", flat=True
-                )
+    def _get_bookmarks(self, item_list, user):
+        return set(
+            GroupBookmark.objects.filter(user=user, group__in=item_list).values_list(
+                "group_id", flat=True
             )
-            seen_groups = dict(
-                GroupSeen.objects.filter(user=user, group__in=item_list).values_list(
-                    "group_id", "last_seen"
-                )
+        )
+
+    def _get_seen_groups(self, item_list, user):
+        return dict(
+            GroupSeen.objects.filter(user=user, group__in=item_list).values_list(
+                "group_id", "last_seen"
             )
-            subscriptions = self._get_subscriptions(item_list, user)
-        else:
-            bookmarks = set()
-            seen_groups = {}
-            subscriptions = defaultdict(lambda: (False, None))
+        )
 
+    def _get_assignees(self, item_list):
         assignees = {
             a.group_id: a.assigned_actor()
             for a in GroupAssignee.objects.filter(group__in=item_list)
         }
-        resolved_assignees = Actor.resolve_dict(assignees)
+        return Actor.resolve_dict(assignees)
 
-        ignore_items = {g.group_id: g for g in GroupSnooze.objects.filter(group__in=item_list)}
+    def _get_ignore_items(self, item_list):
+        return {g.group_id: g for g in GroupSnooze.objects.filter(group__in=item_list)}
 
+    def _get_resolutions(self, item_list, user):
+        """
+        Returns the release and the commit resolutions of the resolved groups
+        in `item_list`, keyed by group id.
+        """
         resolved_item_list = [i for i in item_list if i.status == GroupStatus.RESOLVED]
-        if resolved_item_list:
-            release_resolutions = {
-                i[0]: i[1:]
-                for i in GroupResolution.objects.filter(group__in=resolved_item_list).values_list(
-                    "group", "type", "release__version", "actor_id"
-                )
-            }
+        if not resolved_item_list:
+            return {}, {}
 
-            # due to our laziness, and django's inability to do a reasonable join here
-            # we end up with two queries
-            commit_results = list(
-                Commit.objects.extra(
-                    select={"group_id": "sentry_grouplink.group_id"},
-                    tables=["sentry_grouplink"],
-                    where=[
-                        "sentry_grouplink.linked_id = sentry_commit.id",
-                        "sentry_grouplink.group_id IN ({})".format(
-                            ", ".join(str(i.id) for i in resolved_item_list)
-                        ),
-                        "sentry_grouplink.linked_type = %s",
-                        "sentry_grouplink.relationship = %s",
-                    ],
-                    params=[int(GroupLink.LinkedType.commit), int(GroupLink.Relationship.resolves)],
-                )
+        release_resolutions = {
+            i[0]: i[1:]
+            for i in GroupResolution.objects.filter(group__in=resolved_item_list).values_list(
+                "group", "type", "release__version", "actor_id"
             )
-            commit_resolutions = {
-                i.group_id: d for i, d in zip(commit_results, serialize(commit_results, user))
-            }
-        else:
-            release_resolutions = {}
-            commit_resolutions = {}
-
-        actor_ids = {r[-1] for r in release_resolutions.values()}
-        actor_ids.update(r.actor_id for r in ignore_items.values())
-        if actor_ids:
-            users = list(User.objects.filter(id__in=actor_ids, is_active=True))
-            actors = {u.id: d for u, d in zip(users, serialize(users, user))}
-        else:
-            actors = {}
+        }
 
-        share_ids = dict(
-            GroupShare.objects.filter(group__in=item_list).values_list("group_id", "uuid")
+        # due to our laziness, and django's inability to do a reasonable join here
+        # we end up with two queries
+        commit_results = list(
+            Commit.objects.extra(
+                select={"group_id": "sentry_grouplink.group_id"},
+                tables=["sentry_grouplink"],
+                where=[
+                    "sentry_grouplink.linked_id = sentry_commit.id",
+                    "sentry_grouplink.group_id IN ({})".format(
+                        ", ".join(str(i.id) for i in resolved_item_list)
+                    ),
+                    "sentry_grouplink.linked_type = %s",
+                    "sentry_grouplink.relationship = %s",
+                ],
+                params=[int(GroupLink.LinkedType.commit), int(GroupLink.Relationship.resolves)],
+            )
         )
+        commit_resolutions = {
+            i.group_id: d for i, d in zip(commit_results, serialize(commit_results, user))
+        }
+        return release_resolutions, commit_resolutions
 
-        result = {}
+    def _get_actors(self, actor_ids, user):
+        if not actor_ids:
+            return {}
 
-        seen_stats = self._get_seen_stats(item_list, user)
+        users = list(User.objects.filter(id__in=actor_ids, is_active=True))
+        return {u.id: d for u, d in zip(users, serialize(users, user))}
+
+    def _get_share_ids(self, item_list):
+        return dict(GroupShare.objects.filter(group__in=item_list).values_list("group_id", "uuid"))
+
+    def _get_annotations(self, item_list):
+        from sentry.integrations import IntegrationFeatures
+        from sentry.models import PlatformExternalIssue
 
         annotations_by_group_id = defaultdict(list)
 
         organization_id_list = list({item.project.organization_id for item in item_list})
-        # if no groups, then we can't proceed but this seems to be a valid use case
-        if not item_list:
-            return {}
         if len(organization_id_list) > 1:
             # this should never happen but if it does we should know about it
             logger.warn(
@@ -362,8 +369,70 @@ class GroupSerializerBase(Serializer):
         )
         merge_list_dictionaries(annotations_by_group_id, local_annotations_by_group_id)
 
-        snuba_stats = self._get_group_snuba_stats(item_list, seen_stats)
+        return annotations_by_group_id
+
+    def get_attrs(self, item_list, user):
+        # if no groups, then we can't proceed but this seems to be a valid use case
+        if not item_list:
+            return {}
+
+        loader = AttrsLoader(type(self).__name__)
+        self._add_attrs_sources(loader, item_list, user)
+        loader.load()
+        self._add_dependent_attrs_sources(loader, item_list, user)
+        loader.load()
+        return self._get_attrs_from_sources(loader, item_list, user)
+
+    def _add_attrs_sources(self, loader, item_list, user):
+        """
+        Declares the sources of `get_attrs` with `loader`.
+        """
+        loader.add("group_meta", GroupMeta.objects.populate_cache, item_list)
+        loader.add("projects", attach_foreignkey, item_list, Group.project)
+
+        if user.is_authenticated():
+            loader.add("bookmarks", self._get_bookmarks, item_list, user)
+            loader.add("seen_groups", self._get_seen_groups, item_list, user)
+            loader.add("subscriptions", self._get_subscriptions, item_list, user)
+
+        loader.add("assignees", self._get_assignees, item_list)
+        loader.add("ignore_items", self._get_ignore_items, item_list)
+        loader.add("resolutions", self._get_resolutions, item_list, user)
+        loader.add("share_ids", self._get_share_ids, item_list)
+        loader.add("annotations", self._get_annotations, item_list)
+        self._add_seen_stats_sources(loader, item_list, user)
+
+    def _add_dependent_attrs_sources(self, loader, item_list, user):
+        """
+        Declares the sources of `get_attrs` which depend on the results of
+        the sources declared by `_add_attrs_sources`.
+        """
+        release_resolutions, _ = loader.results["resolutions"]
+        actor_ids = {r[-1] for r in release_resolutions.values()}
+        actor_ids.update(r.actor_id for r in loader.results["ignore_items"].values())
+        loader.add("actors", self._get_actors, actor_ids, user)
 
+        self._add_group_snuba_stats_source(
+            loader, item_list, self._get_loaded_seen_stats(loader, item_list)
+        )
+
+    def _get_attrs_from_sources(self, loader, item_list, user):
+        from sentry.plugins.base import plugins
+
+        results = loader.results
+        bookmarks = results.get("bookmarks", set())
+        seen_groups = results.get("seen_groups", {})
+        subscriptions = results.get("subscriptions", defaultdict(lambda: (False, None)))
+        resolved_assignees = results["assignees"]
+        ignore_items = results["ignore_items"]
+        release_resolutions, commit_resolutions = results["resolutions"]
+        actors = results["actors"]
+        share_ids = results["share_ids"]
+        annotations_by_group_id = results["annotations"]
+        seen_stats = self._get_loaded_seen_stats(loader, item_list)
+        snuba_stats = results["snuba_stats"]
+
+        result = {}
         for item in item_list:
             active_date = item.active_at or item.first_seen
 
@@ -642,7 +711,10 @@ class GroupStatsMixin:
         if self.stats_period:
             # we need to compute stats at 1d (1h resolution), and 14d or a custom given period
             group_ids = [g.id for g in item_list]
+            return self.query_tsdb(group_ids, self.get_stats_query_params(), **kwargs)
 
+    def get_stats_query_params(self):
+        if self.stats_period:
             if self.stats_period == "auto":
                 total_period = (self.stats_period_end - self.stats_period_start).total_seconds()
                 if total_period < timedelta(hours=24).total_seconds():
@@ -679,7 +751,7 @@ class GroupStatsMixin:
                     "rollup": int(interval.total_seconds()),
                 }
 
-            return self.query_tsdb(group_ids, query_params, **kwargs)
+            return query_params
 
 
 class StreamGroupSerializer(GroupSerializer, GroupStatsMixin):
@@ -718,11 +790,17 @@ class StreamGroupSerializer(GroupSerializer, GroupStatsMixin):
 
         return stats
 
-    def get_attrs(self, item_list, user):
-        attrs = super().get_attrs(item_list, user)
+    def _add_attrs_sources(self, loader, item_list, user):
+        super()._add_attrs_sources(loader, item_list, user)
 
         if self.stats_period:
-            stats = self.get_stats(item_list, user)
+            loader.add("stats", self.get_stats, item_list, user)
+
+    def _get_attrs_from_sources(self, loader, item_list, user):
+        attrs = super()._get_attrs_from_sources(loader, item_list, user)
+
+        if self.stats_period:
+            stats = loader.results["stats"]
             for item in item_list:
                 attrs[item].update({"stats": stats[item.id]})
 
@@ -824,8 +902,8 @@ class GroupSerializerSnuba(GroupSerializerBase):
             else []
         )
 
-    def _execute_seen_stats_query(
-        self, item_list, start=None, end=None, conditions=None, environment_ids=None
+    def _add_seen_stats_query_source(
+        self, loader, name, item_list, start=None, end=None, conditions=None, environment_ids=None
     ):
         project_ids = list({item.project_id for item in item_list})
         group_ids = [item.id for item in item_list]
@@ -838,16 +916,31 @@ class GroupSerializerSnuba(GroupSerializerBase):
         filters = {"project_id": project_ids, "group_id": group_ids}
         if self.environment_ids:
             filters["environment"] = self.environment_ids
-        result = snuba.aliased_query(
-            dataset=snuba.Dataset.Events,
-            start=start,
-            end=end,
-            groupby=["group_id"],
-            conditions=conditions,
-            filter_keys=filters,
-            aggregations=aggregations,
+        loader.add_snuba(
+            name,
+            snuba.aliased_query_params(
+                dataset=snuba.Dataset.Events,
+                start=start,
+                end=end,
+                groupby=["group_id"],
+                conditions=conditions,
+                filter_keys=filters,
+                aggregations=aggregations,
+            ),
+            functools.partial(
+                self._process_seen_stats_query,
+                item_list,
+                start=start,
+                end=end,
+                conditions=conditions,
+                environment_ids=environment_ids,
+            ),
             referrer="serializers.GroupSerializerSnuba._execute_seen_stats_query",
         )
+
+    def _process_seen_stats_query(
+        self, item_list, result, start=None, end=None, conditions=None, environment_ids=None
+    ):
         seen_data = {
             issue["group_id"]: fix_tag_value_data(
                 dict(filter(lambda key: key[0] != "group_id", issue.items()))
@@ -884,15 +977,23 @@ class GroupSerializerSnuba(GroupSerializerBase):
             }
         return attrs
 
-    def _get_seen_stats(self, item_list, user):
-        return self._execute_seen_stats_query(
-            item_list=item_list,
+    def _add_seen_stats_sources(self, loader, item_list, user):
+        self._add_seen_stats_query_source(
+            loader,
+            "seen_stats",
+            item_list,
             start=self.start,
             end=self.end,
             conditions=self.conditions,
             environment_ids=self.environment_ids,
         )
 
+    def _get_seen_stats(self, item_list, user):
+        loader = AttrsLoader(type(self).__name__)
+        self._add_seen_stats_sources(loader, item_list, user)
+        loader.load()
+        return self._get_loaded_seen_stats(loader, item_list)
+
 
 class StreamGroupSerializerSnuba(GroupSerializerSnuba, GroupStatsMixin):
     def __init__(
@@ -929,39 +1030,63 @@ class StreamGroupSerializerSnuba(GroupSerializerSnuba, GroupStatsMixin):
         self.stats_period_end = stats_period_end
         self.matching_event_id = matching_event_id
 
-    def _get_seen_stats(self, item_list, user):
-        if not self._collapse("stats"):
-            partial_execute_seen_stats_query = functools.partial(
-                self._execute_seen_stats_query,
-                item_list=item_list,
-                environment_ids=self.environment_ids,
-                start=self.start,
-                end=self.end,
+    def _add_seen_stats_sources(self, loader, item_list, user):
+        if self._collapse("stats"):
+            return
+
+        add_seen_stats_query_source = functools.partial(
+            self._add_seen_stats_query_source,
+            loader,
+            item_list=item_list,
+            environment_ids=self.environment_ids,
+        )
+        add_seen_stats_query_source("seen_stats", start=self.start, end=self.end)
+        if self.conditions and not self._collapse("filtered"):
+            add_seen_stats_query_source(
+                "seen_stats.filtered", start=self.start, end=self.end, conditions=self.conditions
             )
-            time_range_result = partial_execute_seen_stats_query()
-            filtered_result = (
-                partial_execute_seen_stats_query(conditions=self.conditions)
-                if self.conditions and not self._collapse("filtered")
-                else None
+        if not self._collapse("lifetime") and (self.start or self.end):
+            add_seen_stats_query_source("seen_stats.lifetime")
+
+    def _get_loaded_seen_stats(self, loader, item_list):
+        if self._collapse("stats"):
+            return None
+
+        time_range_result = loader.results["seen_stats"]
+        filtered_result = loader.results.get("seen_stats.filtered")
+        if not self._collapse("lifetime"):
+            lifetime_result = loader.results.get("seen_stats.lifetime", time_range_result)
+        else:
+            lifetime_result = None
+
+        for item in item_list:
+            time_range_result[item].update(
+                {
+                    "filtered": filtered_result.get(item) if filtered_result else None,
+                    "lifetime": lifetime_result.get(item) if lifetime_result else None,
+                }
             )
-            if not self._collapse("lifetime"):
-                lifetime_result = (
-                    partial_execute_seen_stats_query(start=None, end=None)
-                    if self.start or self.end
-                    else time_range_result
-                )
-            else:
-                lifetime_result = None
+        return time_range_result
 
-            for item in item_list:
-                time_range_result[item].update(
-                    {
-                        "filtered": filtered_result.get(item) if filtered_result else None,
-                        "lifetime": lifetime_result.get(item) if lifetime_result else None,
-                    }
+    def _add_stats_source(self, loader, name, item_list, query_params, conditions=None):
+        data_query = snuba_tsdb.prepare_range_query(
+            snuba_tsdb.models.group,
+            [item.id for item in item_list],
+            environment_ids=self.environment_ids,
+            conditions=conditions,
+            **query_params,
+        )
+        loader.add_snuba(
+            name,
+            snuba_tsdb.get_data_query_params(data_query),
+            lambda body: snuba_tsdb.convert_range_result(
+                snuba_tsdb.process_data_result(
+                    data_query, snuba_tsdb.nest_data_body(data_query, body)
                 )
-            return time_range_result
-        return None
+            ),
+            referrer=f"tsdb-modelid:{snuba_tsdb.models.group.value}",
+            empty_outside_retention=True,
+        )
 
     def query_tsdb(self, group_ids, query_params, conditions=None, environment_ids=None, **kwargs):
         return snuba_tsdb.get_range(
@@ -972,38 +1097,55 @@ class StreamGroupSerializerSnuba(GroupSerializerSnuba, GroupStatsMixin):
             **query_params,
         )
 
-    def get_attrs(self, item_list, user):
+    def _add_attrs_sources(self, loader, item_list, user):
         if not self._collapse("base"):
-            attrs = super().get_attrs(item_list, user)
+            super()._add_attrs_sources(loader, item_list, user)
         else:
-            seen_stats = self._get_seen_stats(item_list, user)
+            self._add_seen_stats_sources(loader, item_list, user)
+
+        if self.stats_period and not self._collapse("stats"):
+            query_params = self.get_stats_query_params()
+            self._add_stats_source(loader, "stats", item_list, query_params)
+            if self.conditions and not self._collapse("filtered"):
+                self._add_stats_source(
+                    loader, "filtered_stats", item_list, query_params, conditions=self.conditions
+                )
+
+        if self._expand("inbox"):
+            loader.add("inbox", get_inbox_details, item_list)
+
+        if self._expand("owners"):
+            loader.add("owners", get_owner_details, item_list)
+
+    def _add_dependent_attrs_sources(self, loader, item_list, user):
+        if not self._collapse("base"):
+            super()._add_dependent_attrs_sources(loader, item_list, user)
+
+    def _get_attrs_from_sources(self, loader, item_list, user):
+        if not self._collapse("base"):
+            attrs = super()._get_attrs_from_sources(loader, item_list, user)
+        else:
+            seen_stats = self._get_loaded_seen_stats(loader, item_list)
             if seen_stats:
                 attrs = {item: seen_stats.get(item, {}) for item in item_list}
             else:
                 attrs = {item: {} for item in item_list}
 
         if self.stats_period and not self._collapse("stats"):
-            partial_get_stats = functools.partial(
-                self.get_stats, item_list=item_list, user=user, environment_ids=self.environment_ids
-            )
-            stats = partial_get_stats()
-            filtered_stats = (
-                partial_get_stats(conditions=self.conditions)
-                if self.conditions and not self._collapse("filtered")
-                else None
-            )
+            stats = loader.results["stats"]
+            filtered_stats = loader.results.get("filtered_stats")
             for item in item_list:
                 if filtered_stats:
                     attrs[item].update({"filtered_stats": filtered_stats[item.id]})
                 attrs[item].update({"stats": stats[item.id]})
 
         if self._expand("inbox"):
-            inbox_stats = get_inbox_details(item_list)
+            inbox_stats = loader.results["inbox"]
             for item in item_list:
                 attrs[item].update({"inbox": inbox_stats.get(item.id)})
 
         if self._expand("owners"):
-            owner_details = get_owner_details(item_list)
+            owner_details = loader.results["owners"]
             for item in item_list:
                 attrs[item].update({"owners": owner_details.get(item.id)})
 
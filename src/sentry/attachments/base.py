@@ -101,6 +101,22 @@ class BaseAttachmentCache:
         self.inner = inner
 
     def set(self, key, attachments, timeout=None):
+        meta = self._set_data_and_get_meta(key, attachments, timeout=timeout)
+        self.inner.set(ATTACHMENT_META_KEY.format(key=key), meta, timeout, raw=False)
+
+    def set_many(self, attachments_by_key, timeout=None):
+        """
+        Like ``set``, but for ``{key: attachments}`` of multiple events. The
+        attachment metadata of all events is written in one batch.
+        """
+        meta_items = {}
+        for key, attachments in attachments_by_key.items():
+            meta = self._set_data_and_get_meta(key, attachments, timeout=timeout)
+            meta_items[ATTACHMENT_META_KEY.format(key=key)] = meta
+
+        self.inner.set_many(meta_items, timeout, raw=False)
+
+    def _set_data_and_get_meta(self, key, attachments, timeout=None):
         for id, attachment in enumerate(attachments):
             if attachment.chunks is not None:
                 continue
@@ -127,7 +143,7 @@ class BaseAttachmentCache:
             attachment._cache = self
             meta.append(attachment.meta())
 
-        self.inner.set(ATTACHMENT_META_KEY.format(key=key), meta, timeout, raw=False)
+        return meta
 
     def set_chunk(self, key, id, chunk_index, chunk_data, timeout=None):
         key = ATTACHMENT_DATA_CHUNK_KEY.format(key=key, id=id, chunk_index=chunk_index)
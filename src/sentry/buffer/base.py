@@ -1,6 +1,8 @@
 import logging
+from collections import defaultdict
 
-from django.db.models import F
+from django.db import router
+from django.db.models import Case, F, Value, When
 
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
@@ -82,3 +84,98 @@ class Buffer(Service, metaclass=BufferMount):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, items):
+        """
+        Process many ``(model, columns, filters, extra, signal_only)`` items.
+
+        Items of the same model that filter on nothing but the primary key are
+        applied with a single UPDATE per model. Everything else, as well as
+        rows that turn out not to exist yet, goes through ``process``.
+        """
+        by_model = defaultdict(list)
+        for item in items:
+            by_model[item[0]].append(item)
+
+        for model, model_items in by_model.items():
+            self._process_model_batch(model, model_items)
+
+    def _process_model_batch(self, model, items):
+        from sentry.models import Group
+        from sentry.event_manager import ScoreClause
+
+        pk_names = ("pk", model._meta.pk.name, model._meta.pk.attname)
+        updates = {}
+        remaining = []
+
+        for item in items:
+            _, columns, filters, extra, signal_only = item
+            if signal_only or len(filters) != 1:
+                remaining.append(item)
+                continue
+
+            ((filter_name, pk),) = filters.items()
+            if filter_name not in pk_names or pk in updates:
+                remaining.append(item)
+                continue
+
+            update_kwargs = {c: F(c) + v for c, v in columns.items()}
+            if extra:
+                update_kwargs.update(extra)
+
+            # HACK(dcramer): see ``process``
+            if model is Group and "last_seen" in update_kwargs and "times_seen" in update_kwargs:
+                update_kwargs["score"] = ScoreClause(
+                    group=None,
+                    times_seen=update_kwargs["times_seen"],
+                    last_seen=update_kwargs["last_seen"],
+                )
+
+            updates[pk] = (item, update_kwargs)
+
+        if len(updates) == 1:
+            remaining.extend(item for item, _ in updates.values())
+        elif updates:
+            # Build one ``CASE WHEN pk = ... THEN ... ELSE column END`` per
+            # column, so that every row gets its own values in one statement.
+            whens = defaultdict(list)
+            for pk, (_, update_kwargs) in updates.items():
+                for column, value in update_kwargs.items():
+                    field = model._meta.get_field(column)
+                    if not hasattr(value, "resolve_expression"):
+                        value = Value(value, output_field=field)
+                    whens[column].append(When(pk=pk, then=value))
+
+            update_kwargs = {
+                column: Case(
+                    *column_whens,
+                    default=F(column),
+                    output_field=model._meta.get_field(column),
+                )
+                for column, column_whens in whens.items()
+            }
+
+            objects = model.objects.using(router.db_for_write(model))
+            affected = objects.filter(pk__in=list(updates)).update(**update_kwargs)
+
+            existing = set(updates)
+            if affected != len(updates):
+                existing = set(objects.filter(pk__in=list(updates)).values_list("pk", flat=True))
+
+            for pk, (item, _) in updates.items():
+                if pk not in existing:
+                    remaining.append(item)
+                    continue
+
+                _, columns, filters, extra, _ = item
+                buffer_incr_complete.send_robust(
+                    model=model,
+                    columns=columns,
+                    filters=filters,
+                    extra=extra,
+                    created=False,
+                    sender=model,
+                )
+
+        for model, columns, filters, extra, signal_only in remaining:
+            self.process(model, columns, filters, extra, signal_only)
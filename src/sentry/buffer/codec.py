@@ -0,0 +1,91 @@
+"""
+Compact encoding for the filter and extra values stored in buffer hashes.
+
+Values are msgpack documents prefixed with a version byte. Types msgpack
+cannot represent natively are stored as extension types:
+
+- timezone aware datetimes as UTC microseconds,
+- model instances as a reference of ``(app_label.ModelName, pk)``, decoded
+  as an unsaved instance with that pk if the row was deleted since,
+- ``ScoreClause`` without its group. The clause is recomputed from
+  ``times_seen`` and ``last_seen`` when the buffer is processed, so only
+  its presence needs to survive,
+- anything else as a pickle, so that callers are never rejected.
+
+Payloads written before this codec existed are pickles, which never start
+with the version byte, and ``decode`` keeps reading them.
+"""
+
+import pickle
+from datetime import datetime, timedelta
+
+import msgpack
+from django.apps import apps
+from django.db import models
+from django.utils import timezone
+
+VERSION_1 = b"\x01"
+
+EXT_DATETIME = 1
+EXT_MODEL = 2
+EXT_SCORE_CLAUSE = 3
+EXT_PICKLE = 4
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _default(value):
+    from sentry.event_manager import ScoreClause
+
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        delta = value - EPOCH
+        micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+        return msgpack.ExtType(EXT_DATETIME, msgpack.packb(micros))
+    if isinstance(value, models.Model) and value.pk is not None:
+        return msgpack.ExtType(
+            EXT_MODEL, msgpack.packb([value._meta.label, value.pk], default=_default)
+        )
+    if isinstance(value, ScoreClause):
+        return msgpack.ExtType(EXT_SCORE_CLAUSE, b"")
+    return msgpack.ExtType(EXT_PICKLE, pickle.dumps(value))
+
+
+def _ext_hook(code, data):
+    from sentry.event_manager import ScoreClause
+
+    if code == EXT_DATETIME:
+        return EPOCH + timedelta(microseconds=msgpack.unpackb(data))
+    if code == EXT_MODEL:
+        label, pk = msgpack.unpackb(data, ext_hook=_ext_hook, raw=False)
+        model = apps.get_model(label)
+        manager = model.objects
+        try:
+            if hasattr(manager, "get_from_cache"):
+                return manager.get_from_cache(pk=pk)
+            return manager.get(pk=pk)
+        except model.DoesNotExist:
+            # The instance was deleted since it was buffered. A pickle would
+            # have kept the stale instance, which only its pk is used of.
+            return model(pk=pk)
+    if code == EXT_SCORE_CLAUSE:
+        return ScoreClause()
+    if code == EXT_PICKLE:
+        return pickle.loads(data)
+    return msgpack.ExtType(code, data)
+
+
+def encode(value):
+    """
+    Encode a filter mapping or extra value for storage in the buffer.
+    """
+    return VERSION_1 + msgpack.packb(value, default=_default, use_bin_type=True)
+
+
+def decode(payload):
+    """
+    Decode a value written by ``encode`` or a legacy pickle.
+    """
+    if payload[:1] == VERSION_1:
+        return msgpack.unpackb(payload[1:], ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+    return pickle.loads(payload)
@@ -1,13 +1,17 @@
+import atexit
+import os
 import pickle
 import threading
+from collections import defaultdict
 from time import time
 
+from celery.signals import worker_process_shutdown
 from datetime import datetime
 from django.db import models
 from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
 
-from sentry.buffer import Buffer
+from sentry.buffer import Buffer, codec
 from sentry.exceptions import InvalidConfiguration
 from sentry.tasks.process_buffer import process_incr, process_pending
 from sentry.utils import json, metrics
@@ -47,16 +51,196 @@ class PendingBuffer:
         return rv
 
 
+class LocalIncrBuffer:
+    """
+    In-process front buffer that merges increments for the same buffer key.
+
+    Pending increments are handed to ``flush_func`` as a single
+    ``{key: (model, columns, filters, extra, signal_only)}`` mapping once
+    ``flush_size`` distinct keys are pending or ``flush_interval`` seconds
+    have passed. Merging follows the semantics of the Redis hash the values
+    end up in: counters are summed, extra values are last write wins and
+    ``signal_only`` sticks once set.
+
+    ``flush_func`` returns the keys it could not write, which are merged back
+    into the pending increments and written with the next flush.
+
+    Pending increments are also flushed when the process exits, and when a
+    celery prefork child shuts down, as those exit without running ``atexit``
+    handlers. A process killed without a chance to clean up loses the
+    increments of up to ``flush_interval`` seconds and ``flush_size`` keys.
+    """
+
+    def __init__(self, flush_func, flush_interval, flush_size, logger):
+        assert flush_interval > 0
+        assert flush_size > 0
+        self.flush_func = flush_func
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.last_flush = time()
+        self._pid = None
+        self._closed = threading.Event()
+        self._thread = None
+        worker_process_shutdown.connect(self._on_worker_process_shutdown)
+
+    def add(self, key, model, columns, filters, extra=None, signal_only=None):
+        self._ensure_flusher()
+
+        with self.lock:
+            item = self.pending.get(key)
+            if item is None:
+                item = self.pending[key] = (model, defaultdict(int), filters, {}, [None])
+
+            _, pending_columns, _, pending_extra, pending_signal_only = item
+            for column, amount in columns.items():
+                pending_columns[column] += amount
+            if extra:
+                pending_extra.update(extra)
+            if signal_only is True:
+                pending_signal_only[0] = True
+
+            should_flush = (
+                len(self.pending) >= self.flush_size
+                or time() - self.last_flush >= self.flush_interval
+            )
+
+        if should_flush:
+            try:
+                self.flush()
+            except Exception:
+                # The increments are pending again and retried with the next
+                # flush.
+                self.logger.exception("buffer.local.flush-failed")
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time()
+
+        if not pending:
+            return
+
+        metrics.timing("buffer.local.flush-size", len(pending))
+        try:
+            failed = self.flush_func(
+                {
+                    key: (model, dict(columns), filters, extra or None, signal_only[0])
+                    for key, (model, columns, filters, extra, signal_only) in pending.items()
+                }
+            )
+        except Exception:
+            self._restore(pending)
+            raise
+
+        if failed:
+            self._restore({key: pending[key] for key in failed})
+
+    def _restore(self, pending):
+        # Put back increments that could not be written, under the ones that
+        # were added while they were being written.
+        with self.lock:
+            for key, item in pending.items():
+                current = self.pending.get(key)
+                if current is None:
+                    self.pending[key] = item
+                    continue
+
+                _, columns, _, extra, signal_only = item
+                _, current_columns, _, current_extra, current_signal_only = current
+                for column, amount in columns.items():
+                    current_columns[column] += amount
+                for name, value in extra.items():
+                    current_extra.setdefault(name, value)
+                if signal_only[0] is True:
+                    current_signal_only[0] = True
+
+    def close(self):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            atexit.unregister(self.close)
+        self.flush()
+
+    def _on_worker_process_shutdown(self, **kwargs):
+        # Only the process that started the flusher has increments of its own.
+        if self._pid == os.getpid():
+            self.close()
+
+    def _ensure_flusher(self):
+        # The flusher thread does not survive a fork (e.g. celery prefork
+        # workers), so start it lazily in every process that buffers.
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with _local_buffers_lock:
+            if self._pid == pid:
+                return
+            # Anything pending was inherited from the parent, which flushes it.
+            self.lock = threading.Lock()
+            self.pending = {}
+            self._closed = threading.Event()
+            self._pid = pid
+
+            self._thread = threading.Thread(target=self._run, name="sentry.buffer.local-flush")
+            self._thread.daemon = True
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                self.logger.exception("buffer.local.flush-failed")
+
+
 class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = "b:p"
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    def __init__(
+        self,
+        pending_partitions=1,
+        incr_batch_size=2,
+        local_flush_interval=None,
+        local_flush_size=1000,
+        write_pickle=True,
+        bulk_process=False,
+        **options,
+    ):
+        """
+        If ``local_flush_interval`` (in seconds) is set, increments are first
+        merged in process and written to Redis in one pipeline per host when
+        either the interval passed or ``local_flush_size`` distinct keys are
+        pending.
+
+        Filters and extra values are written as pickles until
+        ``write_pickle`` is turned off, after which they are written with
+        ``sentry.buffer.codec``. Only turn it off once every worker that
+        processes the buffer can read the codec.
+
+        With ``bulk_process`` every ``process_incr`` batch (see
+        ``incr_batch_size``) is read from Redis and written to the database
+        in bulk rather than key by key.
+        """
         self.cluster, options = get_cluster_from_options("SENTRY_BUFFER_OPTIONS", options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
+        self.write_pickle = write_pickle
+        self.bulk_process = bulk_process
+
+        self.local_buffer = None
+        if local_flush_interval is not None:
+            self.local_buffer = LocalIncrBuffer(
+                self._flush_local_buffer, local_flush_interval, local_flush_size, self.logger
+            )
 
     def validate(self):
         try:
@@ -153,20 +337,59 @@ class RedisBuffer(Buffer):
         - Add hashmap key to pending flushes
         """
 
-        # TODO(dcramer): longer term we'd rather not have to serialize values
-        # here (unless it's to JSON)
         key = self._make_key(model, filters)
-        pending_key = self._make_pending_key_from_key(key)
+
+        metrics.incr(
+            "buffer.incr",
+            skip_internal=True,
+            tags={"module": model.__module__, "model": model.__name__},
+        )
+
+        if self.local_buffer is not None:
+            self.local_buffer.add(key, model, columns, filters, extra, signal_only)
+            return
+
         # We can't use conn.map() due to wanting to support multiple pending
         # keys (one per Redis partition)
         conn = self.cluster.get_local_client_for_key(key)
 
         pipe = conn.pipeline()
+        self._incr_pipeline(pipe, key, model, columns, filters, extra, signal_only)
+        pipe.execute()
+
+    def _flush_local_buffer(self, pending):
+        """
+        Write merged increments to Redis with one pipeline per host, and
+        return the keys of the hosts that could not be written to.
+        """
+        router = self.cluster.get_router()
+        keys_by_host = defaultdict(list)
+        for key in pending:
+            keys_by_host[router.get_host_for_key(key)].append(key)
+
+        failed = []
+        for host_id, keys in keys_by_host.items():
+            try:
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in keys:
+                    model, columns, filters, extra, signal_only = pending[key]
+                    self._incr_pipeline(pipe, key, model, columns, filters, extra, signal_only)
+                pipe.execute()
+            except Exception:
+                self.logger.exception("buffer.local.flush-host-failed", extra={"host": host_id})
+                failed.extend(keys)
+
+        return failed
+
+    def _incr_pipeline(self, pipe, key, model, columns, filters, extra=None, signal_only=None):
+        # TODO(dcramer): longer term we'd rather not have to serialize values
+        # here (unless it's to JSON)
+        pending_key = self._make_pending_key_from_key(key)
+
+        encode = pickle.dumps if self.write_pickle else codec.encode
+
         pipe.hsetnx(key, "m", f"{model.__module__}.{model.__name__}")
-        # TODO(dcramer): once this goes live in production, we can kill the pickle path
-        # (this is to ensure a zero downtime deploy where we can transition event processing)
-        pipe.hsetnx(key, "f", pickle.dumps(filters))
-        # pipe.hsetnx(key, 'f', json.dumps(self._dump_values(filters)))
+        pipe.hsetnx(key, "f", encode(filters))
         for column, amount in columns.items():
             pipe.hincrby(key, "i+" + column, amount)
 
@@ -175,23 +398,13 @@ class RedisBuffer(Buffer):
             # hook here
             # e.g. "update score if last_seen or times_seen is changed"
             for column, value in extra.items():
-                # TODO(dcramer): once this goes live in production, we can kill the pickle path
-                # (this is to ensure a zero downtime deploy where we can transition event processing)
-                pipe.hset(key, "e+" + column, pickle.dumps(value))
-                # pipe.hset(key, 'e+' + column, json.dumps(self._dump_value(value)))
+                pipe.hset(key, "e+" + column, encode(value))
 
         if signal_only is True:
             pipe.hset(key, "s", "1")
 
         pipe.expire(key, self.key_expire)
         pipe.zadd(pending_key, {key: time()})
-        pipe.execute()
-
-        metrics.incr(
-            "buffer.incr",
-            skip_internal=True,
-            tags={"module": model.__module__, "model": model.__name__},
-        )
 
     def process_pending(self, partition=None):
         if partition is None and self.pending_partitions > 1:
@@ -243,6 +456,10 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
+        if self.bulk_process and len(batch_keys) > 1:
+            self._process_bulk_incr(batch_keys)
+            return
+
         for key in batch_keys:
             self._process_single_incr(key)
 
@@ -266,42 +483,97 @@ class RedisBuffer(Buffer):
             pipe.delete(key)
             values = pipe.execute()[0]
 
-            # XXX(python3): In python2 this isn't as important since redis will
-            # return string tyes (be it, byte strings), but in py3 we get bytes
-            # back, and really we just want to deal with keys as strings.
-            values = {force_text(k): v for k, v in values.items()}
-
-            if not values:
-                metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
-                self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
-                return
-
-            # XXX(py3): Note that ``import_string`` explicitly wants a str in
-            # python2, so we'll decode (for python3) and then translate back to
-            # a byte string (in python2) for import_string.
-            model = import_string(str(values.pop("m").decode("utf-8")))  # NOQA
+            item = self._load_item(key, values)
+            if item is not None:
+                super().process(*item)
+        finally:
+            client.delete(lock_key)
 
-            if values["f"].startswith(b"{"):
-                filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
+    def _process_bulk_incr(self, keys):
+        """
+        Like ``_process_single_incr`` for many keys at once: locks are taken
+        and released with one round trip per host, and every host's hashes
+        are read and deleted in one transaction.
+        """
+        lock_keys = {key: self._make_lock_key(key) for key in keys}
+        with self.cluster.map() as conn:
+            lock_results = {
+                key: conn.set(lock_key, "1", nx=True, ex=10) for key, lock_key in lock_keys.items()
+            }
+
+        locked = []
+        for key, result in lock_results.items():
+            if result.value:
+                locked.append(key)
             else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop("f"))
-
-            incr_values = {}
-            extra_values = {}
-            signal_only = None
-            for k, v in values.items():
-                if k.startswith("i+"):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith("e+"):
-                    if v.startswith(b"["):
-                        extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-                elif k == "s":
-                    signal_only = bool(int(v))  # Should be 1 if set
-
-            super().process(model, incr_values, filters, extra_values, signal_only)
+                metrics.incr("buffer.revoked", tags={"reason": "locked"}, skip_internal=False)
+                self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
+
+        try:
+            router = self.cluster.get_router()
+            keys_by_host = defaultdict(list)
+            for key in locked:
+                keys_by_host[router.get_host_for_key(key)].append(key)
+
+            items = []
+            for host_id, host_keys in keys_by_host.items():
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in host_keys:
+                    pipe.hgetall(key)
+                    pipe.zrem(self._make_pending_key_from_key(key), key)
+                    pipe.delete(key)
+                results = pipe.execute()
+
+                for key, values in zip(host_keys, results[::3]):
+                    item = self._load_item(key, values)
+                    if item is not None:
+                        items.append(item)
+
+            metrics.timing("buffer.bulk-process.keys", len(items))
+            super().process_batch(items)
         finally:
-            client.delete(lock_key)
+            if locked:
+                with self.cluster.map() as conn:
+                    for key in locked:
+                        conn.delete(lock_keys[key])
+
+    def _load_item(self, key, values):
+        """
+        Turns the contents of a buffer hash into the arguments of
+        ``Buffer.process``, or ``None`` if the hash was already flushed.
+        """
+        # XXX(python3): In python2 this isn't as important since redis will
+        # return string tyes (be it, byte strings), but in py3 we get bytes
+        # back, and really we just want to deal with keys as strings.
+        values = {force_text(k): v for k, v in values.items()}
+
+        if not values:
+            metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
+            self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+            return None
+
+        # XXX(py3): Note that ``import_string`` explicitly wants a str in
+        # python2, so we'll decode (for python3) and then translate back to
+        # a byte string (in python2) for import_string.
+        model = import_string(str(values.pop("m").decode("utf-8")))  # NOQA
+
+        if values["f"].startswith(b"{"):
+            filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
+        else:
+            filters = codec.decode(values.pop("f"))
+
+        incr_values = {}
+        extra_values = {}
+        signal_only = None
+        for k, v in values.items():
+            if k.startswith("i+"):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith("e+"):
+                if v.startswith(b"["):
+                    extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
+                else:
+                    extra_values[k[2:]] = codec.decode(v)
+            elif k == "s":
+                signal_only = bool(int(v))  # Should be 1 if set
+
+        return model, incr_values, filters, extra_values, signal_only
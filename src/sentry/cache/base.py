@@ -1,5 +1,7 @@
 from django.conf import settings
 
+from sentry.utils import json
+
 from threading import local
 
 
@@ -17,6 +19,24 @@ class BaseCache(local):
     def set(self, key, value, timeout, version=None, raw=False):
         raise NotImplementedError
 
+    def set_many(self, items, timeout, version=None, raw=False):
+        """
+        Set multiple ``{key: value}`` pairs. Backends that can batch writes
+        should override this to avoid a round trip per key.
+        """
+        for key, value in items.items():
+            self.set(key, value, timeout, version=version, raw=raw)
+
+    def set_many_json(self, items, timeout, version=None):
+        """
+        Set multiple ``{key: value}`` pairs where every value is an already
+        JSON-encoded document. ``get`` returns the decoded document. Backends
+        that store JSON should override this to write the bytes as-is.
+        """
+        self.set_many(
+            {key: json.loads(value) for key, value in items.items()}, timeout, version=version
+        )
+
     def delete(self, key, version=None):
         raise NotImplementedError
 
@@ -16,16 +16,42 @@ class CommonRedisCache(BaseCache):
         self.client = client
         BaseCache.__init__(self, **options)
 
-    def set(self, key, value, timeout, version=None, raw=False):
+    def _prepare(self, key, value, version=None, raw=False):
         key = self.make_key(key, version=version)
         v = json.dumps(value) if not raw else value
         if len(v) > self.max_size:
             raise ValueTooLarge(f"Cache key too large: {key!r} {len(v)!r}")
+        return key, v
+
+    def set(self, key, value, timeout, version=None, raw=False):
+        key, v = self._prepare(key, value, version=version, raw=raw)
         if timeout:
             self.client.setex(key, int(timeout), v)
         else:
             self.client.set(key, v)
 
+    def _write_many(self, client, items, timeout):
+        for key, v in items:
+            if timeout:
+                client.setex(key, int(timeout), v)
+            else:
+                client.set(key, v)
+
+    def set_many(self, items, timeout, version=None, raw=False):
+        items = [
+            self._prepare(key, value, version=version, raw=raw) for key, value in items.items()
+        ]
+        if not items:
+            return
+
+        pipeline = self.client.pipeline(transaction=False)
+        self._write_many(pipeline, items, timeout)
+        pipeline.execute()
+
+    def set_many_json(self, items, timeout, version=None):
+        # Values are stored as JSON anyway, skip decoding and re-encoding them.
+        self.set_many(items, timeout, version=version, raw=True)
+
     def delete(self, key, version=None):
         key = self.make_key(key, version=version)
         self.client.delete(key)
@@ -44,6 +70,18 @@ class RbCache(CommonRedisCache):
         client = cluster.get_routing_client()
         CommonRedisCache.__init__(self, client, **options)
 
+    def set_many(self, items, timeout, version=None, raw=False):
+        # The rb routing client does not support pipelines, but ``map`` sends
+        # the commands to all hosts in parallel.
+        items = [
+            self._prepare(key, value, version=version, raw=raw) for key, value in items.items()
+        ]
+        if not items:
+            return
+
+        with self.client.map() as client:
+            self._write_many(client, items, timeout)
+
 
 # Confusing legacy name for RbCache.  We don't actually have a pure redis cache
 RedisCache = RbCache
@@ -539,6 +539,7 @@ CELERY_IMPORTS = (
     "sentry.tasks.integrations",
     "sentry.tasks.members",
     "sentry.tasks.merge",
+    "sentry.tasks.nodestore",
     "sentry.tasks.options",
     "sentry.tasks.ping",
     "sentry.tasks.post_process",
@@ -676,6 +677,11 @@ CELERYBEAT_SCHEDULE = {
         "schedule": crontab_with_minute_jitter(hour=3),
         "options": {"expires": 3600 * 24},
     },
+    "train-nodestore-dictionaries": {
+        "task": "sentry.tasks.nodestore.train_nodestore_dictionaries",
+        "schedule": crontab_with_minute_jitter(hour=4, day_of_week="monday"),
+        "options": {"expires": 3600 * 24},
+    },
     "update-user-reports": {
         "task": "sentry.tasks.update_user_reports",
         "schedule": timedelta(minutes=15),
@@ -1210,11 +1216,17 @@ SENTRY_DEFAULT_MAX_EVENTS_PER_MINUTE = "90%"
 SENTRY_SNUBA = os.environ.get("SNUBA", "http://127.0.0.1:1218")
 SENTRY_SNUBA_TIMEOUT = 30
 SENTRY_SNUBA_CACHE_TTL_SECONDS = 60
+# Results of queries over time windows that ended a while ago are cached for
+# longer, up to this many seconds.
+SENTRY_SNUBA_CACHE_MAX_TTL_SECONDS = 3600
 
 # Node storage backend
 SENTRY_NODESTORE = "sentry.nodestore.django.DjangoNodeStorage"
 SENTRY_NODESTORE_OPTIONS = {}
 
+# Redis cluster holding the node payloads sampled to train zstd dictionaries
+SENTRY_NODESTORE_SAMPLES_REDIS_CLUSTER = "default"
+
 # Tag storage backend
 SENTRY_TAGSTORE = os.environ.get("SENTRY_TAGSTORE", "sentry.tagstore.snuba.SnubaTagStorage")
 SENTRY_TAGSTORE_OPTIONS = {}
@@ -2102,6 +2114,12 @@ SENTRY_SIMILARITY_INDEX_REDIS_CLUSTER = "default"
 # Similarity-v2: uses grouping components for diffing (None = fallback to setting for v1)
 SENTRY_SIMILARITY2_INDEX_REDIS_CLUSTER = None
 
+# Build the signatures of both similarity indexes with universal hashing, which
+# is faster with NumPy installed. These signatures are not compatible with the
+# default MinHash ones, so the indexes are kept under new namespaces
+# (`sim:1:u` and `sim:2:u`) that start out empty and have to be backfilled.
+SENTRY_SIMILARITY_UNIVERSAL_HASH_SIGNATURES = False
+
 # The grouping strategy to use for driving similarity-v2. You can add multiple
 # strategies here to index them all. This is useful for transitioning a
 # similarity dataset to newer grouping configurations.
@@ -50,3 +50,24 @@ class ExportQueryType:
             return cls.ISSUES_BY_TAG
         elif string == cls.DISCOVER_STR:
             return cls.DISCOVER
+
+
+class ExportFormat:
+    CSV = "csv"
+    JSONL = "jsonl"  # Newline delimited JSON
+
+    @classmethod
+    def as_choices(cls):
+        return ((cls.CSV, cls.CSV), (cls.JSONL, cls.JSONL))
+
+    @classmethod
+    def get_extension(cls, export_format, compress=False):
+        return f"{export_format}.gz" if compress else export_format
+
+    @classmethod
+    def get_content_type(cls, export_format, compress=False):
+        if compress:
+            return "application/gzip"
+        elif export_format == cls.JSONL:
+            return "application/x-ndjson"
+        return "text/csv"
@@ -14,7 +14,7 @@ from sentry.utils import metrics
 from sentry.utils.compat import map
 from sentry.utils.snuba import MAX_FIELDS
 
-from ..base import ExportQueryType
+from ..base import ExportFormat, ExportQueryType
 from ..models import ExportedData
 from ..tasks import assemble_download
 from ..processors.discover import DiscoverProcessor
@@ -23,6 +23,10 @@ from ..processors.discover import DiscoverProcessor
 class DataExportQuerySerializer(serializers.Serializer):
     query_type = serializers.ChoiceField(choices=ExportQueryType.as_str_choices(), required=True)
     query_info = serializers.JSONField(required=True)
+    export_format = serializers.ChoiceField(
+        choices=ExportFormat.as_choices(), default=ExportFormat.CSV
+    )
+    compress = serializers.BooleanField(default=False)
 
     def validate(self, data):
         organization = self.context["organization"]
@@ -144,7 +148,11 @@ class DataExportEndpoint(OrganizationEndpoint, EnvironmentMixin):
                     "dataexport.enqueue", tags={"query_type": data["query_type"]}, sample_rate=1.0
                 )
                 assemble_download.delay(
-                    data_export_id=data_export.id, export_limit=limit, environment_id=environment_id
+                    data_export_id=data_export.id,
+                    export_limit=limit,
+                    environment_id=environment_id,
+                    export_format=data["export_format"],
+                    compress=data["compress"],
                 )
                 status = 201
         except ValidationError as e:
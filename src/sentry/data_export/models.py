@@ -56,10 +56,13 @@ class ExportedData(Model):
 
     @property
     def file_name(self):
+        return self.get_file_name()
+
+    def get_file_name(self, extension="csv"):
         date = self.date_added.strftime("%Y-%B-%d")
         export_type = ExportQueryType.as_str(self.query_type)
         # Example: Discover_2020-July-21_27.csv
-        return f"{export_type}_{date}_{self.id}.csv"
+        return f"{export_type}_{date}_{self.id}.{extension}"
 
     @staticmethod
     def format_date(date):
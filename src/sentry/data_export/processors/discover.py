@@ -1,6 +1,6 @@
 import logging
 
-from sentry.api.event_search import get_function_alias
+from sentry.api.event_search import get_function_alias, is_function
 from sentry.api.utils import get_date_range_from_params
 from sentry.models import Environment, Group, Project
 from sentry.snuba import discover
@@ -31,8 +31,14 @@ class DiscoverProcessor:
         if self.environments:
             self.params["environment"] = self.environments
         self.header_fields = map(lambda x: get_function_alias(x), discover_query["field"])
+        # Queries of individual events are paginated by a cursor on the last
+        # event of the previous page, aggregates by offset.
+        self.paginate_by_cursor = not any(is_function(field) for field in discover_query["field"])
         self.data_fn = self.get_data_fn(
-            fields=discover_query["field"], query=discover_query["query"], params=self.params
+            fields=discover_query["field"],
+            query=discover_query["query"],
+            params=self.params,
+            paginate_by_cursor=self.paginate_by_cursor,
         )
 
     @staticmethod
@@ -64,22 +70,55 @@ class DiscoverProcessor:
         return environment_names
 
     @staticmethod
-    def get_data_fn(fields, query, params):
-        def data_fn(offset, limit):
+    def get_data_fn(fields, query, params, paginate_by_cursor=False):
+        orderby = None
+        if paginate_by_cursor:
+            # The cursor needs the timestamp of the events, `auto_fields` adds
+            # their id.
+            fields = fields + ["timestamp"] if "timestamp" not in fields else fields
+            orderby = ["-timestamp", "-id"]
+
+        def data_fn(offset, limit, cursor=None):
+            conditions = None
+            if cursor is not None:
+                # Events are sorted by timestamp and event id since multiple
+                # events are likely to have the same timestamp. See
+                # `celery_run_batch_query`.
+                offset = None
+                conditions = [
+                    ["timestamp", "<=", cursor["timestamp"]],
+                    [
+                        ["timestamp", "<", cursor["timestamp"]],
+                        ["event_id", "<", cursor["event_id"]],
+                    ],
+                ]
+
             return discover.query(
                 selected_columns=fields,
                 query=query,
                 params=params,
+                orderby=orderby,
                 offset=offset,
                 limit=limit,
                 referrer="data_export.tasks.discover",
                 auto_fields=True,
                 auto_aggregations=True,
                 use_aggregate_conditions=True,
+                conditions=conditions,
             )
 
         return data_fn
 
+    def get_cursor(self, result_list):
+        """
+        Returns the cursor to the page after ``result_list``, or ``None`` when
+        the query is paginated by offset. The cursor is persisted in the
+        arguments of export tasks, change its keys carefully.
+        """
+        if not self.paginate_by_cursor or not result_list:
+            return None
+        return {"timestamp": result_list[-1]["timestamp"], "event_id": result_list[-1]["id"]}
+
     def handle_fields(self, result_list):
         # Find issue short_id if present
         # (originally in `/api/bases/organization_events.py`)
@@ -1,32 +1,22 @@
-import csv
 import logging
-import tempfile
-import codecs
 
 from hashlib import sha1
 
 from celery.task import current
 from celery.exceptions import MaxRetriesExceededError
-from django.core.files.base import ContentFile
 from django.db import transaction, IntegrityError
 from django.utils import timezone
 
 import sentry_sdk
 
-from sentry.models import (
-    AssembleChecksumMismatch,
-    DEFAULT_BLOB_SIZE,
-    File,
-    FileBlob,
-    FileBlobIndex,
-    MAX_FILE_SIZE,
-)
+from sentry.models import AssembleChecksumMismatch, File, FileBlobIndex, MAX_FILE_SIZE
 from sentry.tasks.base import instrumented_task
 from sentry.utils import metrics
 from sentry.utils.sdk import capture_exception
 
 from .base import (
     ExportError,
+    ExportFormat,
     ExportQueryType,
     EXPORTED_ROWS_LIMIT,
     SNUBA_MAX_RESULTS,
@@ -34,6 +24,7 @@ from .base import (
 )
 from .models import ExportedData, ExportedDataBlob
 from .utils import handle_snuba_errors
+from .writer import ExportWriter
 from .processors.discover import DiscoverProcessor
 from .processors.issues_by_tag import IssuesByTagProcessor
 
@@ -55,8 +46,19 @@ def assemble_download(
     offset=0,
     bytes_written=0,
     environment_id=None,
+    cursor=None,
+    export_format=ExportFormat.CSV,
+    compress=False,
     **kwargs,
 ):
+    """
+    Exports a batch of up to ``MAX_BATCH_SIZE`` bytes of rows, starting at
+    row ``offset`` of the export, and chains itself for the next batch.
+
+    Queries of individual events continue from ``cursor``, the last event of
+    the previous batch, so that no batch has to scan the rows exported before
+    it.
+    """
     with sentry_sdk.start_transaction(
         op="task.data_export.assemble",
         name="DataExportAssemble",
@@ -102,50 +104,57 @@ def assemble_download(
 
             processor = get_processor(data_export, environment_id)
 
-            with tempfile.TemporaryFile(mode="w+b") as tf:
-                # XXX(python3):
-                #
-                # In python3 we write unicode strings (which is all the csv
-                # module is able to do, it will NOT write bytes like in py2).
-                # Because of this we use the codec getwriter to transform our
-                # file handle to a stream writer that will encode to utf8.
-                tfw = codecs.getwriter("utf-8")(tf)
-
-                writer = csv.DictWriter(tfw, processor.header_fields, extrasaction="ignore")
-                if first_page:
-                    writer.writeheader()
-
-                # the position in the file at the end of the headers
-                starting_pos = tf.tell()
-
-                # the row offset relative to the start of the current task
-                # this offset tells you the number of rows written during this batch fragment
-                fragment_offset = 0
-
-                # the absolute row offset from the beginning of the export
-                next_offset = offset + fragment_offset
-
-                while True:
-                    # the number of rows to export in the next batch fragment
-                    fragment_row_count = min(batch_size, max(export_limit - next_offset, 1))
-
-                    rows = process_rows(processor, data_export, fragment_row_count, next_offset)
-                    writer.writerows(rows)
-
-                    fragment_offset += len(rows)
-                    next_offset = offset + fragment_offset
-
-                    if (
-                        not rows
-                        or len(rows) < batch_size
-                        # the batch may exceed MAX_BATCH_SIZE but immediately stops
-                        or tf.tell() - starting_pos >= MAX_BATCH_SIZE
-                    ):
-                        break
-
-                tf.seek(0)
-                new_bytes_written = store_export_chunk_as_blob(data_export, bytes_written, tf)
-                bytes_written += new_bytes_written
+            # there is a maximum file size allowed, so we need to make sure we don't exceed it
+            # NOTE: there seems to be issues with downloading files larger than 1 GB on slower
+            # networks, limit the export to 1 GB for now to improve reliability
+            max_file_size = min(MAX_FILE_SIZE, 2 ** 30)
+
+            # the blobs of a previous attempt at this batch are written again
+            delete_export_blobs(data_export, bytes_written)
+
+            writer = ExportWriter(
+                data_export,
+                processor.header_fields,
+                export_format=export_format,
+                compress=compress,
+                offset=bytes_written,
+                write_header=first_page,
+            )
+
+            # the size of the headers
+            starting_size = writer.raw_size
+
+            # the absolute row offset from the beginning of the export
+            next_offset = offset
+
+            while True:
+                # the number of rows to export in the next batch fragment
+                fragment_row_count = min(batch_size, max(export_limit - next_offset, 1))
+
+                rows, next_cursor = process_rows(
+                    processor, data_export, fragment_row_count, next_offset, cursor
+                )
+                writer.write_rows(rows)
+
+                next_offset += len(rows)
+                if next_cursor is not None:
+                    cursor = next_cursor
+
+                if (
+                    not rows
+                    or len(rows) < batch_size
+                    # the batch may exceed MAX_BATCH_SIZE but immediately stops
+                    or writer.raw_size - starting_size >= MAX_BATCH_SIZE
+                    or bytes_written + writer.size >= max_file_size
+                ):
+                    break
+
+            new_bytes_written = writer.close()
+            if bytes_written + new_bytes_written >= max_file_size:
+                # drop the whole batch, the export ends with the previous one
+                delete_export_blobs(data_export, bytes_written)
+                new_bytes_written = 0
+            bytes_written += new_bytes_written
         except ExportError as error:
             return data_export.email_failure(message=str(error))
         except Exception as error:
@@ -180,11 +189,16 @@ def assemble_download(
                     offset=next_offset,
                     bytes_written=bytes_written,
                     environment_id=environment_id,
+                    cursor=cursor,
+                    export_format=export_format,
+                    compress=compress,
                 )
             else:
                 metrics.timing("dataexport.row_count", next_offset, sample_rate=1.0)
                 metrics.timing("dataexport.file_size", bytes_written, sample_rate=1.0)
-                merge_export_blobs.delay(data_export_id)
+                merge_export_blobs.delay(
+                    data_export_id, export_format=export_format, compress=compress
+                )
 
 
 def get_processor(data_export, environment_id):
@@ -211,13 +225,17 @@ def get_processor(data_export, environment_id):
         raise
 
 
-def process_rows(processor, data_export, batch_size, offset):
+def process_rows(processor, data_export, batch_size, offset, cursor=None):
+    """
+    Returns the rows of the next batch fragment, along with the cursor to the
+    fragment after it, if the query is paginated by cursor.
+    """
     try:
         if data_export.query_type == ExportQueryType.ISSUES_BY_TAG:
-            rows = process_issues_by_tag(processor, batch_size, offset)
+            rows, cursor = process_issues_by_tag(processor, batch_size, offset), None
         elif data_export.query_type == ExportQueryType.DISCOVER:
-            rows = process_discover(processor, batch_size, offset)
-        return rows
+            rows, cursor = process_discover(processor, batch_size, offset, cursor)
+        return rows, cursor
     except ExportError as error:
         error_str = str(error)
         metrics.incr("dataexport.error", tags={"error": error_str}, sample_rate=1.0)
@@ -232,38 +250,17 @@ def process_issues_by_tag(processor, limit, offset):
 
 
 @handle_snuba_errors(logger)
-def process_discover(processor, limit, offset):
-    raw_data_unicode = processor.data_fn(limit=limit, offset=offset)["data"]
-    return processor.handle_fields(raw_data_unicode)
-
-
-@transaction.atomic()
-def store_export_chunk_as_blob(data_export, bytes_written, fileobj, blob_size=DEFAULT_BLOB_SIZE):
-    # adapted from `putfile` in  `src/sentry/models/file.py`
-    bytes_offset = 0
-    while True:
-        contents = fileobj.read(blob_size)
-        if not contents:
-            return bytes_offset
-
-        blob_fileobj = ContentFile(contents)
-        blob = FileBlob.from_file(blob_fileobj, logger=logger)
-        ExportedDataBlob.objects.get_or_create(
-            data_export=data_export, blob=blob, offset=bytes_written + bytes_offset
-        )
+def process_discover(processor, limit, offset, cursor=None):
+    raw_data_unicode = processor.data_fn(limit=limit, offset=offset, cursor=cursor)["data"]
+    return processor.handle_fields(raw_data_unicode), processor.get_cursor(raw_data_unicode)
 
-        bytes_offset += blob.size
 
-        # there is a maximum file size allowed, so we need to make sure we don't exceed it
-        # NOTE: there seems to be issues with downloading files larger than 1 GB on slower
-        # networks, limit the export to 1 GB for now to improve reliability
-        if bytes_written + bytes_offset >= min(MAX_FILE_SIZE, 2 ** 30):
-            transaction.set_rollback(True)
-            return 0
+def delete_export_blobs(data_export, offset):
+    ExportedDataBlob.objects.filter(data_export=data_export, offset__gte=offset).delete()
 
 
 @instrumented_task(name="sentry.data_export.tasks.merge_blobs", queue="data_export", acks_late=True)
-def merge_export_blobs(data_export_id, **kwargs):
+def merge_export_blobs(data_export_id, export_format=ExportFormat.CSV, compress=False, **kwargs):
     with sentry_sdk.start_transaction(
         op="task.data_export.merge",
         name="DataExportMerge",
@@ -293,10 +290,13 @@ def merge_export_blobs(data_export_id, **kwargs):
         # adapted from `putfile` in  `src/sentry/models/file.py`
         try:
             with transaction.atomic():
+                extension = ExportFormat.get_extension(export_format, compress)
                 file = File.objects.create(
-                    name=data_export.file_name,
-                    type="export.csv",
-                    headers={"Content-Type": "text/csv"},
+                    name=data_export.get_file_name(extension),
+                    type=f"export.{extension}",
+                    headers={
+                        "Content-Type": ExportFormat.get_content_type(export_format, compress)
+                    },
                 )
                 size = 0
                 file_checksum = sha1(b"")
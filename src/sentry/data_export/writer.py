@@ -0,0 +1,121 @@
+"""
+Streaming of exported rows into the blobs of an export file.
+
+Rows are serialized in memory and cut into blobs as soon as enough bytes are
+buffered, instead of being written to a temporary file first. Every task of an
+export writes one fragment of the file, starting at the offset where the
+previous fragment ended.
+
+Compressed exports are gzip files made of one gzip member per fragment, which
+gzip readers decompress as a single stream.
+"""
+
+import csv
+import io
+import logging
+import zlib
+
+from django.core.files.base import ContentFile
+
+from sentry.models import DEFAULT_BLOB_SIZE, FileBlob
+from sentry.utils import json
+
+from .base import ExportFormat
+from .models import ExportedDataBlob
+
+logger = logging.getLogger(__name__)
+
+
+class ExportWriter:
+    """
+    Writes rows in ``export_format`` as the fragment of the file of
+    ``data_export`` that starts at ``offset``.
+    """
+
+    def __init__(
+        self,
+        data_export,
+        header_fields,
+        export_format=ExportFormat.CSV,
+        compress=False,
+        offset=0,
+        write_header=False,
+        blob_size=DEFAULT_BLOB_SIZE,
+    ):
+        self.data_export = data_export
+        self.header_fields = list(header_fields)
+        self.export_format = export_format
+        self.offset = offset
+        self.blob_size = blob_size
+
+        # the number of uncompressed bytes serialized so far
+        self.raw_size = 0
+        # the number of bytes of the fragment, whether stored or still buffered
+        self.size = 0
+
+        self._buffer = bytearray()
+        self._stored = 0
+        self._compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+
+        if export_format == ExportFormat.CSV:
+            self._text = io.StringIO()
+            self._csv_writer = csv.DictWriter(self._text, self.header_fields, extrasaction="ignore")
+            if write_header:
+                self._csv_writer.writeheader()
+                self._write(self._flush_text())
+
+    def _flush_text(self):
+        data = self._text.getvalue().encode("utf-8")
+        self._text.seek(0)
+        self._text.truncate()
+        return data
+
+    def _serialize(self, rows):
+        if self.export_format == ExportFormat.CSV:
+            self._csv_writer.writerows(rows)
+            return self._flush_text()
+
+        return b"".join(
+            json.dumps({field: row.get(field) for field in self.header_fields}).encode("utf-8")
+            + b"\n"
+            for row in rows
+        )
+
+    def _write(self, data):
+        self.raw_size += len(data)
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        self._buffer += data
+        self.size += len(data)
+
+        while len(self._buffer) >= self.blob_size:
+            self._store_blob(bytes(self._buffer[: self.blob_size]))
+            del self._buffer[: self.blob_size]
+
+    def _store_blob(self, contents):
+        blob = FileBlob.from_file(ContentFile(contents), logger=logger)
+        ExportedDataBlob.objects.get_or_create(
+            data_export=self.data_export, blob=blob, offset=self.offset + self._stored
+        )
+        self._stored += blob.size
+
+    def write_rows(self, rows):
+        if rows:
+            self._write(self._serialize(rows))
+
+    def close(self):
+        """
+        Store the remaining buffered bytes, and returns the size of the
+        fragment.
+        """
+        if self._compressor is not None:
+            data = self._compressor.flush()
+            self._compressor = None
+            self._buffer += data
+            self.size += len(data)
+
+        if self._buffer:
+            self._store_blob(bytes(self._buffer))
+            self._buffer = bytearray()
+
+        return self.size
@@ -1,4 +1,5 @@
 import itertools
+import time
 from uuid import uuid4
 
 from datetime import timedelta
@@ -6,6 +7,12 @@ from django.db import connections, router
 from django.utils import timezone
 from sentry.utils.compat import zip
 
+# `execute_range` sizes the chunks it deletes so that every statement takes
+# about `TARGET_STATEMENT_DURATION` seconds, within these bounds.
+MIN_CHUNK_SIZE = 100
+MAX_CHUNK_SIZE = 100000
+TARGET_STATEMENT_DURATION = 1.0
+
 
 class BulkDeleteQuery:
     def __init__(self, model, project_id=None, dtfield=None, days=None, order_by=None):
@@ -64,6 +71,103 @@ class BulkDeleteQuery:
 
         return self._continuous_query(query)
 
+    def _get_where(self):
+        quote_name = connections[self.using].ops.quote_name
+
+        where = []
+        if self.dtfield and self.days is not None:
+            where.append(
+                (
+                    f"{quote_name(self.dtfield)} < %s",
+                    [timezone.now() - timedelta(days=self.days)],
+                )
+            )
+        if self.project_id:
+            where.append(("project_id = %s", [self.project_id]))
+
+        return where
+
+    def get_id_ranges(self, count):
+        """
+        Split the ids of the rows to delete into up to ``count`` ranges of the
+        same width, as ``(start, stop)`` tuples with ``stop`` excluded. The
+        ranges can be deleted independently with ``execute_range``.
+        """
+        where = self._get_where()
+        if where:
+            conditions, parameters = zip(*where)
+            where_clause = "where {}".format(" and ".join(conditions))
+            parameters = list(itertools.chain.from_iterable(parameters))
+        else:
+            where_clause, parameters = "", []
+
+        cursor = connections[self.using].cursor()
+        cursor.execute(
+            "select min(id), max(id) from {table} {where}".format(
+                table=self.model._meta.db_table, where=where_clause
+            ),
+            parameters,
+        )
+        min_id, max_id = cursor.fetchone()
+        if min_id is None:
+            return []
+
+        # ceil, so that there are no more than `count` ranges
+        width = -(-(max_id - min_id + 1) // count)
+        return [
+            (start, min(start + width, max_id + 1)) for start in range(min_id, max_id + 1, width)
+        ]
+
+    def execute_range(self, id_range, chunk_size=10000):
+        """
+        Delete the rows with ids within ``id_range`` in chunks, walking the
+        range in id order. The chunk size adapts to the latency of the
+        statements.
+
+        Returns the number of deleted rows, and the chunk size that the next
+        range can start with.
+        """
+        start, stop = id_range
+        where = self._get_where()
+        where.append(("id >= %s and id < %s", []))
+        conditions, parameters = zip(*where)
+        parameters = list(itertools.chain.from_iterable(parameters))
+
+        query = """
+            with deleted as (
+                delete from {table}
+                where id = any(array(
+                    select id
+                    from {table}
+                    where {conditions}
+                    order by id
+                    limit %s
+                ))
+                returning id
+            )
+            select count(*), max(id) from deleted;
+        """.format(
+            table=self.model._meta.db_table, conditions=" and ".join(conditions)
+        )
+
+        cursor = connections[self.using].cursor()
+        deleted = 0
+        while True:
+            statement_start = time.time()
+            cursor.execute(query, parameters + [start, stop, chunk_size])
+            duration = time.time() - statement_start
+
+            count, last_id = cursor.fetchone()
+            deleted += count
+            if count < chunk_size:
+                return deleted, chunk_size
+
+            # Skip past the deleted rows rather than scanning the rows of the
+            # range that are kept over again.
+            start = last_id + 1
+            factor = min(max(TARGET_STATEMENT_DURATION / max(duration, 0.001), 0.5), 2.0)
+            chunk_size = min(max(int(chunk_size * factor), MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+
     def _continuous_query(self, query):
         results = True
         cursor = connections[self.using].cursor()
@@ -113,6 +113,9 @@ class NodeData(collections.MutableMapping):
         return rv
 
     def bind_data(self, data, ref=None):
+        from sentry.eventstore.compressor import assemble, get_shared_blobs
+
+        data = assemble(data, get_shared_blobs)
         self.ref = data.pop("_ref", ref)
         ref_version = data.pop("_ref_version", None)
         if ref_version == self.ref_version and ref is not None and self.ref != ref:
@@ -138,10 +141,35 @@ class NodeData(collections.MutableMapping):
             See documentation of nodestore.
         """
 
+        to_write = self._get_subkeys_to_write(subkeys)
+        if to_write is not None:
+            nodestore.set_subkeys(self.id, to_write)
+
+    @classmethod
+    def save_many(cls, items):
+        """
+        Write the data of multiple nodes back to nodestore at once.
+
+        :param items: A sequence of ``(node_data, subkeys)`` pairs, where
+            ``subkeys`` is the same as for ``save``.
+        """
+        to_write = {}
+        for node_data, subkeys in items:
+            data = node_data._get_subkeys_to_write(subkeys)
+            if data is not None:
+                to_write[node_data.id] = data
+
+        if to_write:
+            nodestore.set_subkeys_multi(to_write)
+
+    def _get_subkeys_to_write(self, subkeys):
+        from sentry import options
+        from sentry.eventstore.compressor import deduplicate_for_storage
+
         # We never loaded any data for reading or writing, so there
         # is nothing to save.
         if self._node_data is None:
-            return
+            return None
 
         # We can't put our wrappers into the nodestore, so we need to
         # ensure that the data is converted into a plain old dict
@@ -149,10 +177,12 @@ class NodeData(collections.MutableMapping):
         if isinstance(to_write, CANONICAL_TYPES):
             to_write = dict(to_write.items())
 
+        if options.get("store.nodestore-deduplicate-interfaces"):
+            to_write = deduplicate_for_storage(to_write)
+
         subkeys = subkeys or {}
         subkeys[None] = to_write
-
-        nodestore.set_subkeys(self.id, subkeys)
+        return subkeys
 
 
 class NodeField(GzippedDictField):
@@ -19,6 +19,7 @@ from sentry.constants import (
     LOG_LEVELS_MAP,
     MAX_TAG_VALUE_LENGTH,
 )
+from sentry.db.models import NodeData
 from sentry.eventstore.processing import event_processing_store
 from sentry.grouping.api import (
     get_grouping_config_dict_for_project,
@@ -709,27 +710,34 @@ def _get_or_create_release_associated_models(jobs, projects):
 @metrics.wraps("save_event.tsdb_record_all_metrics")
 def _tsdb_record_all_metrics(jobs):
     """
-    Do all tsdb-related things for save_event in here s.t. we can potentially
-    put everything in a single redis pipeline someday.
+    Do all tsdb-related things for save_event in here s.t. all writes of a
+    batch of jobs go out in a single round trip per redis node.
     """
 
     # XXX: validate whether anybody actually uses those metrics
 
-    for job in jobs:
-        incrs = []
-        frequencies = []
-        records = []
+    incrs = []
+    frequencies = []
+    records = []
 
-        incrs.append((tsdb.models.project, job["project_id"]))
+    for job in jobs:
         event = job["event"]
         group = job["group"]
         release = job["release"]
         environment = job["environment"]
+        timestamp = event.datetime
+
+        incrs.append((tsdb.models.project, job["project_id"], 1, timestamp, environment.id))
 
         if group:
-            incrs.append((tsdb.models.group, group.id))
+            incrs.append((tsdb.models.group, group.id, 1, timestamp, environment.id))
             frequencies.append(
-                (tsdb.models.frequent_environments_by_group, {group.id: {environment.id: 1}})
+                (
+                    tsdb.models.frequent_environments_by_group,
+                    {group.id: {environment.id: 1}},
+                    timestamp,
+                    None,
+                )
             )
 
             if release:
@@ -737,33 +745,46 @@ def _tsdb_record_all_metrics(jobs):
                     (
                         tsdb.models.frequent_releases_by_group,
                         {group.id: {job["grouprelease"].id: 1}},
+                        timestamp,
+                        None,
                     )
                 )
 
         if release:
-            incrs.append((tsdb.models.release, release.id))
+            incrs.append((tsdb.models.release, release.id, 1, timestamp, environment.id))
 
         user = job["user"]
 
         if user:
             project_id = job["project_id"]
-            records.append((tsdb.models.users_affected_by_project, project_id, (user.tag_value,)))
+            records.append(
+                (
+                    tsdb.models.users_affected_by_project,
+                    project_id,
+                    (user.tag_value,),
+                    timestamp,
+                    environment.id,
+                )
+            )
 
             if group:
-                records.append((tsdb.models.users_affected_by_group, group.id, (user.tag_value,)))
-
-        if incrs:
-            tsdb.incr_multi(incrs, timestamp=event.datetime, environment_id=environment.id)
-
-        if records:
-            tsdb.record_multi(records, timestamp=event.datetime, environment_id=environment.id)
+                records.append(
+                    (
+                        tsdb.models.users_affected_by_group,
+                        group.id,
+                        (user.tag_value,),
+                        timestamp,
+                        environment.id,
+                    )
+                )
 
-        if frequencies:
-            tsdb.record_frequency_multi(frequencies, timestamp=event.datetime)
+    if incrs or records or frequencies:
+        tsdb.write_batch(incrs=incrs, records=records, frequencies=frequencies)
 
 
 @metrics.wraps("save_event.nodestore_save_many")
 def _nodestore_save_many(jobs):
+    to_save = []
     for job in jobs:
         # Write the event to Nodestore
         subkeys = {}
@@ -777,7 +798,9 @@ def _nodestore_save_many(jobs):
             if data is not None:
                 subkeys["unprocessed"] = data
 
-        job["event"].data.save(subkeys=subkeys)
+        to_save.append((job["event"].data, subkeys))
+
+    NodeData.save_many(to_save)
 
 
 @metrics.wraps("save_event.eventstream_insert_many")
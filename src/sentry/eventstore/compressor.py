@@ -3,15 +3,49 @@ Eventstore compressor is responsible for pulling out repeating data across
 events such that they can be stored only once. For example SDK modules list, or
 debug_meta.
 
-This is not used in production yet, we are still collecting metrics there.
+The deduplicated parts of an event are stored in nodestore as shared blobs,
+keyed by the md5 checksum of their contents, and the event payload only keeps
+a reference to them in ``__nodestore_patchsets``.
+
+Shared blobs are not reference counted. Instead, every write of an event
+referencing a blob makes sure that the blob has been written within the last
+``SHARED_BLOB_REFRESH_INTERVAL``, which renews its TTL for as long as new
+events keep referencing it. Blobs are written with the default TTL of
+nodestore extended by that interval, so that they outlive every event written
+until they are written again. Nodestore backends that do not expire nodes by
+TTL but clean them up by write timestamp, like the Django one, date shared
+blobs at the end of that interval instead.
+
+Deduplication on write is enabled with the ``store.nodestore-deduplicate-interfaces``
+option. Reading always assembles events written with deduplication.
 """
 
+import copy
 import hashlib
+from datetime import timedelta
+
+from django.core.cache import cache
+
+from sentry import nodestore
+from sentry.utils import json, metrics
+from sentry.utils.datastructures import LRUCache
 
-from sentry.utils import json
+# The maximum time between writes of a shared blob that is still referenced
+# by new events.
+SHARED_BLOB_REFRESH_INTERVAL = timedelta(days=1)
+
+SHARED_BLOB_ID_PREFIX = "shared:"
+
+# The total size of the hot shared blobs kept in memory by every process, in
+# bytes of their JSON serialization.
+SHARED_BLOB_CACHE_SIZE = 32 * 1024 * 1024
 
 _INTERFACES = {}
 
+_shared_blob_cache = LRUCache(
+    SHARED_BLOB_CACHE_SIZE, get_size=lambda blob: len(json.dumps(blob, sort_keys=True))
+)
+
 
 def _deduplicate_interface(*keys):
     def inner(f):
@@ -23,30 +57,111 @@ def _deduplicate_interface(*keys):
     return inner
 
 
+class _ColumnarList:
+    """
+    Deduplicates ``_DEDUP_FIELDS`` of every item in the list found at
+    ``_LIST_KEY`` of an interface, storing each field as a column.
+    """
+
+    _LIST_KEY = None
+    _DEDUP_FIELDS = ()
+
+    @classmethod
+    def encode(cls, data):
+        dedup = {}
+
+        if data:
+            for item in data.get(cls._LIST_KEY) or []:
+                item = item or {}
+                for name in cls._DEDUP_FIELDS:
+                    dedup.setdefault(name, []).append(item.pop(name, None))
+
+        return dedup, data
+
+    @classmethod
+    def decode(cls, dedup, data):
+        if data:
+            for i, item in enumerate(data.get(cls._LIST_KEY) or []):
+                for name, arr in dedup.items():
+                    value = arr[i]
+                    if value is not None:
+                        item[name] = value
+
+        return data
+
+
 @_deduplicate_interface("debug_meta")
-class DebugMeta:
+class DebugMeta(_ColumnarList):
+    _LIST_KEY = "images"
     _DEDUP_FIELDS = ("debug_id", "code_id", "code_file", "debug_file")
 
+
+@_deduplicate_interface("modules")
+class Modules:
+    @staticmethod
+    def encode(data):
+        if not data:
+            return {}, data
+
+        return data, None
+
+    @staticmethod
+    def decode(dedup, data):
+        if dedup:
+            return copy.deepcopy(dedup)
+
+        return data
+
+
+@_deduplicate_interface("contexts")
+class Contexts:
+    # Context types and fields that differ from event to event, even when they
+    # are sent by the same device and release.
+    _VOLATILE_TYPES = frozenset(["trace"])
+    _VOLATILE_FIELDS = frozenset(
+        [
+            "app_memory",
+            "app_start_time",
+            "battery_level",
+            "battery_temperature",
+            "boot_time",
+            "charging",
+            "external_free_storage",
+            "free_memory",
+            "free_storage",
+            "low_memory",
+            "online",
+            "orientation",
+            "usable_memory",
+        ]
+    )
+
     @staticmethod
     def encode(data):
         dedup = {}
 
         if data:
-            for image in data.get("images") or []:
-                image = image or {}
-                for name in DebugMeta._DEDUP_FIELDS:
-                    dedup.setdefault(name, []).append(image.pop(name, None))
+            for name, context in data.items():
+                if not isinstance(context, dict):
+                    continue
+                if context.get("type", name) in Contexts._VOLATILE_TYPES:
+                    continue
+
+                dedup[name] = {
+                    key: context.pop(key)
+                    for key in list(context)
+                    if key not in Contexts._VOLATILE_FIELDS
+                }
 
         return dedup, data
 
     @staticmethod
     def decode(dedup, data):
         if data:
-            for i, image in enumerate(data.get("images") or []):
-                for name, arr in dedup.items():
-                    value = arr[i]
-                    if value is not None:
-                        image[name] = value
+            for name, context in dedup.items():
+                merged = copy.deepcopy(context)
+                merged.update(data.get(name) or {})
+                data[name] = merged
 
         return data
 
@@ -82,8 +197,119 @@ def assemble(data, get_extra_keys):
     deduplicated_interfaces = get_extra_keys(checksums)
 
     for key, checksum, inlined in data["__nodestore_patchsets"]:
-        deduplicated = deduplicated_interfaces[checksum]
+        deduplicated = deduplicated_interfaces.get(checksum)
+        if deduplicated is None:
+            # The shared blob expired before the event did
+            metrics.incr("eventstore.compressor.missing_shared_blob", tags={"key": key})
+            deduplicated = {}
         data[key] = _INTERFACES[key].decode(deduplicated, inlined)
 
     del data["__nodestore_patchsets"]
     return data
+
+
+def get_shared_blob_id(checksum):
+    return f"{SHARED_BLOB_ID_PREFIX}{checksum}"
+
+
+def _get_shared_blob_write_key(checksum):
+    return f"eventstore.compressor:written:{checksum}"
+
+
+def deduplicate_for_storage(data):
+    """
+    Returns a deduplicated copy of the event payload ``data`` to be written to
+    nodestore, after making sure the shared blobs it references are stored.
+
+    ``data`` itself is left untouched.
+    """
+    data = dict(data)
+    for key in _INTERFACES:
+        if key in data:
+            data[key] = copy.deepcopy(data[key])
+
+    data, extra_keys = deduplicate(data)
+    if extra_keys:
+        write_shared_blobs(extra_keys)
+
+    return data
+
+
+def get_shared_blob_ttl():
+    """
+    Returns the TTL of shared blobs, or ``None`` if nodestore does not expire
+    nodes by TTL.
+    """
+    default_ttl = getattr(nodestore, "default_ttl", None)
+    if default_ttl is None:
+        return None
+    # Events referencing a blob are written until the blob is written again,
+    # up to a refresh interval after it.
+    return default_ttl + SHARED_BLOB_REFRESH_INTERVAL
+
+
+def write_shared_blobs(extra_keys):
+    """
+    Write the shared blobs that were not written by any process within the
+    refresh interval.
+    """
+    to_write = {}
+    for checksum, blob in extra_keys.items():
+        if cache.add(
+            _get_shared_blob_write_key(checksum),
+            1,
+            SHARED_BLOB_REFRESH_INTERVAL.total_seconds(),
+        ):
+            to_write[checksum] = blob
+        if _shared_blob_cache.get(checksum) is None:
+            _shared_blob_cache.set(checksum, blob)
+
+    metrics.incr(
+        "eventstore.compressor.shared_blobs",
+        amount=len(extra_keys) - len(to_write),
+        tags={"result": "skipped"},
+    )
+    if not to_write:
+        return
+
+    try:
+        nodestore.set_subkeys_multi(
+            {get_shared_blob_id(checksum): {None: blob} for checksum, blob in to_write.items()},
+            ttl=get_shared_blob_ttl(),
+        )
+    except Exception:
+        # Let the next event write them instead.
+        cache.delete_many([_get_shared_blob_write_key(checksum) for checksum in to_write])
+        raise
+
+    metrics.incr(
+        "eventstore.compressor.shared_blobs", amount=len(to_write), tags={"result": "written"}
+    )
+
+
+def get_shared_blobs(checksums):
+    """
+    Fetch shared blobs by checksum, from memory if possible. Missing blobs are
+    left out of the result.
+    """
+    rv = {}
+    missing = {}
+    for checksum in checksums:
+        blob = _shared_blob_cache.get(checksum)
+        if blob is None:
+            missing[get_shared_blob_id(checksum)] = checksum
+        else:
+            rv[checksum] = blob
+
+    if missing:
+        for node_id, blob in nodestore.get_multi(list(missing)).items():
+            if blob is not None:
+                rv[missing[node_id]] = blob
+                _shared_blob_cache.set(missing[node_id], blob)
+
+    metrics.incr(
+        "eventstore.compressor.shared_blob_cache",
+        amount=len(checksums) - len(missing),
+        tags={"result": "hit"},
+    )
+    return rv
@@ -31,6 +31,23 @@ class BaseEventProcessingStore:
         self.inner.set(key, event, self.timeout)
         return key
 
+    def store_many_raw(self, payloads):
+        """
+        Store multiple events from their original JSON payloads without
+        parsing and re-serializing them. ``payloads`` is a list of
+        ``(project_id, event_id, payload)`` tuples, the keys are returned in
+        the same order.
+        """
+        keys = []
+        items = {}
+        for project_id, event_id, payload in payloads:
+            key = cache_key_for_event({"project": project_id, "event_id": event_id})
+            keys.append(key)
+            items[key] = payload
+
+        self.inner.set_many_json(items, self.timeout)
+        return keys
+
     def get(self, key, unprocessed=False):
         if unprocessed:
             key = _get_unprocessed_key(key)
@@ -1,14 +1,17 @@
 import os
 import zlib
 import base64
+import weakref
 import msgpack
 import inspect
+from collections import defaultdict
+from functools import lru_cache
 
 from parsimonious.grammar import Grammar, NodeVisitor
 from parsimonious.exceptions import ParseError
 
 from sentry import projectoptions
-from sentry.stacktraces.functions import set_in_app
+from sentry.stacktraces.functions import get_function_name_for_frame, set_in_app
 from sentry.stacktraces.platform import get_behavior_family_for_platform
 from sentry.grouping.component import GroupingComponent
 from sentry.grouping.utils import get_rule_bool
@@ -164,8 +167,6 @@ class Match:
 
         # all other matches are case sensitive
         if self.key == "function":
-            from sentry.stacktraces.functions import get_function_name_for_frame
-
             value = get_function_name_for_frame(frame_data, platform) or "<unknown>"
         elif self.key == "module":
             value = frame_data.get("module") or "<unknown>"
@@ -199,6 +200,157 @@ class Match:
         return cls(key, arg, negated)
 
 
+# Characters that make a pattern more than a plain string for ``glob_match``.
+GLOB_META_CHARS = frozenset("*?[]{}\\")
+
+# Upper bound of memoized glob results per compiled matcher.
+MAX_MATCH_CACHE_SIZE = 10000
+
+
+def _get_frame_match_values(frame_data, platform):
+    """Computes the values of a frame that matchers compare against.  The
+    ``in_app`` flag is not part of this as rules can change it while they
+    are being applied.
+    """
+    return {
+        "path": frame_data.get("abs_path") or frame_data.get("filename") or "",
+        "package": frame_data.get("package") or "",
+        "function": get_function_name_for_frame(frame_data, platform) or "<unknown>",
+        "module": frame_data.get("module") or "<unknown>",
+        "family": get_behavior_family_for_platform(frame_data.get("platform") or platform),
+    }
+
+
+def _split_literal_affixes(pattern):
+    """Returns the literal prefix and suffix of a glob pattern."""
+    meta = [i for i, c in enumerate(pattern) if c in GLOB_META_CHARS]
+    if not meta:
+        return pattern, pattern
+    return pattern[: meta[0]], pattern[meta[-1] + 1 :]
+
+
+class CompiledMatch:
+    """A `Match` that evaluates against precomputed frame values.  Plain
+    string patterns are compared directly, everything else is prefiltered by
+    its literal prefix and suffix and the result of `glob_match` memoized.
+    """
+
+    def __init__(self, match):
+        self.match = match
+        self.key = match.key
+        self.negated = match.negated
+        self.literal = None
+        self.prefix = self.suffix = ""
+        self.cache = {}
+
+        if self.key in ("function", "module"):
+            if not any(c in GLOB_META_CHARS for c in match.pattern):
+                self.literal = match.pattern
+            else:
+                self.prefix, self.suffix = _split_literal_affixes(match.pattern)
+        elif self.key == "family":
+            self.families = match.pattern.split(",")
+        elif self.key == "app":
+            self.app = get_rule_bool(match.pattern)
+
+    def matches(self, values, frame_data):
+        rv = self._positive_match(values, frame_data)
+        if self.negated:
+            rv = not rv
+        return rv
+
+    def _positive_match(self, values, frame_data):
+        if self.key == "app":
+            return self.app is not None and self.app == frame_data.get("in_app")
+
+        if self.key == "family":
+            return "all" in self.families or values["family"] in self.families
+
+        value = values.get(self.key, "<unknown>")
+        if self.literal is not None:
+            return value == self.literal
+
+        rv = self.cache.get(value)
+        if rv is None:
+            if self.key == "path":
+                rv = self.match._positive_frame_match({"abs_path": value}, None)
+            elif self.key == "package":
+                rv = self.match._positive_frame_match({"package": value}, None)
+            else:
+                rv = (
+                    value.startswith(self.prefix)
+                    and value.endswith(self.suffix)
+                    and glob_match(value, self.match.pattern)
+                )
+            if len(self.cache) >= MAX_MATCH_CACHE_SIZE:
+                self.cache.clear()
+            self.cache[value] = rv
+        return rv
+
+
+class CompiledRule:
+    def __init__(self, rule):
+        self.rule = rule
+        self.actions = rule.actions
+        self.matchers = [CompiledMatch(m) for m in rule.matchers]
+
+    def get_matching_frame_actions(self, values, frame_data):
+        if self.matchers and all(m.matches(values, frame_data) for m in self.matchers):
+            return self.actions
+
+    def get_index_key(self):
+        """Returns a ``(key, literal)`` pair every frame matched by this rule
+        must have, or `None` if the rule cannot be indexed.
+        """
+        for matcher in self.matchers:
+            if matcher.literal is not None and not matcher.negated:
+                return matcher.key, matcher.literal
+
+
+class CompiledEnhancements:
+    """The rules of an `Enhancements` object including its bases, indexed by
+    the literal function and module names they require.  Frames are only
+    evaluated against rules that can possibly match them.
+    """
+
+    def __init__(self, enhancements):
+        self.rules = [CompiledRule(rule) for rule in enhancements.iter_rules()]
+        self.unindexed = []
+        self.index = defaultdict(list)
+
+        for rule_idx, rule in enumerate(self.rules):
+            index_key = rule.get_index_key()
+            if index_key is None:
+                self.unindexed.append(rule_idx)
+            else:
+                self.index[index_key].append(rule_idx)
+
+    def iter_matching_actions(self, frames, platform):
+        """Yields ``(rule, frame index, actions)`` in the same order in which
+        iterating every rule over every frame would.  Matching happens lazily
+        so modifications made by earlier actions are observed.
+        """
+        frame_values = [_get_frame_match_values(frame, platform) for frame in frames]
+
+        frames_by_rule = defaultdict(list)
+        for idx, values in enumerate(frame_values):
+            candidates = list(self.unindexed)
+            for key in ("function", "module"):
+                candidates.extend(self.index.get((key, values[key]), ()))
+            for rule_idx in candidates:
+                frames_by_rule[rule_idx].append(idx)
+
+        for rule_idx in sorted(frames_by_rule):
+            rule = self.rules[rule_idx]
+            for idx in frames_by_rule[rule_idx]:
+                actions = rule.get_matching_frame_actions(frame_values[idx], frames[idx])
+                if actions:
+                    yield rule.rule, idx, actions
+
+
+_compiled_enhancements = weakref.WeakKeyDictionary()
+
+
 class Action:
     def apply_modifications_to_frame(self, frames, idx):
         pass
@@ -339,22 +491,21 @@ class Enhancements:
         """This applies the frame modifications to the frames itself.  This
         does not affect grouping.
         """
-        for rule in self.iter_rules():
-            for idx, frame in enumerate(frames):
-                actions = rule.get_matching_frame_actions(frame, platform)
-                for action in actions or ():
-                    action.apply_modifications_to_frame(frames, idx)
+        for _, idx, actions in self._get_compiled().iter_matching_actions(frames, platform):
+            for action in actions:
+                action.apply_modifications_to_frame(frames, idx)
 
     def update_frame_components_contributions(self, components, frames, platform):
         stacktrace_state = StacktraceState()
 
         # Apply direct frame actions and update the stack state alongside
-        for rule in self.iter_rules():
-            for idx, (component, frame) in enumerate(zip(components, frames)):
-                actions = rule.get_matching_frame_actions(frame, platform)
-                for action in actions or ():
-                    action.update_frame_components_contributions(components, frames, idx, rule=rule)
-                    action.modify_stacktrace_state(stacktrace_state, rule)
+        matching_actions = self._get_compiled().iter_matching_actions(
+            frames[: len(components)], platform
+        )
+        for rule, idx, actions in matching_actions:
+            for action in actions:
+                action.update_frame_components_contributions(components, frames, idx, rule=rule)
+                action.modify_stacktrace_state(stacktrace_state, rule)
 
         # Use the stack state to update frame contributions again to trim
         # down to max-frames.  min-frames is handled on the other hand for
@@ -432,6 +583,12 @@ class Enhancements:
             .strip("=")
         )
 
+    def _get_compiled(self):
+        compiled = _compiled_enhancements.get(self)
+        if compiled is None:
+            compiled = _compiled_enhancements[self] = CompiledEnhancements(self)
+        return compiled
+
     def iter_rules(self):
         for base in self.bases:
             base = ENHANCEMENT_BASES.get(base)
@@ -450,8 +607,17 @@ class Enhancements:
 
     @classmethod
     def loads(cls, data):
+        """Loads an enhancements config from its serialized form.  Configs are
+        cached by their serialized form, together with their compiled rules,
+        and must not be modified.
+        """
         if isinstance(data, str):
             data = data.encode("ascii", "ignore")
+        return cls._loads(data)
+
+    @classmethod
+    @lru_cache(maxsize=1000)
+    def _loads(cls, data):
         padded = data + b"=" * (4 - (len(data) % 4))
         try:
             return cls._from_config_structure(
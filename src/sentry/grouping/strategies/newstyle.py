@@ -9,6 +9,8 @@ from sentry.grouping.strategies.similarity_encoders import (
     ident_encoder,
 )
 from sentry.stacktraces.platform import get_behavior_family_for_platform
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.iterators import shingle
 
 
@@ -51,6 +53,29 @@ RECURSION_COMPARISON_FIELDS = [
 ]
 
 
+# Frame components only depend on the frame fields and grouping context
+# values below, so events sharing frames can reuse them.  Enhancements are
+# applied to copies of these components later and are not part of the key.
+FRAME_COMPONENT_CACHE_SIZE = 10000
+_frame_component_cache = LRUCache(FRAME_COMPONENT_CACHE_SIZE)
+
+
+def _get_frame_cache_key(frame, platform, context):
+    return (
+        context.config.id,
+        context["variant"],
+        context["is_recursion"],
+        platform,
+        frame.abs_path,
+        frame.filename,
+        frame.module,
+        frame.function,
+        frame.raw_function,
+        frame.context_line,
+        bool(frame.data and frame.data.get("sourcemap") is not None),
+    )
+
+
 def is_recursion_v1(frame1, frame2):
     "Returns a boolean indicating whether frames are recursive calls."
     if frame2 is None:
@@ -240,6 +265,22 @@ def get_function_component(
 def frame(frame, event, context, **meta):
     platform = frame.platform or event.platform
 
+    cache_key = _get_frame_cache_key(frame, platform, context)
+    rv = _frame_component_cache.get(cache_key)
+    if rv is None:
+        metrics.incr("grouping.frame_component_cache", tags={"result": "miss"})
+        rv = _get_frame_component(frame, platform, context)
+        _frame_component_cache.set(cache_key, rv)
+    else:
+        metrics.incr("grouping.frame_component_cache", tags={"result": "hit"})
+
+    # Callers update the returned component in place, never hand out the
+    # cached instance.
+    return {context["variant"]: rv.deep_copy()}
+
+
+def _get_frame_component(frame, platform, context):
+
     # Safari throws [native code] frames in for calls like ``forEach``
     # whereas Chrome ignores these. Let's remove it from the hashing algo
     # so that they're more likely to group together
@@ -314,7 +355,7 @@ def frame(frame, event, context, **meta):
     if context["is_recursion"]:
         rv.update(contributes=False, hint="ignored due to recursion")
 
-    return {context["variant"]: rv}
+    return rv
 
 
 def get_contextline_component(frame, platform, function, context):
@@ -2,9 +2,16 @@ import random
 import functools
 import logging
 import msgpack
+import time
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
 
 from django.conf import settings
 from django.core.cache import cache
+from django.db import connections
 
 import sentry_sdk
 
@@ -32,6 +39,16 @@ CACHE_TIMEOUT = 3600
 
 
 class IngestConsumerWorker(AbstractBatchWorker):
+    def __init__(self, concurrency=None):
+        # With a concurrency of ``None`` or ``1`` the batch is processed
+        # serially on the consumer thread. Otherwise messages are fanned out
+        # over a thread pool, partitioned by project so that messages for the
+        # same project are still processed in the order they were consumed.
+        self.concurrency = concurrency
+        self.executor = None
+        if concurrency is not None and concurrency > 1:
+            self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
     def process_message(self, message):
         message = msgpack.unpackb(message.value(), use_list=False)
         return message
@@ -52,14 +69,10 @@ class IngestConsumerWorker(AbstractBatchWorker):
                 message_type = message["type"]
                 projects_to_fetch.add(message["project_id"])
 
-                if message_type == "event":
-                    other_messages.append((process_event, message))
-                elif message_type == "attachment_chunk":
-                    attachment_chunks.append(message)
-                elif message_type == "attachment":
-                    other_messages.append((process_individual_attachment, message))
-                elif message_type == "user_report":
-                    other_messages.append((process_userreport, message))
+                if message_type == "attachment_chunk":
+                    attachment_chunks.append((message_type, message))
+                elif message_type in ("event", "attachment", "user_report"):
+                    other_messages.append((message_type, message))
                 else:
                     raise ValueError(f"Unknown message type: {message_type}")
                 metrics.incr(
@@ -72,16 +85,72 @@ class IngestConsumerWorker(AbstractBatchWorker):
         if attachment_chunks:
             # attachment_chunk messages need to be processed before attachment/event messages.
             with metrics.timer("ingest_consumer.process_attachment_chunk_batch"):
-                for attachment_chunk in attachment_chunks:
-                    process_attachment_chunk(attachment_chunk, projects=projects)
+                self._process_messages(attachment_chunks, projects)
 
         if other_messages:
             with metrics.timer("ingest_consumer.process_other_messages_batch"):
-                for processing_func, message in other_messages:
-                    processing_func(message, projects=projects)
+                self._process_messages(other_messages, projects)
+
+    def _process_messages(self, messages, projects):
+        """
+        Run ``(message_type, message)`` pairs and block until all of them
+        are done. Messages belonging to the same project are always processed
+        serially and in order, only distinct projects run concurrently.
+        """
+        if self.executor is None:
+            _process_partition(messages, projects)
+            return
+
+        partitions = defaultdict(list)
+        for message_type, message in messages:
+            partitions[message["project_id"]].append((message_type, message))
+
+        metrics.timing("ingest_consumer.flush.partitions", len(partitions))
+
+        def process_partition(partition):
+            mark_scope_as_unsafe()
+            try:
+                _process_partition(partition, projects)
+            finally:
+                # Pool threads outlive batches, so Django never closes the
+                # connections they open.
+                connections.close_all()
+
+        futures = [
+            self.executor.submit(process_partition, partition) for partition in partitions.values()
+        ]
+
+        # Wait for every partition before re-raising so that the batch is not
+        # committed while some of its messages are still in flight.
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
 
     def shutdown(self):
-        pass
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+def _process_partition(messages, projects):
+    """
+    Process ``(message_type, message)`` pairs in order. Consecutive events are
+    processed together so that their cache I/O can be batched.
+    """
+    for message_type, group in groupby(messages, key=itemgetter(0)):
+        group = [message for _, message in group]
+        if message_type == "event":
+            process_events(group, projects=projects)
+            continue
+
+        for message in group:
+            if message_type == "attachment_chunk":
+                process_attachment_chunk(message, projects=projects)
+            elif message_type == "attachment":
+                process_individual_attachment(message, projects=projects)
+            elif message_type == "user_report":
+                process_userreport(message, projects=projects)
 
 
 def trace_func(**span_kwargs):
@@ -99,16 +168,8 @@ def trace_func(**span_kwargs):
     return wrapper
 
 
-@metrics.wraps("ingest_consumer.process_event")
-def _do_process_event(message, projects):
-    payload = message["payload"]
-    start_time = float(message["start_time"])
-    event_id = message["event_id"]
-    project_id = int(message["project_id"])
-    remote_addr = message.get("remote_addr")
-    attachments = message.get("attachments") or ()
-
-    # check that we haven't already processed this event (a previous instance of the forwarder
+def _do_process_events(messages, projects):
+    # check that we haven't already processed these events (a previous instance of the forwarder
     # died before it could commit the event queue offset)
     #
     # XXX(markus): I believe this code is extremely broken:
@@ -122,60 +183,119 @@ def _do_process_event(message, projects):
     # This code has been ripped from the old python store endpoint. We're
     # keeping it around because it does provide some protection against
     # reprocessing good events if a single consumer is in a restart loop.
-    deduplication_key = f"ev:{project_id}:{event_id}"
-    if cache.get(deduplication_key) is not None:
-        logger.warning(
-            "pre-process-forwarder detected a duplicated event" " with id:%s for project:%s.",
-            event_id,
-            project_id,
+    deduplication_keys = [
+        "ev:{}:{}".format(int(message["project_id"]), message["event_id"]) for message in messages
+    ]
+    already_processed = cache.get_many(deduplication_keys)
+
+    jobs = []
+    seen_keys = set()
+    for message, deduplication_key in zip(messages, deduplication_keys):
+        event_id = message["event_id"]
+        project_id = int(message["project_id"])
+
+        # Duplicates may also occur within the same batch.
+        if deduplication_key in already_processed or deduplication_key in seen_keys:
+            logger.warning(
+                "pre-process-forwarder detected a duplicated event" " with id:%s for project:%s.",
+                event_id,
+                project_id,
+            )
+            continue  # message already processed do not reprocess
+
+        try:
+            project = projects[project_id]
+        except KeyError:
+            logger.error("Project for ingested event does not exist: %s", project_id)
+            continue
+
+        seen_keys.add(deduplication_key)
+
+        # Parse the JSON payload. This is required to call preprocess_event,
+        # which inspects stacktraces and plugins to decide where to route the
+        # event. The payload itself is put into the processing store raw, to
+        # avoid serializing it again.
+        # XXX: Do not use CanonicalKeyDict here. This may break preprocess_event
+        # which assumes that data passed in is a raw dictionary.
+        payload = message["payload"]
+        data = json.loads(payload)
+        jobs.append(
+            {
+                "message": message,
+                "payload": payload,
+                "data": data,
+                "project": project,
+                "deduplication_key": deduplication_key,
+            }
         )
-        return  # message already processed do not reprocess
 
-    try:
-        project = projects[project_id]
-    except KeyError:
-        logger.error("Project for ingested event does not exist: %s", project_id)
+    if not jobs:
         return
 
-    # Parse the JSON payload. This is required to compute the cache key and
-    # call process_event. The payload will be put into Kafka raw, to avoid
-    # serializing it again.
-    # XXX: Do not use CanonicalKeyDict here. This may break preprocess_event
-    # which assumes that data passed in is a raw dictionary.
-    data = json.loads(payload)
+    # Write all payloads and attachment metadata to the processing stores in
+    # one batch each instead of one round trip per event. The original
+    # payload bytes are stored as-is rather than serializing `data` again.
+    cache_keys = event_processing_store.store_many_raw(
+        [(job["project"].id, job["message"]["event_id"], job["payload"]) for job in jobs]
+    )
 
-    cache_key = event_processing_store.store(data)
+    attachments_by_key = {}
+    for job, cache_key in zip(jobs, cache_keys):
+        job["cache_key"] = cache_key
+        attachments = job["message"].get("attachments") or ()
+        if attachments:
+            attachments_by_key[cache_key] = [
+                CachedAttachment(type=attachment.pop("attachment_type"), **attachment)
+                for attachment in attachments
+            ]
+
+    if attachments_by_key:
+        attachment_cache.set_many(attachments_by_key, timeout=CACHE_TIMEOUT)
+
+    for job in jobs:
+        message = job["message"]
+
+        # Preprocess this event, which spawns either process_event or
+        # save_event. Pass data explicitly to avoid fetching it again from the
+        # cache.
+        with sentry_sdk.start_span(op="ingest_consumer.process_event.preprocess_event"):
+            preprocess_event(
+                cache_key=job["cache_key"],
+                data=job["data"],
+                start_time=float(message["start_time"]),
+                event_id=message["event_id"],
+                project=job["project"],
+            )
 
-    if attachments:
-        attachment_objects = [
-            CachedAttachment(type=attachment.pop("attachment_type"), **attachment)
-            for attachment in attachments
-        ]
+    # remember for an 1 hour that we saved these events (deduplication protection)
+    cache.set_many({job["deduplication_key"]: "" for job in jobs}, CACHE_TIMEOUT)
 
-        attachment_cache.set(cache_key, attachments=attachment_objects, timeout=CACHE_TIMEOUT)
-
-    # Preprocess this event, which spawns either process_event or
-    # save_event. Pass data explicitly to avoid fetching it again from the
-    # cache.
-    with sentry_sdk.start_span(op="ingest_consumer.process_event.preprocess_event"):
-        preprocess_event(
-            cache_key=cache_key,
-            data=data,
-            start_time=start_time,
-            event_id=event_id,
-            project=project,
+    # emit event_accepted once everything is done
+    for job in jobs:
+        event_accepted.send_robust(
+            ip=job["message"].get("remote_addr"),
+            data=job["data"],
+            project=job["project"],
+            sender=process_event,
         )
 
-    # remember for an 1 hour that we saved this event (deduplication protection)
-    cache.set(deduplication_key, "", CACHE_TIMEOUT)
 
-    # emit event_accepted once everything is done
-    event_accepted.send_robust(ip=remote_addr, data=data, project=project, sender=process_event)
+@trace_func(name="ingest_consumer.process_events")
+def process_events(messages, projects):
+    start = time.monotonic()
+    try:
+        with metrics.timer("ingest_consumer.process_event_batch") as metric_tags:
+            return _do_process_events(messages, projects)
+    finally:
+        # Keep reporting the per-event timing from before events were
+        # processed in batches, as the share of the batch of every event.
+        duration = (time.monotonic() - start) / max(len(messages), 1)
+        for _ in messages:
+            metrics.timing("ingest_consumer.process_event", duration, tags=metric_tags)
 
 
-@trace_func(name="ingest_consumer.process_event")
 def process_event(message, projects):
-    return _do_process_event(message, projects)
+    return process_events([message], projects)
 
 
 @trace_func(name="ingest_consumer.process_attachment_chunk")
@@ -267,13 +387,16 @@ def process_userreport(message, projects):
         return False
 
 
-def get_ingest_consumer(consumer_types, once=False, **options):
+def get_ingest_consumer(consumer_types, once=False, concurrency=None, **options):
     """
     Handles events coming via a kafka queue.
 
     The events should have already been processed (normalized... ) upstream (by Relay).
+
+    If ``concurrency`` is larger than one, each batch is processed by a pool of
+    that many threads, partitioned by project.
     """
     topic_names = {ConsumerType.get_topic_name(consumer_type) for consumer_type in consumer_types}
     return create_batching_kafka_consumer(
-        topic_names=topic_names, worker=IngestConsumerWorker(), **options
+        topic_names=topic_names, worker=IngestConsumerWorker(concurrency=concurrency), **options
     )
@@ -1,7 +1,16 @@
+from hashlib import sha1
+from operator import itemgetter
+
 from symbolic import SourceView
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.strings import codec_lookup
 
-__all__ = ["SourceCache", "SourceMapCache"]
+__all__ = ["SourceCache", "SourceMapCache", "ParsedViewCache", "parsed_view_cache"]
+
+# the maximum number of payload bytes whose parsed views are kept around
+# across events by a single worker
+PARSED_VIEW_CACHE_SIZE = 256 * 1024 * 1024
 
 
 def is_utf8(codec):
@@ -9,6 +18,20 @@ def is_utf8(codec):
     return name in ("utf-8", "ascii")
 
 
+def make_source_view(source, encoding=None):
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    # If an encoding is provided and it's not utf-8 compatible
+    # we try to re-encoding the source and create a source view
+    # from it.
+    elif encoding is not None and not is_utf8(encoding):
+        try:
+            source = source.decode(encoding).encode("utf-8")
+        except UnicodeError:
+            pass
+    return SourceView.from_bytes(source)
+
+
 class SourceCache:
     def __init__(self):
         self._cache = {}
@@ -39,17 +62,7 @@ class SourceCache:
         url = self._get_canonical_url(url)
 
         if not isinstance(source, SourceView):
-            if isinstance(source, str):
-                source = source.encode("utf-8")
-            # If an encoding is provided and it's not utf-8 compatible
-            # we try to re-encoding the source and create a source view
-            # from it.
-            elif encoding is not None and not is_utf8(encoding):
-                try:
-                    source = source.decode(encoding).encode("utf-8")
-                except UnicodeError:
-                    pass
-            source = SourceView.from_bytes(source)
+            source = make_source_view(source, encoding)
         self._cache[url] = source
 
     def add_error(self, url, error):
@@ -89,3 +102,36 @@ class SourceMapCache:
             sourcemap = self.get(sourcemap_url)
             return (sourcemap_url, sourcemap)
         return (None, None)
+
+
+class ParsedViewCache:
+    """
+    Holds parsed ``SourceView`` and ``SourceMapView`` objects across events,
+    so that a worker pays the parsing cost of a release artifact only once.
+
+    Views are keyed by the caller supplied key, e.g. release, dist and url,
+    plus a checksum of the raw payload, so a re-uploaded artifact is never
+    served stale. Entries are evicted least recently used first once the
+    payloads they were parsed from exceed ``max_size`` bytes.
+    """
+
+    def __init__(self, max_size=PARSED_VIEW_CACHE_SIZE):
+        self._cache = LRUCache(max_size, get_size=itemgetter(1))
+
+    def get_or_parse(self, key, body, parse):
+        key = key + (sha1(body).hexdigest(),)
+        entry = self._cache.get(key)
+        if entry is not None:
+            metrics.incr("sourcemaps.parsed_view_cache", tags={"result": "hit"})
+            return entry[0]
+
+        metrics.incr("sourcemaps.parsed_view_cache", tags={"result": "miss"})
+        view = parse(body)
+        self._cache.set(key, (view, len(body)))
+        return view
+
+    def clear(self):
+        self._cache.clear()
+
+
+parsed_view_cache = ParsedViewCache()
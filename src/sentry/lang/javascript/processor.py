@@ -41,7 +41,7 @@ from sentry.utils import metrics
 from sentry.utils.urls import non_standard_url_join
 from sentry.stacktraces.processing import StacktraceProcessor
 
-from .cache import SourceCache, SourceMapCache
+from .cache import SourceCache, SourceMapCache, make_source_view, parsed_view_cache
 
 # number of surrounding lines (on each side) to fetch
 LINES_OF_CONTEXT = 5
@@ -475,8 +475,16 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
             url, project=project, release=release, dist=dist, allow_scraping=allow_scraping
         )
         body = result.body
+
+    # data URIs carry their payload in the url, the checksum identifies them
+    cache_key = (
+        "sourcemap",
+        release and release.id,
+        dist and dist.id,
+        None if is_data_uri(url) else url,
+    )
     try:
-        return SourceMapView.from_json_bytes(body)
+        return parsed_view_cache.get_or_parse(cache_key, body, SourceMapView.from_json_bytes)
     except Exception as exc:
         # This is in debug because the product shows an error already.
         logger.debug(str(exc), exc_info=True)
@@ -887,7 +895,18 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
             # either way, there's no more for us to do here, since we don't have
             # a valid file to cache
             return
-        cache.add(filename, result.body, result.encoding)
+        source_view = parsed_view_cache.get_or_parse(
+            (
+                "source",
+                self.release and self.release.id,
+                self.dist and self.dist.id,
+                filename,
+                result.encoding,
+            ),
+            result.body,
+            lambda body: make_source_view(body, result.encoding),
+        )
+        cache.add(filename, source_view)
         cache.alias(result.url, filename)
 
         sourcemap_url = discover_sourcemap(result)
@@ -1,7 +1,9 @@
+import struct
 from threading import local
 
 from django.core.cache import caches, InvalidCacheBackendError
 
+from sentry import options
 from sentry.utils.cache import memoize
 from sentry.utils import json
 from sentry.utils.services import Service
@@ -22,6 +24,15 @@ json_dumps = json.JSONEncoder(
 
 json_loads = json._default_decoder.decode
 
+# Nodes written by ``NodeStorage._encode`` start with this version byte, which
+# neither legacy newline separated nodes (JSON) nor pickled nodes start with.
+ENCODING_V1 = b"\x01"
+
+# number of subkeys, followed by one (subkey length, payload length) entry
+# and the subkey itself per subkey
+_header_count = struct.Struct("<H")
+_header_entry = struct.Struct("<BI")
+
 
 class NodeStorage(local, Service):
     """
@@ -65,6 +76,7 @@ class NodeStorage(local, Service):
         "get_multi",
         "set",
         "set_subkeys",
+        "set_subkeys_multi",
         "cleanup",
         "validate",
         "bootstrap",
@@ -92,6 +104,10 @@ class NodeStorage(local, Service):
         if value is None:
             return None
 
+        if value[:1] == ENCODING_V1:
+            return self._decode_indexed(value, subkey)
+
+        # Newline separated nodes
         lines_iter = iter(value.splitlines())
         try:
             if subkey is not None:
@@ -112,6 +128,32 @@ class NodeStorage(local, Service):
         except StopIteration:
             return None
 
+    def _decode_indexed(self, value, subkey):
+        # Those keys should be statically known identifiers in the app, such as
+        # "unprocessed_event". The default payload has an empty subkey.
+        subkey = b"" if subkey is None else subkey.encode("ascii")
+
+        view = memoryview(value)
+        (count,) = _header_count.unpack_from(view, 1)
+        pos = 1 + _header_count.size
+        offset = 0
+        found = None
+
+        for _ in range(count):
+            subkey_length, payload_length = _header_entry.unpack_from(view, pos)
+            pos += _header_entry.size
+            if found is None and view[pos : pos + subkey_length] == subkey:
+                found = (offset, payload_length)
+            pos += subkey_length
+            offset += payload_length
+
+        if found is None:
+            return None
+
+        # ``pos`` now points to the first payload, only copy the one we need
+        start = pos + found[0]
+        return json_loads(bytes(view[start : start + found[1]]))
+
     def _get_bytes(self, id):
         """
         >>> nodestore._get_bytes('key1')
@@ -178,19 +220,49 @@ class NodeStorage(local, Service):
         independently. A `None` key must always be present which is served as
         the "default" subkey (the regular event payload).
 
+        With the ``nodestore.indexed-encoding`` option, the encoding starts
+        with a version byte and a header listing every subkey with the length
+        of its payload, followed by the payloads. This allows reading a
+        single subkey without scanning the others, but readers that predate
+        it cannot decode it, so the option must only be enabled once every
+        reader can.
+
         >>> _encode({"unprocessed": {}, None: {"stacktrace": {}}})
         b'{"stacktrace": {}}\nunprocessed\n{}'
         """
-        lines = [json_dumps(data.pop(None)).encode("utf8")]
+        if not options.get("nodestore.indexed-encoding"):
+            lines = [json_dumps(data.pop(None)).encode("utf8")]
+            for key, value in data.items():
+                lines.append(key.encode("ascii"))
+                lines.append(json_dumps(value).encode("utf8"))
+
+            return b"\n".join(lines)
+
+        subkeys = [b""]
+        payloads = [json_dumps(data.pop(None)).encode("utf8")]
         for key, value in data.items():
-            lines.append(key.encode("ascii"))
-            lines.append(json_dumps(value).encode("utf8"))
+            subkeys.append(key.encode("ascii"))
+            payloads.append(json_dumps(value).encode("utf8"))
 
-        return b"\n".join(lines)
+        header = [ENCODING_V1, _header_count.pack(len(payloads))]
+        for subkey, payload in zip(subkeys, payloads):
+            header.append(_header_entry.pack(len(subkey), len(payload)))
+            header.append(subkey)
+
+        return b"".join(header + payloads)
+
+    def _get_platform(self, data):
+        """
+        Returns the platform of a node's default payload, which backends may
+        use to pick a compression dictionary.
+        """
+        if isinstance(data, dict):
+            return data.get("platform")
+        return None
 
-    def _set_bytes(self, id, data, ttl=None):
+    def _set_bytes(self, id, data, ttl=None, platform=None):
         """
-        >>> nodestore.set('key1', b"{'foo': 'bar'}")
+        >>> nodestore._set_bytes('key1', b"{'foo': 'bar'}", platform='python')
         """
         raise NotImplementedError
 
@@ -218,11 +290,42 @@ class NodeStorage(local, Service):
         {'foo': 'bam'}
         """
         cache_item = data.get(None)
+        platform = self._get_platform(cache_item)
         bytes_data = self._encode(data)
-        self._set_bytes(id, bytes_data, ttl=ttl)
+        self._set_bytes(id, bytes_data, ttl=ttl, platform=platform)
         # set cache only after encoding and write to nodestore has succeeded
         self._set_cache_item(id, cache_item)
 
+    def _set_bytes_multi(self, items, ttl=None, platforms=None):
+        """
+        >>> nodestore._set_bytes_multi({
+        ...    'key1': b"{'foo': 'bar'}",
+        ...    'key2': b"{'foo': 'baz'}",
+        ... }, platforms={'key1': 'python'})
+        """
+        platforms = platforms or {}
+        for id, data in items.items():
+            self._set_bytes(id, data, ttl=ttl, platform=platforms.get(id))
+
+    def set_subkeys_multi(self, items, ttl=None):
+        """
+        Set values and their subkeys for multiple ids at once.
+
+        Note: This is not guaranteed to be atomic and may result in a partial
+        write.
+
+        >>> nodestore.set_subkeys_multi({
+        ...    'key1': {None: {'foo': 'bar'}},
+        ...    'key2': {None: {'foo': 'baz'}, "reprocessing": {'foo': 'bam'}},
+        ... })
+        """
+        cache_items = {id: data.get(None) for id, data in items.items()}
+        platforms = {id: self._get_platform(data) for id, data in cache_items.items()}
+        bytes_data = {id: self._encode(data) for id, data in items.items()}
+        self._set_bytes_multi(bytes_data, ttl=ttl, platforms=platforms)
+        # set cache only after encoding and write to nodestore has succeeded
+        self._set_cache_items({id: data for id, data in cache_items.items() if data})
+
     def cleanup(self, cutoff_timestamp):
         raise NotImplementedError
 
@@ -1,13 +1,13 @@
 import os
 import struct
 from threading import Lock
-import zstandard
 import zlib
 
 from google.cloud import bigtable
 from google.cloud.bigtable.row_set import RowSet
 from django.utils import timezone
 
+from sentry.nodestore import compression as nodestore_compression
 from sentry.nodestore.base import NodeStorage
 
 
@@ -15,13 +15,19 @@ _connection_lock = Lock()
 _connection_cache = {}
 
 
-def _compress_data(data, compression):
+class BigtableError(Exception):
+    pass
+
+
+def _compress_data(data, compression, platform=None):
     flags = 0
+    dict_id = 0
 
     if compression == "zstd":
         flags |= BigtableNodeStorage._FLAG_COMPRESSED_ZSTD
-        cctx = zstandard.ZstdCompressor()
-        data = cctx.compress(data)
+        data, dict_id = nodestore_compression.compress(data, platform=platform)
+        if dict_id:
+            flags |= BigtableNodeStorage._FLAG_ZSTD_DICTIONARY
     elif compression is True or compression == "zlib":
         flags |= BigtableNodeStorage._FLAG_COMPRESSED_ZLIB
         data = zlib.compress(data)
@@ -30,17 +36,16 @@ def _compress_data(data, compression):
     else:
         raise ValueError(f"invalid argument for compression: {compression!r}")
 
-    return data, flags
+    return data, flags, dict_id
 
 
-def _decompress_data(data, flags):
+def _decompress_data(data, flags, dict_id=0):
     # Check for a compression flag on, if so
     # decompress the data.
     if flags & BigtableNodeStorage._FLAG_COMPRESSED_ZLIB:
         return zlib.decompress(data)
     elif flags & BigtableNodeStorage._FLAG_COMPRESSED_ZSTD:
-        cctx = zstandard.ZstdDecompressor()
-        return cctx.decompress(data)
+        return nodestore_compression.decompress(data, dict_id)
     else:
         return data
 
@@ -77,7 +82,9 @@ class BigtableNodeStorage(NodeStorage):
         valid for reading + returning)
     :param compression: A boolean whether to enable zlib-compression, the
         string "zstd" to use zstd instead, or a callable that takes `data`
-        (event JSON as dict) and returns either of those values.
+        (event JSON as dict) and returns either of those values. With zstd,
+        nodes are compressed with the platform's trained dictionary when the
+        ``nodestore.zstd-dictionaries`` option is enabled.
 
         Can take a callable so we can opt projects in and out of zstd while we
         do the migration.
@@ -100,6 +107,11 @@ class BigtableNodeStorage(NodeStorage):
 
     _FLAG_COMPRESSED_ZLIB = 1 << 0
     _FLAG_COMPRESSED_ZSTD = 1 << 1
+    # The flags are followed by the id of the zstd dictionary
+    _FLAG_ZSTD_DICTIONARY = 1 << 2
+
+    _flags = struct.Struct("B")
+    _flags_with_dictionary = struct.Struct("<BI")
 
     def __init__(
         self,
@@ -165,16 +177,34 @@ class BigtableNodeStorage(NodeStorage):
 
         # Read our flags
         flags = 0
+        dict_id = 0
         if self.flags_column in columns:
-            flags = struct.unpack("B", columns[self.flags_column][0].value)[0]
+            value = columns[self.flags_column][0].value
+            (flags,) = self._flags.unpack_from(value)
+            if flags & self._FLAG_ZSTD_DICTIONARY:
+                flags, dict_id = self._flags_with_dictionary.unpack(value)
 
-        return _decompress_data(data, flags)
+        return _decompress_data(data, flags, dict_id)
 
-    def _set_bytes(self, id, data, ttl=None):
-        row = self.encode_row(id, data, ttl)
+    def _set_bytes(self, id, data, ttl=None, platform=None):
+        row = self.encode_row(id, data, ttl, platform=platform)
         row.commit()
 
-    def encode_row(self, id, data, ttl=None):
+    def _set_bytes_multi(self, items, ttl=None, platforms=None):
+        platforms = platforms or {}
+        if len(items) == 1:
+            for id, data in items.items():
+                self._set_bytes(id, data, ttl=ttl, platform=platforms.get(id))
+            return
+
+        rows = [
+            self.encode_row(id, data, ttl, platform=platforms.get(id)) for id, data in items.items()
+        ]
+        for status in self.connection.mutate_rows(rows):
+            if status.code != 0:
+                raise BigtableError(status.message)
+
+    def encode_row(self, id, data, ttl=None, platform=None):
         row = self.connection.row(id)
         # Call to delete is just a state mutation,
         # and in this case is just used to clear all columns
@@ -206,18 +236,26 @@ class BigtableNodeStorage(NodeStorage):
             )
 
         # Track flags for metadata about this row.
-        # This only flag we're tracking now is whether compression
-        # is on or not for the data column.
+        # The only flags we're tracking now are whether compression
+        # is on or not for the data column, and with which dictionary.
         flags = 0
 
-        data, compression_flag = _compress_data(data, self.compression)
+        data, compression_flag, dict_id = _compress_data(data, self.compression, platform)
         flags |= compression_flag
 
         # Only need to write the column at all if any flags
-        # are enabled. And if so, pack it into a single byte.
-        if flags:
+        # are enabled. And if so, pack it into a single byte, followed
+        # by the dictionary id if there is one.
+        if dict_id:
+            row.set_cell(
+                self.column_family,
+                self.flags_column,
+                self._flags_with_dictionary.pack(flags, dict_id),
+                timestamp=ts,
+            )
+        elif flags:
             row.set_cell(
-                self.column_family, self.flags_column, struct.pack("B", flags), timestamp=ts
+                self.column_family, self.flags_column, self._flags.pack(flags), timestamp=ts
             )
 
         assert len(data) <= self.max_size
@@ -0,0 +1,206 @@
+"""
+zstd compression of node payloads, optionally with dictionaries trained per
+platform on sampled payloads.
+
+Event payloads are small JSON documents and compress poorly on their own, as
+zstd has little history to find repetitions in. A dictionary trained on
+payloads of the same platform provides that history up front.
+
+Dictionaries are stored as ``NodeDictionary`` rows, whose id is the zstd
+dictionary id that backends store next to every node compressed with it.
+Dictionaries are immutable: training a new dictionary for a platform only
+changes which dictionary new nodes are written with.
+
+Compression contexts are expensive to set up and not thread safe, so they are
+kept per thread and dictionary.
+"""
+
+import base64
+import random
+import threading
+import time
+
+import zstandard
+from django.conf import settings
+
+from sentry import options
+from sentry.constants import VALID_PLATFORMS
+from sentry.utils import metrics
+from sentry.utils.redis import redis_clusters
+
+COMPRESSION_LEVEL = 3
+
+# zstd's default dictionary size, which works well for samples of a few KB.
+DICTIONARY_SIZE = 110 * 1024
+
+# Number of sampled payloads kept per platform, and needed to train a
+# dictionary.
+MAX_SAMPLES = 2000
+MIN_SAMPLES = 200
+
+# Sampled payloads are truncated to this many bytes. The start of a payload
+# holds the structure repeated across events, which is what dictionaries are
+# trained on, and the cap bounds the memory used by the samples.
+MAX_SAMPLE_SIZE = 16 * 1024
+
+# How long every process keeps using a platform's dictionary before checking
+# whether a newer one has been trained.
+ACTIVE_DICTIONARY_TTL = 300
+
+_local = threading.local()
+
+# dictionary id -> ZstdCompressionDict, populated lazily. Dictionaries never
+# change, so they can be kept for the lifetime of the process.
+_dictionaries = {}
+
+# platform -> (expires_at, dictionary id)
+_active_dictionaries = {}
+
+_SAMPLE_PLATFORMS_KEY = "nodestore:zstd-samples"
+
+
+def _get_samples_key(platform):
+    return f"nodestore:zstd-samples:{platform}"
+
+
+def _get_samples_cluster():
+    return redis_clusters.get(settings.SENTRY_NODESTORE_SAMPLES_REDIS_CLUSTER)
+
+
+def _normalize_platform(platform):
+    if platform in VALID_PLATFORMS:
+        return platform
+    return "other"
+
+
+def get_dictionary(dict_id):
+    try:
+        return _dictionaries[dict_id]
+    except KeyError:
+        pass
+
+    from sentry.nodestore.models import NodeDictionary
+
+    data = NodeDictionary.objects.get(id=dict_id).data
+    _dictionaries[dict_id] = dictionary = zstandard.ZstdCompressionDict(base64.b64decode(data))
+    return dictionary
+
+
+def get_active_dictionary_id(platform):
+    """
+    Returns the id of the dictionary new nodes of ``platform`` are compressed
+    with, or ``0`` for none.
+    """
+    if not options.get("nodestore.zstd-dictionaries"):
+        return 0
+
+    platform = _normalize_platform(platform)
+    now = time.time()
+    try:
+        expires_at, dict_id = _active_dictionaries[platform]
+        if expires_at > now:
+            return dict_id
+    except KeyError:
+        pass
+
+    from sentry.nodestore.models import NodeDictionary
+
+    dict_id = (
+        NodeDictionary.objects.filter(platform=platform)
+        .order_by("-id")
+        .values_list("id", flat=True)
+        .first()
+    ) or 0
+    _active_dictionaries[platform] = (now + ACTIVE_DICTIONARY_TTL, dict_id)
+    return dict_id
+
+
+def _get_context(kind, dict_id):
+    try:
+        contexts = getattr(_local, kind)
+    except AttributeError:
+        contexts = {}
+        setattr(_local, kind, contexts)
+
+    try:
+        return contexts[dict_id]
+    except KeyError:
+        pass
+
+    dictionary = get_dictionary(dict_id) if dict_id else None
+    if kind == "compressors":
+        context = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=dictionary)
+    else:
+        context = zstandard.ZstdDecompressor(dict_data=dictionary)
+    contexts[dict_id] = context
+    return context
+
+
+def compress(data, platform=None):
+    """
+    Compress ``data`` with the active dictionary of ``platform`` and sample it
+    for training. Returns the compressed data and the id of the dictionary
+    used, ``0`` for none.
+    """
+    if platform is None:
+        dict_id = 0
+    else:
+        sample(data, platform)
+        dict_id = get_active_dictionary_id(platform)
+    return _get_context("compressors", dict_id).compress(data), dict_id
+
+
+def decompress(data, dict_id=0):
+    return _get_context("decompressors", dict_id).decompress(data)
+
+
+def sample(data, platform):
+    """
+    Keep the start of the uncompressed payload ``data`` as a training sample
+    for the dictionaries of ``platform``, at the configured sample rate.
+    """
+    sample_rate = options.get("nodestore.zstd-dictionary-sample-rate")
+    if not sample_rate or random.random() >= sample_rate:
+        return
+
+    platform = _normalize_platform(platform)
+    key = _get_samples_key(platform)
+    client = _get_samples_cluster()
+    with client.pipeline(transaction=False) as pipe:
+        pipe.lpush(key, data[:MAX_SAMPLE_SIZE])
+        pipe.ltrim(key, 0, MAX_SAMPLES - 1)
+        pipe.execute()
+    client.sadd(_SAMPLE_PLATFORMS_KEY, platform)
+
+
+def get_sampled_platforms():
+    client = _get_samples_cluster()
+    return sorted(p.decode("utf-8") for p in client.smembers(_SAMPLE_PLATFORMS_KEY))
+
+
+def train_dictionary(platform):
+    """
+    Train a new dictionary for ``platform`` from its sampled payloads. Returns
+    the new ``NodeDictionary`` or ``None`` if there were not enough samples.
+    """
+    from django.db import transaction
+    from sentry.nodestore.models import NodeDictionary
+
+    platform = _normalize_platform(platform)
+    samples = _get_samples_cluster().lrange(_get_samples_key(platform), 0, -1)
+    if len(samples) < MIN_SAMPLES:
+        return None
+
+    with transaction.atomic(using=NodeDictionary.objects.db):
+        # The row is created first so that its id can be embedded as the
+        # dictionary id.
+        node_dictionary = NodeDictionary.objects.create(platform=platform)
+        assert 0 < node_dictionary.id < 2 ** 32
+        with metrics.timer("nodestore.zstd.train_dictionary", tags={"platform": platform}):
+            dictionary = zstandard.train_dictionary(
+                DICTIONARY_SIZE, samples, dict_id=node_dictionary.id, level=COMPRESSION_LEVEL
+            )
+        node_dictionary.data = base64.b64encode(dictionary.as_bytes()).decode("utf-8")
+        node_dictionary.save(update_fields=["data"])
+
+    return node_dictionary
@@ -1,19 +1,40 @@
+import base64
 import math
 import logging
 import pickle
 
+from django.db import connections, router
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
-from sentry.nodestore.base import NodeStorage
+from sentry.nodestore import compression as nodestore_compression
+from sentry.nodestore.base import ENCODING_V1, NodeStorage
 from sentry.utils.strings import decompress, compress
 
 from .models import Node
 
 logger = logging.getLogger("sentry")
 
+# Prefix of zstd compressed nodes, followed by the dictionary id and the
+# base64 encoded data. zlib compressed nodes are plain base64, which never
+# contains a colon.
+ZSTD_PREFIX = "zstd:"
+
 
 class DjangoNodeStorage(NodeStorage):
+    """
+    A Postgres-based backend for storing node data.
+
+    :param compression: "zlib" or "zstd". With zstd, nodes are compressed with
+        the platform's trained dictionary when the ``nodestore.zstd-dictionaries``
+        option is enabled. Nodes can always be read regardless of this setting.
+    """
+
+    def __init__(self, compression="zlib"):
+        if compression not in ("zlib", "zstd"):
+            raise ValueError(f"invalid argument for compression: {compression!r}")
+        self.compression = compression
+
     def delete(self, id):
         Node.objects.filter(id=id).delete()
         self._delete_cache_item(id)
@@ -23,7 +44,7 @@ class DjangoNodeStorage(NodeStorage):
             return None
 
         try:
-            if value.startswith(b"{"):
+            if value.startswith((b"{", ENCODING_V1)):
                 return NodeStorage._decode(self, value, subkey=subkey)
 
             if subkey is None:
@@ -34,22 +55,86 @@ class DjangoNodeStorage(NodeStorage):
             logger.exception(e)
             return {}
 
+    def _compress(self, data, platform=None):
+        if self.compression == "zstd":
+            data, dict_id = nodestore_compression.compress(data, platform=platform)
+            return f"{ZSTD_PREFIX}{dict_id}:{base64.b64encode(data).decode('utf-8')}"
+        return compress(data)
+
+    def _decompress(self, value):
+        if value.startswith(ZSTD_PREFIX):
+            dict_id, data = value[len(ZSTD_PREFIX) :].split(":", 1)
+            return nodestore_compression.decompress(base64.b64decode(data), int(dict_id))
+        return decompress(value)
+
     def _get_bytes(self, id):
         try:
             data = Node.objects.get(id=id).data
-            return decompress(data)
+            return self._decompress(data)
         except Node.DoesNotExist:
             return None
 
     def _get_bytes_multi(self, id_list):
-        return {n.id: decompress(n.data) for n in Node.objects.filter(id__in=id_list)}
+        return {n.id: self._decompress(n.data) for n in Node.objects.filter(id__in=id_list)}
 
     def delete_multi(self, id_list):
         Node.objects.filter(id__in=id_list).delete()
         self._delete_cache_items(id_list)
 
-    def _set_bytes(self, id, data, ttl=None):
-        create_or_update(Node, id=id, values={"data": compress(data), "timestamp": timezone.now()})
+    def _get_timestamp(self, id, now):
+        from sentry.eventstore.compressor import SHARED_BLOB_ID_PREFIX, SHARED_BLOB_REFRESH_INTERVAL
+
+        # Shared blobs are only written again once per refresh interval while
+        # events keep referencing them. Date them at the end of that interval
+        # so that cleanup, which goes by timestamp, keeps them as long as
+        # every event written in the meantime.
+        if id.startswith(SHARED_BLOB_ID_PREFIX):
+            return now + SHARED_BLOB_REFRESH_INTERVAL
+        return now
+
+    def _set_bytes(self, id, data, ttl=None, platform=None):
+        create_or_update(
+            Node,
+            id=id,
+            values={
+                "data": self._compress(data, platform),
+                "timestamp": self._get_timestamp(id, timezone.now()),
+            },
+        )
+
+    def _set_bytes_multi(self, items, ttl=None, platforms=None):
+        if not items:
+            return
+
+        platforms = platforms or {}
+
+        # Upsert all rows with a single statement. Rows are written in id
+        # order so that concurrent writers cannot deadlock on each other.
+        now = timezone.now()
+        params = []
+        for id, data in sorted(items.items()):
+            params.extend(
+                (id, self._compress(data, platforms.get(id)), self._get_timestamp(id, now))
+            )
+
+        meta = Node._meta
+        columns = [meta.get_field(name).column for name in ("id", "data", "timestamp")]
+        connection = connections[router.db_for_write(Node)]
+        quote = connection.ops.quote_name
+        sql = (
+            "INSERT INTO {table} ({id}, {data}, {timestamp}) VALUES {values} "
+            "ON CONFLICT ({id}) DO UPDATE SET "
+            "{data} = EXCLUDED.{data}, {timestamp} = EXCLUDED.{timestamp}"
+        ).format(
+            table=quote(meta.db_table),
+            id=quote(columns[0]),
+            data=quote(columns[1]),
+            timestamp=quote(columns[2]),
+            values=", ".join(["(%s, %s, %s)"] * len(items)),
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
 
     def cleanup(self, cutoff_timestamp):
         from sentry.db.deletion import BulkDeleteQuery
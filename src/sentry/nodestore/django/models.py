@@ -1,7 +1,7 @@
 from django.db import models
 from django.utils import timezone
 
-from sentry.db.models import BaseModel, sane_repr
+from sentry.db.models import BaseModel, Model, sane_repr
 
 
 class Node(BaseModel):
@@ -17,3 +17,26 @@ class Node(BaseModel):
 
     class Meta:
         app_label = "nodestore"
+
+
+class NodeDictionary(Model):
+    """
+    A zstd dictionary trained on sampled node payloads of one platform.
+
+    Dictionaries are shared by all nodestore backends and are never modified
+    or deleted, as nodes compressed with them may be read for as long as they
+    are retained. The id doubles as the zstd dictionary id.
+    """
+
+    __core__ = False
+
+    platform = models.CharField(max_length=64)
+    # base64 encoded dictionary content
+    data = models.TextField()
+    date_added = models.DateTimeField(default=timezone.now)
+
+    __repr__ = sane_repr("platform", "date_added")
+
+    class Meta:
+        app_label = "nodestore"
+        db_table = "nodestore_nodedictionary"
@@ -184,9 +184,12 @@ register("snuba.search.chunk-growth-rate", default=1.5)
 register("snuba.search.max-chunk-size", default=2000)
 register("snuba.search.max-total-chunk-time-seconds", default=30.0)
 register("snuba.search.hits-sample-size", default=100)
+# How long the state of a search is kept for its next page, 0 to disable
+register("snuba.search.cursor-cache-ttl", default=0)
 register("snuba.track-outcomes-sample-rate", default=0.0)
 
-# The percentage of tagkeys that we want to cache. Set to 1.0 in order to cache everything, <=0.0 to stop caching
+# The percentage of tag key and top value queries that we want to cache when the request asks for
+# it. Set to 1.0 in order to cache everything, 0.0 to stop caching
 register("snuba.tagstore.cache-tagkeys-rate", default=0.0, flags=FLAG_PRIORITIZE_DISK)
 
 # Kafka Publisher
@@ -250,6 +253,20 @@ register("nodedata.cache-on-save", default=False, flags=FLAG_PRIORITIZE_DISK)
 # Use nodestore for eventstore.get_events
 register("eventstore.use-nodestore", default=False, flags=FLAG_PRIORITIZE_DISK)
 
+# Write nodes with an indexed header of their subkeys. Only enable once every
+# reader decodes the indexed encoding.
+register("nodestore.indexed-encoding", default=False, flags=FLAG_PRIORITIZE_DISK)
+
+# Compress nodes with per-platform trained zstd dictionaries, for nodestore
+# backends configured to use zstd
+register("nodestore.zstd-dictionaries", default=False, flags=FLAG_PRIORITIZE_DISK)
+# Rate at which node payloads are sampled to train those dictionaries
+register("nodestore.zstd-dictionary-sample-rate", default=0.0, flags=FLAG_PRIORITIZE_DISK)
+
+# Store repeating event interfaces (modules, debug images and contexts) as
+# shared nodestore blobs
+register("store.nodestore-deduplicate-interfaces", default=False, flags=FLAG_PRIORITIZE_DISK)
+
 # Alerts / Workflow incremental rollout rate. Tied to feature handlers in getsentry
 register("workflow.rollout-rate", default=0, flags=FLAG_PRIORITIZE_DISK)
 
@@ -80,8 +80,10 @@ instead of group deletion is:
 import hashlib
 import logging
 import sentry_sdk
+from collections import defaultdict
 from sentry.utils import json
 
+from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
 
 from sentry import nodestore, eventstore, models, options
@@ -139,30 +141,126 @@ def backup_unprocessed_event(project, data):
 
 
 def reprocess_event(project_id, event_id, start_time):
+    reprocess_events(project_id, [event_id], start_time)
 
-    from sentry.tasks.store import preprocess_event_from_reprocessing
-    from sentry.ingest.ingest_consumer import CACHE_TIMEOUT
 
-    with sentry_sdk.start_span(op="reprocess_events.nodestore.get"):
-        node_id = Event.generate_node_id(project_id, event_id)
-        data = nodestore.get(node_id, subkey="unprocessed")
-        if data is None:
-            node_id = _generate_unprocessed_event_node_id(project_id=project_id, event_id=event_id)
-            data = nodestore.get(node_id)
+def reprocess_events(project_id, event_ids, start_time, group_id=None):
+    """
+    Enqueue the events ``event_ids`` of a project into preprocess_event. Their
+    unprocessed payloads, metadata and attachments are fetched in bulk.
 
-    with sentry_sdk.start_span(op="reprocess_events.eventstore.get"):
-        event = eventstore.get_event_by_id(project_id, event_id)
+    Events that cannot be reprocessed are marked as reprocessed right away so
+    that reprocessing of their group ``group_id`` can finish. When the task
+    runs out of time, the events it did not get to are handed to a new task.
+    """
+    from sentry.tasks.reprocessing2 import enqueue_reprocess_events
+
+    with sentry_sdk.start_span(op="reprocess_events.nodestore.get_multi"):
+        data_by_event_id = _get_unprocessed_events(project_id, event_ids)
+
+    with sentry_sdk.start_span(op="reprocess_events.eventstore.get_unfetched_events"):
+        events = {}
+        for event in eventstore.get_unfetched_events(
+            eventstore.Filter(project_ids=[project_id], event_ids=list(event_ids)),
+            limit=len(event_ids),
+            referrer="reprocessing2.reprocess_events",
+        ):
+            events.setdefault(event.event_id, event)
+
+        # We have no real data for reprocessing those. Fetch their processed
+        # payloads at once instead of one by one further below.
+        eventstore.bind_nodes(
+            [event for event_id, event in events.items() if data_by_event_id.get(event_id) is None]
+        )
 
-    if event is None:
-        logger.error(
-            "reprocessing2.event.not_found", extra={"project_id": project_id, "event_id": event_id}
+    with sentry_sdk.start_span(op="reprocess_events.get_attachments"):
+        attachments = defaultdict(list)
+        queryset = models.EventAttachment.objects.filter(
+            project_id=project_id, event_id__in=list(events)
         )
-        return
+        for attachment in queryset:
+            attachments[attachment.event_id].append(attachment)
+        files = {
+            f.id: f
+            for f in models.File.objects.filter(
+                id__in=[
+                    a.file_id
+                    for event_attachments in attachments.values()
+                    for a in event_attachments
+                ]
+            )
+        }
+
+    for i, event_id in enumerate(event_ids):
+        event = events.get(event_id)
+        if event is None:
+            logger.error(
+                "reprocessing2.event.not_found",
+                extra={"project_id": project_id, "event_id": event_id},
+            )
+            mark_event_reprocessed(group_id=group_id, project_id=project_id)
+            continue
+
+        try:
+            _reprocess_event(
+                event,
+                data_by_event_id.get(event_id),
+                attachments.get(event_id, ()),
+                files,
+                start_time,
+            )
+        except SoftTimeLimitExceeded:
+            # The event that ran out of time is given up on, so that an event
+            # that always does cannot keep the group from finishing.
+            logger.error(
+                "reprocessing2.event.timeout",
+                extra={"project_id": project_id, "event_id": event_id},
+            )
+            mark_event_reprocessed(group_id=event.group_id, project_id=project_id)
+            if event_ids[i + 1 :]:
+                enqueue_reprocess_events(project_id, event_ids[i + 1 :], start_time, group_id)
+            raise
+        except Exception:
+            # Do not hold up the other events of the batch
+            logger.exception(
+                "reprocessing2.event.failed",
+                extra={"project_id": project_id, "event_id": event_id},
+            )
+            mark_event_reprocessed(group_id=event.group_id, project_id=project_id)
+
+
+def _get_unprocessed_events(project_id, event_ids):
+    """
+    Returns the unprocessed payloads of ``event_ids`` by event ID, ``None``
+    for missing ones.
+    """
+    node_ids = {Event.generate_node_id(project_id, event_id): event_id for event_id in event_ids}
+    rv = {
+        node_ids[node_id]: data
+        for node_id, data in nodestore.get_multi(list(node_ids), subkey="unprocessed").items()
+    }
+
+    # Payloads saved by `save_unprocessed_event`
+    node_ids = {
+        _generate_unprocessed_event_node_id(project_id=project_id, event_id=event_id): event_id
+        for event_id in event_ids
+        if rv.get(event_id) is None
+    }
+    if node_ids:
+        for node_id, data in nodestore.get_multi(list(node_ids)).items():
+            rv[node_ids[node_id]] = data
+
+    return rv
+
+
+def _reprocess_event(event, data, attachments, files, start_time):
+    from sentry.tasks.store import preprocess_event_from_reprocessing
+    from sentry.ingest.ingest_consumer import CACHE_TIMEOUT
 
     if data is None:
         logger.error(
             "reprocessing2.reprocessing_nodestore.not_found",
-            extra={"project_id": project_id, "event_id": event_id},
+            extra={"project_id": event.project_id, "event_id": event.event_id},
         )
         # We have no real data for reprocessing. We assume this event goes
         # straight to save_event, and hope that the event data can be
@@ -178,12 +276,9 @@ def reprocess_event(project_id, event_id, start_time):
     cache_key = event_processing_store.store(data)
 
     # Step 2: Copy attachments into attachment cache
-    queryset = models.EventAttachment.objects.filter(project_id=project_id, event_id=event_id)
-    files = {f.id: f for f in models.File.objects.filter(id__in=[ea.file_id for ea in queryset])}
-
     attachment_objects = []
 
-    for attachment_id, attachment in enumerate(queryset):
+    for attachment_id, attachment in enumerate(attachments):
         with sentry_sdk.start_span(op="reprocess_event._copy_attachment_into_cache") as span:
             span.set_data("attachment_id", attachment.id)
             attachment_objects.append(
@@ -201,7 +296,7 @@ def reprocess_event(project_id, event_id, start_time):
             attachment_cache.set(cache_key, attachments=attachment_objects, timeout=CACHE_TIMEOUT)
 
     preprocess_event_from_reprocessing(
-        cache_key=cache_key, start_time=start_time, event_id=event_id
+        cache_key=cache_key, start_time=start_time, event_id=event.event_id
     )
 
 
@@ -260,20 +355,26 @@ def _get_info_reprocessed_key(group_id):
     return f"re2:info:{group_id}"
 
 
-def mark_event_reprocessed(data):
+def mark_event_reprocessed(data=None, group_id=None, project_id=None):
     """
     This function is supposed to be unconditionally called when an event has
     finished reprocessing, regardless of whether it has been saved or not.
+
+    Events that failed before being sent to reprocessing have no reprocessed
+    ``data`` and are marked by their original ``group_id`` and ``project_id``
+    instead.
     """
-    group_id = _get_original_issue_id(data)
+    if data is not None:
+        group_id = _get_original_issue_id(data)
+        project_id = data["project"]
     if group_id is None:
         return
 
-    key = _get_sync_counter_key(_get_original_issue_id(data))
+    key = _get_sync_counter_key(group_id)
     if _get_sync_redis_client().decr(key) == 0:
         from sentry.tasks.reprocessing2 import finish_reprocessing
 
-        finish_reprocessing.delay(project_id=data["project"], group_id=group_id)
+        finish_reprocessing.delay(project_id=project_id, group_id=group_id)
 
 
 def start_group_reprocessing(
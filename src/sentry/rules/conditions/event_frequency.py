@@ -48,8 +48,17 @@ class BaseEventFrequencyCondition(EventCondition):
 
     label = NotImplemented  # subclass must implement
 
+    # The ``read_batch`` argument and model of the TSDB read answering
+    # ``query_hook``, which allows rates to be read for multiple conditions at
+    # once with ``get_rates``. ``None`` if the condition must be queried on its
+    # own.
+    tsdb_read = None
+    tsdb_model = None
+
     def __init__(self, *args, **kwargs):
         self.tsdb = kwargs.pop("tsdb", tsdb)
+        # Rates read ahead of time with ``get_rates``.
+        self.rates = kwargs.pop("rates", None)
 
         super().__init__(*args, **kwargs)
 
@@ -69,20 +78,33 @@ class BaseEventFrequencyCondition(EventCondition):
 
     def query(self, event, start, end, environment_id):
         query_result = self.query_hook(event, start, end, environment_id)
+        self.record_query(batched=False)
+        return query_result
+
+    def record_query(self, batched):
         metrics.incr(
             "rules.conditions.queried_snuba",
             tags={
                 "condition": re.sub("(?!^)([A-Z]+)", r"_\1", self.__class__.__name__).lower(),
                 "is_created_on_project_creation": self.is_guessed_to_be_created_on_project_creation,
+                "batched": batched,
             },
         )
-        return query_result
 
     def query_hook(self, event, start, end, environment_id):
         """"""
         raise NotImplementedError  # subclass must implement
 
     def get_rate(self, event, interval, environment_id):
+        if self.rates is not None:
+            try:
+                rate = self.rates[(type(self), interval, environment_id)]
+            except KeyError:
+                pass
+            else:
+                self.record_query(batched=True)
+                return rate
+
         _, duration = intervals[interval]
         end = timezone.now()
         return self.query(event, end - duration, end, environment_id=environment_id)
@@ -101,6 +123,8 @@ class BaseEventFrequencyCondition(EventCondition):
 
 class EventFrequencyCondition(BaseEventFrequencyCondition):
     label = "The issue is seen more than {value} times in {interval}"
+    tsdb_read = "sums"
+    tsdb_model = "group"
 
     def query_hook(self, event, start, end, environment_id):
         return self.tsdb.get_sums(
@@ -115,6 +139,8 @@ class EventFrequencyCondition(BaseEventFrequencyCondition):
 
 class EventUniqueUserFrequencyCondition(BaseEventFrequencyCondition):
     label = "The issue is seen by more than {value} users in {interval}"
+    tsdb_read = "distinct_counts_totals"
+    tsdb_model = "users_affected_by_group"
 
     def query_hook(self, event, start, end, environment_id):
         return self.tsdb.get_distinct_counts_totals(
@@ -125,3 +151,43 @@ class EventUniqueUserFrequencyCondition(BaseEventFrequencyCondition):
             environment_id=environment_id,
             use_cache=True,
         )[event.group_id]
+
+
+def get_rates(event, requests, tsdb=tsdb):
+    """
+    Read the rates of multiple frequency conditions for ``event`` with a
+    single batched TSDB read.
+
+    ``requests`` is an iterable of ``(condition_cls, interval, environment_id)``
+    and the result maps each request to its rate, in the format expected by
+    the ``rates`` argument of the conditions. Requests that cannot be batched
+    are left out.
+    """
+    requests = {
+        request
+        for request in requests
+        if request[0].tsdb_read in ("sums", "distinct_counts_totals") and request[1] in intervals
+    }
+    if not requests:
+        return {}
+
+    end = timezone.now()
+    batch = {"sums": [], "distinct_counts_totals": []}
+    batch_requests = {"sums": [], "distinct_counts_totals": []}
+    for request in requests:
+        condition_cls, interval, environment_id = request
+        _, duration = intervals[interval]
+        model = getattr(tsdb.models, condition_cls.tsdb_model)
+        batch[condition_cls.tsdb_read].append(
+            (model, [event.group_id], end - duration, end, environment_id)
+        )
+        batch_requests[condition_cls.tsdb_read].append(request)
+
+    sums, distinct_counts_totals = tsdb.read_batch(use_cache=True, **batch)
+
+    rates = {}
+    for request, result in zip(batch_requests["sums"], sums):
+        rates[request] = result[event.group_id]
+    for request, result in zip(batch_requests["distinct_counts_totals"], distinct_counts_totals):
+        rates[request] = result[event.group_id]
+    return rates
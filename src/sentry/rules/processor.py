@@ -3,12 +3,14 @@ import logging
 from collections import namedtuple
 from datetime import timedelta
 from django.core.cache import cache
+from django.db import IntegrityError, router, transaction
 from django.utils import timezone
 from random import randrange
 
 from sentry import analytics
 from sentry.models import GroupRuleStatus, Rule
 from sentry.rules import EventState, rules
+from sentry.rules.conditions.event_frequency import BaseEventFrequencyCondition, get_rates
 from sentry.utils.hashlib import hash_values
 from sentry.utils.safe import safe_execute
 
@@ -29,6 +31,8 @@ class RuleProcessor:
         self.has_reappeared = has_reappeared
 
         self.grouped_futures = {}
+        self.rule_statuses = {}
+        self.rates = None
 
     def get_rules(self):
         """
@@ -38,8 +42,15 @@ class RuleProcessor:
         """
         return Rule.get_for_project(self.project.id)
 
+    def get_rule_status_cache_key(self, rule_id):
+        return "grouprulestatus:1:%s" % hash_values([self.group.id, rule_id])
+
     def get_rule_status(self, rule):
-        key = "grouprulestatus:1:%s" % hash_values([self.group.id, rule.id])
+        rule_status = self.rule_statuses.get(rule.id)
+        if rule_status is not None:
+            return rule_status
+
+        key = self.get_rule_status_cache_key(rule.id)
         rule_status = cache.get(key)
         if rule_status is None:
             rule_status, _ = GroupRuleStatus.objects.get_or_create(
@@ -48,13 +59,97 @@ class RuleProcessor:
             cache.set(key, rule_status, 300)
         return rule_status
 
+    def bulk_get_rule_status(self, rule_list):
+        """
+        Get the statuses of multiple rules for this group from the cache,
+        falling back to a single query for the missing ones.
+
+        :return: a dict of rule id to `GroupRuleStatus`
+        """
+        keys = {rule.id: self.get_rule_status_cache_key(rule.id) for rule in rule_list}
+        cached = cache.get_many(list(keys.values()))
+        rule_statuses = {rule_id: cached[key] for rule_id, key in keys.items() if key in cached}
+
+        missing_rules = [rule for rule in rule_list if rule.id not in rule_statuses]
+        if not missing_rules:
+            return rule_statuses
+
+        for rule_status in GroupRuleStatus.objects.filter(
+            group=self.group, rule__in=[rule.id for rule in missing_rules]
+        ):
+            rule_statuses[rule_status.rule_id] = rule_status
+
+        to_create = [
+            GroupRuleStatus(rule=rule, group=self.group, project=self.project)
+            for rule in missing_rules
+            if rule.id not in rule_statuses
+        ]
+        if to_create:
+            try:
+                with transaction.atomic(using=router.db_for_write(GroupRuleStatus)):
+                    GroupRuleStatus.objects.bulk_create(to_create)
+            except IntegrityError:
+                # Another event of this group created some of them concurrently
+                for rule_status in to_create:
+                    rule_statuses[rule_status.rule_id], _ = GroupRuleStatus.objects.get_or_create(
+                        rule_id=rule_status.rule_id,
+                        group=self.group,
+                        defaults={"project": self.project},
+                    )
+            else:
+                for rule_status in to_create:
+                    rule_statuses[rule_status.rule_id] = rule_status
+
+        cache.set_many({keys[rule.id]: rule_statuses[rule.id] for rule in missing_rules}, 300)
+        return rule_statuses
+
+    def get_condition_rates(self, rule_list):
+        """
+        Read the rates of the frequency conditions of all rules in `rule_list`
+        at once, see `get_rates`.
+
+        Conditions are evaluated in order and stop at the first one deciding
+        the rule, so only the first frequency condition of a rule that is not
+        decided by an earlier condition is certain to be evaluated. Only those
+        are read here, any later ones read their own rate when reached.
+        """
+        state = self.get_state()
+        requests = []
+        for rule in rule_list:
+            condition_match = rule.data.get("action_match") or Rule.DEFAULT_CONDITION_MATCH
+            if self.get_match_function(condition_match) is None:
+                continue
+
+            for condition in rule.data.get("conditions", ()):
+                condition_cls = rules.get(condition["id"])
+                if condition_cls is None or condition_cls.rule_type != "condition/event":
+                    continue
+
+                if issubclass(condition_cls, BaseEventFrequencyCondition):
+                    if condition.get("interval"):
+                        requests.append((condition_cls, condition["interval"], rule.environment_id))
+                    break
+
+                # `all` stops at the first condition failing, `any` and `none`
+                # at the first one passing.
+                passed = bool(self.condition_matches(condition, state, rule))
+                if passed == (condition_match != "all"):
+                    break
+
+        return safe_execute(get_rates, self.event, requests, _with_transaction=False)
+
     def condition_matches(self, condition, state, rule):
         condition_cls = rules.get(condition["id"])
         if condition_cls is None:
             self.logger.warn("Unregistered condition %r", condition["id"])
             return
 
-        condition_inst = condition_cls(self.project, data=condition, rule=rule)
+        if issubclass(condition_cls, BaseEventFrequencyCondition):
+            condition_inst = condition_cls(
+                self.project, data=condition, rule=rule, rates=self.rates
+            )
+        else:
+            condition_inst = condition_cls(self.project, data=condition, rule=rule)
         return safe_execute(condition_inst.passes, self.event, state, _with_transaction=False)
 
     def get_rule_type(self, condition):
@@ -82,6 +177,13 @@ class RuleProcessor:
             return lambda bool_iter: not any(bool_iter)
         return None
 
+    def is_rule_applicable(self, rule):
+        return rule.environment_id is None or self.event.get_environment().id == rule.environment_id
+
+    def get_freq_offset(self, rule, now):
+        frequency = rule.data.get("frequency") or Rule.DEFAULT_FREQUENCY
+        return now - timedelta(minutes=frequency)
+
     def apply_rule(self, rule):
         """
         If all conditions and filters pass, execute every action.
@@ -92,18 +194,14 @@ class RuleProcessor:
         condition_match = rule.data.get("action_match") or Rule.DEFAULT_CONDITION_MATCH
         filter_match = rule.data.get("filter_match") or Rule.DEFAULT_FILTER_MATCH
         rule_condition_list = rule.data.get("conditions", ())
-        frequency = rule.data.get("frequency") or Rule.DEFAULT_FREQUENCY
 
-        if (
-            rule.environment_id is not None
-            and self.event.get_environment().id != rule.environment_id
-        ):
+        if not self.is_rule_applicable(rule):
             return
 
         status = self.get_rule_status(rule)
 
         now = timezone.now()
-        freq_offset = now - timedelta(minutes=frequency)
+        freq_offset = self.get_freq_offset(rule, now)
 
         if status.last_active and status.last_active > freq_offset:
             return
@@ -194,6 +292,23 @@ class RuleProcessor:
             return {}.values()
 
         self.grouped_futures.clear()
-        for rule in self.get_rules():
+        rule_list = [rule for rule in self.get_rules() if self.is_rule_applicable(rule)]
+        self.rule_statuses = self.bulk_get_rule_status(rule_list)
+
+        # Only read rates for the rules which are not going to be skipped
+        # because they fired recently.
+        now = timezone.now()
+        self.rates = self.get_condition_rates(
+            [
+                rule
+                for rule in rule_list
+                if not (
+                    self.rule_statuses[rule.id].last_active
+                    and self.rule_statuses[rule.id].last_active > self.get_freq_offset(rule, now)
+                )
+            ]
+        )
+
+        for rule in rule_list:
             self.apply_rule(rule)
         return self.grouped_futures.values()
@@ -34,10 +34,15 @@ _STOP_WORKER = "91650ec271ae4b3e8a67cdc909d80f8c"
 
 API_TOKEN_TTL_IN_DAYS = 30
 
+# The id ranges every model of `BULK_QUERY_DELETES` is split into per worker,
+# so that workers that finish their ranges early pick up the remaining ones.
+BULK_DELETE_RANGES_PER_WORKER = 4
 
-def multiprocess_worker(task_queue):
+
+def multiprocess_worker(task_queue, result_queue):
     # Configure within each Process
     import logging
+    import time
     from sentry.utils.imports import import_string
 
     logger = logging.getLogger("sentry.cleanup")
@@ -71,9 +76,29 @@ def multiprocess_worker(task_queue):
                 similarity,
             ] + [b[0] for b in EXTRA_BULK_QUERY_DELETES]
 
+            from sentry.db.deletion import BulkDeleteQuery
+
+            # The chunk size learnt by the ranges of each model so far
+            chunk_sizes = {}
+
             configured = True
 
-        model, chunk = j
+        if j[0] == "bulk_delete":
+            _, model, query, id_range, chunk_size = j
+            deleted = 0
+            start = time.time()
+            try:
+                deleted, chunk_sizes[model] = BulkDeleteQuery(
+                    model=import_string(model), **query
+                ).execute_range(id_range, chunk_size=chunk_sizes.get(model, chunk_size))
+            except Exception as e:
+                logger.exception(e)
+            finally:
+                result_queue.put((model, deleted, start, time.time()))
+                task_queue.task_done()
+            continue
+
+        _, model, chunk = j
         model = import_string(model)
 
         try:
@@ -133,12 +158,13 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
 
     # Make sure we fork off multiprocessing pool
     # before we import or configure the app
-    from multiprocessing import Process, JoinableQueue as Queue
+    from multiprocessing import Process, JoinableQueue as Queue, Queue as ResultQueue
 
     pool = []
     task_queue = Queue(1000)
+    result_queue = ResultQueue()
     for _ in range(concurrency):
-        p = Process(target=multiprocess_worker, args=(task_queue,))
+        p = Process(target=multiprocess_worker, args=(task_queue, result_queue))
         p.daemon = True
         p.start()
         pool.append(p)
@@ -254,6 +280,9 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
         except NotImplementedError:
             click.echo("NodeStore backend does not support cleanup operation", err=True)
 
+    # The id ranges of all models are deleted concurrently by the workers,
+    # which report the rows they deleted in every range.
+    bulk_delete_ranges = 0
     for bqd in BULK_QUERY_DELETES:
         if len(bqd) == 4:
             model, dtfield, order_by, chunk_size = bqd
@@ -271,9 +300,44 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
             if not silent:
                 click.echo(">> Skipping %s" % model.__name__)
         else:
-            BulkDeleteQuery(
-                model=model, dtfield=dtfield, days=days, project_id=project_id, order_by=order_by
-            ).execute(chunk_size=chunk_size)
+            imp = ".".join((model.__module__, model.__name__))
+
+            # Ranges are deleted in id order, which is only the same as
+            # `order_by` within a range. All of them are deleted by the end
+            # of the command regardless.
+            query = {"dtfield": dtfield, "days": days, "project_id": project_id}
+            for id_range in BulkDeleteQuery(model=model, **query).get_id_ranges(
+                concurrency * BULK_DELETE_RANGES_PER_WORKER
+            ):
+                task_queue.put(("bulk_delete", imp, query, id_range, chunk_size))
+                bulk_delete_ranges += 1
+
+    task_queue.join()
+
+    progress = {}
+    for _ in range(bulk_delete_ranges):
+        imp, deleted, range_start, range_end = result_queue.get()
+        if imp in progress:
+            total, first_start, last_end = progress[imp]
+            progress[imp] = (
+                total + deleted,
+                min(first_start, range_start),
+                max(last_end, range_end),
+            )
+        else:
+            progress[imp] = (deleted, range_start, range_end)
+
+    if not silent:
+        for imp, (total, first_start, last_end) in sorted(progress.items()):
+            elapsed = max(last_end - first_start, 0.001)
+            click.echo(
+                ">> Removed {total} {model} in {elapsed:.1f}s ({rate:.0f} rows/s)".format(
+                    total=total,
+                    model=imp.rsplit(".", 1)[1],
+                    elapsed=elapsed,
+                    rate=total / elapsed,
+                )
+            )
 
     for model, dtfield, order_by in DELETES:
         if not silent:
@@ -294,7 +358,7 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
             )
 
             for chunk in q.iterator(chunk_size=100):
-                task_queue.put((imp, chunk))
+                task_queue.put(("delete", imp, chunk))
 
             task_queue.join()
 
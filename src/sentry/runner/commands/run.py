@@ -453,7 +453,8 @@ def batching_kafka_options(group):
     "--concurrency",
     type=int,
     default=None,
-    help="(Deprecated) Ingest consumers no longer use multiple processing threads.",
+    help="Number of threads used to process a batch. Messages are partitioned by project, so "
+    "ordering is preserved within a project. By default batches are processed serially.",
 )
 @configuration
 def ingest_consumer(consumer_types, all_consumer_types, **options):
@@ -477,10 +478,6 @@ def ingest_consumer(consumer_types, all_consumer_types, **options):
     if not all_consumer_types and not consumer_types:
         raise click.ClickException("Need to specify --all-consumer-types or --consumer-type")
 
-    concurrency = options.pop("concurrency", None)
-    if concurrency is not None:
-        click.echo("Warning: `concurrency` argument is deprecated and will be removed.", err=True)
-
     with metrics.global_tags(
         ingest_consumer_types=",".join(sorted(consumer_types)), _all_threads=True
     ):
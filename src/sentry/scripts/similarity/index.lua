@@ -604,29 +604,68 @@ local function search(configuration, parameters, limit)
 end
 
 
+local function record(configuration, key, signatures)
+    return table.imap(
+        signatures,
+        function (signature)
+            set_frequencies(configuration, signature.index, key, signature.frequencies)
+            for band, buckets in ipairs(signature.frequencies) do
+                for bucket in pairs(buckets) do
+                    get_bucket_membership_set(configuration, signature.index, band, bucket):add(key)
+                end
+            end
+        end
+    )
+end
+
+
+local function with_timestamp(configuration, timestamp)
+    -- A copy of the configuration for a different point in time.
+    return setmetatable({timestamp = timestamp}, {__index = configuration})
+end
+
+
 -- Command Parsing
 
+local function signature_argument_parser(configuration)
+    return object_argument_parser({
+        {"index", argument_parser(validate_value)},
+        {"frequencies", frequencies_argument_parser(configuration)},
+    })
+end
+
 local commands = {
     RECORD = function (configuration, cursor, arguments)
         local cursor, key, signatures = multiple_argument_parser(
             argument_parser(validate_value),
-            variadic_argument_parser(
-                object_argument_parser({
-                    {"index", argument_parser(validate_value)},
-                    {"frequencies", frequencies_argument_parser(configuration)},
-                })
-            )
+            variadic_argument_parser(signature_argument_parser(configuration))
+        )(cursor, arguments)
+
+        return record(configuration, key, signatures)
+    end,
+    RECORD_MULTI = function (configuration, cursor, arguments)
+        --[[
+        Records the signatures of many keys at once, as the ``RECORD``
+        command does for a single key. Every key is preceded by the timestamp
+        it is recorded at, and followed by the number of its signatures, and
+        its signatures.
+        ]]--
+        local cursor, entries = variadic_argument_parser(
+            object_argument_parser({
+                {"timestamp", argument_parser(validate_number)},
+                {"key", argument_parser(validate_value)},
+                {"signatures", repeated_argument_parser(signature_argument_parser(configuration))},
+            })
         )(cursor, arguments)
 
         return table.imap(
-            signatures,
-            function (signature)
-                set_frequencies(configuration, signature.index, key, signature.frequencies)
-                for band, buckets in ipairs(signature.frequencies) do
-                    for bucket in pairs(buckets) do
-                        get_bucket_membership_set(configuration, signature.index, band, bucket):add(key)
-                    end
-                end
+            entries,
+            function (entry)
+                return record(
+                    with_timestamp(configuration, entry.timestamp),
+                    entry.key,
+                    entry.signatures
+                )
             end
         )
     end,
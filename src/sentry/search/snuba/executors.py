@@ -6,19 +6,73 @@ import sentry_sdk
 from datetime import datetime, timedelta
 from hashlib import md5
 
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Model
 from django.utils import timezone
+from sentry_sdk import Hub
 
 from sentry import options
 from sentry.api.event_search import (
     convert_search_filter_to_snuba_query,
     DateArg,
     InvalidSearchQuery,
+    SearchFilter,
 )
 from sentry.api.paginator import DateTimePaginator, SequencePaginator, Paginator
 from sentry.constants import ALLOWED_FUTURE_DELTA
 from sentry.models import Group
 from sentry.utils import json, metrics, snuba
 
+# Runs Snuba queries for upcoming search chunks while the current one is
+# post-filtered in Postgres.
+_search_thread_pool = ThreadPoolExecutor(max_workers=10)
+
+
+def _get_search_key_value(value):
+    """
+    Returns a representation of ``value`` that is the same across requests.
+    Models are represented by their ids, as their ``repr`` may include the
+    address of the instance.
+    """
+    if isinstance(value, SearchFilter):
+        return (value.key.name, value.operator, _get_search_key_value(value.value.raw_value))
+    if isinstance(value, Model):
+        return (type(value).__name__, value.pk)
+    if isinstance(value, dict):
+        return sorted(
+            ((key, _get_search_key_value(item)) for key, item in value.items()),
+            key=lambda entry: entry[0],
+        )
+    if isinstance(value, (list, tuple)):
+        return [_get_search_key_value(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(repr(_get_search_key_value(item)) for item in value)
+    return value
+
+
+def _get_queryset_key_value(queryset):
+    """
+    Returns a representation of the predicates of ``queryset`` that is the
+    same across requests. Its datetime parameters are rounded to the minute,
+    as the start of the retention window moves with every request.
+    """
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return None
+    return (
+        sql,
+        [
+            param.replace(second=0, microsecond=0)
+            if isinstance(param, datetime)
+            else _get_search_key_value(param)
+            for param in params
+        ],
+    )
+
 
 def get_search_filter(search_filters, name, operator):
     """
@@ -380,68 +434,96 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
         if sort_by == "inbox":
             raise InvalidSearchQuery(f"Sort key '{sort_by}' only supported for inbox search")
 
-        # Here we check if all the django filters reduce the set of groups down
-        # to something that we can send down to Snuba in a `group_id IN (...)`
-        # clause.
-        max_candidates = options.get("snuba.search.max-pre-snuba-candidates")
-
-        with sentry_sdk.start_span(op="snuba_group_query") as span:
-            group_ids = list(group_queryset.values_list("id", flat=True)[: max_candidates + 1])
-            span.set_data("Max Candidates", max_candidates)
-            span.set_data("Result Size", len(group_ids))
-        metrics.timing("snuba.search.num_candidates", len(group_ids))
-
-        too_many_candidates = False
-        if not group_ids:
-            # no matches could possibly be found from this point on
-            metrics.incr("snuba.search.no_candidates", skip_internal=False)
-            return self.empty_result
-        elif len(group_ids) > max_candidates:
-            # If the pre-filter query didn't include anything to significantly
-            # filter down the number of results (from 'first_release', 'query',
-            # 'status', 'bookmarked_by', 'assigned_to', 'unassigned',
-            # 'subscribed_by', 'active_at_from', or 'active_at_to') then it
-            # might have surpassed the `max_candidates`. In this case,
-            # we *don't* want to pass candidates down to Snuba, and instead we
-            # want Snuba to do all the filtering/sorting it can and *then* apply
-            # this queryset to the results from Snuba, which we call
-            # post-filtering.
-            metrics.incr("snuba.search.too_many_candidates", skip_internal=False)
-            too_many_candidates = True
-            group_ids = []
-
         sort_field = self.sort_strategies[sort_by]
-        chunk_growth = options.get("snuba.search.chunk-growth-rate")
-        max_chunk_size = options.get("snuba.search.max-chunk-size")
-        chunk_limit = limit
-        offset = 0
-        num_chunks = 0
-        hits = self.calculate_hits(
-            group_ids,
-            too_many_candidates,
-            sort_field,
-            projects,
-            retention_window_start,
-            group_queryset,
-            environments,
+        project_ids = [p.id for p in projects]
+        environment_ids = environments and [environment.id for environment in environments]
+
+        search_key = self._get_search_key(
+            project_ids,
+            environment_ids,
             sort_by,
             limit,
-            cursor,
             count_hits,
             paginator_options,
             search_filters,
-            start,
-            end,
+            date_from,
+            date_to,
+            max_hits,
+            _get_queryset_key_value(group_queryset),
         )
-        if count_hits and hits == 0:
-            return self.empty_result
+        search = self._get_search_state(search_key, cursor)
+        if search is None:
+            search = self._start_search(
+                sort_field,
+                projects,
+                retention_window_start,
+                group_queryset,
+                environments,
+                sort_by,
+                limit,
+                cursor,
+                count_hits,
+                paginator_options,
+                search_filters,
+                start,
+                end,
+            )
+            if search is None:
+                return self.empty_result
 
-        paginator_results = self.empty_result
-        result_groups = []
-        result_group_ids = set()
+        group_ids = search["group_ids"]
+        result_groups = search["result_groups"]
+        result_group_ids = {group_id for group_id, _ in result_groups}
+
+        chunk_growth = options.get("snuba.search.chunk-growth-rate")
+        max_chunk_size = options.get("snuba.search.max-chunk-size")
+        num_chunks = 0
+
+        def next_chunk():
+            # grow the chunk size on each iteration to account for huge projects
+            # and weird queries, up to a max size
+            chunk_limit = min(int(search["chunk_limit"] * chunk_growth), max_chunk_size)
+            # but if we have group_ids always query for at least that many items
+            chunk_limit = max(chunk_limit, len(group_ids))
+            return dict(
+                start=search["start"],
+                end=search["end"],
+                project_ids=project_ids,
+                environment_ids=environment_ids,
+                sort_field=sort_field,
+                cursor=search["snuba_cursor"],
+                group_ids=group_ids,
+                limit=chunk_limit,
+                offset=search["offset"],
+                search_filters=search_filters,
+            )
+
+        def paginate():
+            return SequencePaginator(
+                [(score, id) for (id, score) in result_groups], reverse=True, **paginator_options
+            ).get_result(limit, cursor, known_hits=search["hits"], max_hits=max_hits)
+
+        def is_finished():
+            return (
+                bool(group_ids)
+                or len(paginator_results.results) >= limit
+                or not search["more_results"]
+            )
+
+        if search["offset"]:
+            # This search continues where the previous page left off, which
+            # may already have fetched enough results for this page.
+            metrics.incr("snuba.search.resumed")
+            paginator_results = paginate()
+            finished = is_finished()
+        else:
+            paginator_results = self.empty_result
+            finished = False
 
         max_time = options.get("snuba.search.max-total-chunk-time-seconds")
         time_start = time.time()
+        hub = Hub(Hub.current)
+        prefetched = None
 
         # Do smaller searches in chunks until we have enough results
         # to answer the query (or hit the end of possible results). We do
@@ -449,32 +531,22 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
         # sorted by `last_seen`, and we want to avoid returning all of
         # a project's groups and then post-sorting them all in Postgres
         # when typically the first N results will do.
-        while (time.time() - time_start) < max_time:
+        while not finished and (time.time() - time_start) < max_time:
             num_chunks += 1
 
-            # grow the chunk size on each iteration to account for huge projects
-            # and weird queries, up to a max size
-            chunk_limit = min(int(chunk_limit * chunk_growth), max_chunk_size)
-            # but if we have group_ids always query for at least that many items
-            chunk_limit = max(chunk_limit, len(group_ids))
-
             # {group_id: group_score, ...}
-            snuba_groups, total = self.snuba_search(
-                start=start,
-                end=end,
-                project_ids=[p.id for p in projects],
-                environment_ids=environments and [environment.id for environment in environments],
-                sort_field=sort_field,
-                cursor=cursor,
-                group_ids=group_ids,
-                limit=chunk_limit,
-                offset=offset,
-                search_filters=search_filters,
-            )
+            if prefetched is None:
+                chunk = next_chunk()
+                snuba_groups, total = self.snuba_search(**chunk)
+            else:
+                chunk, future = prefetched
+                snuba_groups, total = future.result()
+                prefetched = None
+            search["chunk_limit"] = chunk["limit"]
             metrics.timing("snuba.search.num_snuba_results", len(snuba_groups))
             count = len(snuba_groups)
-            more_results = count >= limit and (offset + limit) < total
-            offset += len(snuba_groups)
+            search["more_results"] = count >= limit and (search["offset"] + limit) < total
+            search["offset"] += len(snuba_groups)
 
             if not snuba_groups:
                 break
@@ -485,10 +557,17 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
                 # that because we set the chunk size to at least the size of
                 # the group_ids, we know we got all of them (ie there are
                 # no more chunks after the first)
-                result_groups = snuba_groups
-                if count_hits and hits is None:
-                    hits = len(snuba_groups)
+                result_groups[:] = snuba_groups
+                if count_hits and search["hits"] is None:
+                    search["hits"] = len(snuba_groups)
             else:
+                if search["more_results"]:
+                    # Fetch the next chunk from Snuba while this one is
+                    # post-filtered in Postgres. It is dropped if this chunk
+                    # turns out to be enough.
+                    chunk = next_chunk()
+                    prefetched = (chunk, self._submit_snuba_search(hub, chunk))
+
                 # pre-filtered candidates were *not* passed down to Snuba,
                 # so we need to do post-filtering to verify Sentry DB predicates
                 filtered_group_ids = group_queryset.filter(
@@ -512,14 +591,11 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
             # * we started with Postgres candidates and so only do one Snuba query max
             # * the paginator is returning enough results to satisfy the query (>= the limit)
             # * there are no more groups in Snuba to post-filter
-            # TODO do we actually have to rebuild this SequencePaginator every time
-            # or can we just make it after we've broken out of the loop?
-            paginator_results = SequencePaginator(
-                [(score, id) for (id, score) in result_groups], reverse=True, **paginator_options
-            ).get_result(limit, cursor, known_hits=hits, max_hits=max_hits)
+            paginator_results = paginate()
+            finished = is_finished()
 
-            if group_ids or len(paginator_results.results) >= limit or not more_results:
-                break
+        if prefetched is not None:
+            metrics.incr("snuba.search.prefetch_unused")
 
         # HACK: We're using the SequencePaginator to mask the complexities of going
         # back and forth between two databases. This causes a problem with pagination
@@ -527,7 +603,7 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
         # result set in memory when it does not). For this reason we need to make some
         # best guesses as to whether the `prev` and `next` cursors have more results.
 
-        if len(paginator_results.results) == limit and more_results:
+        if len(paginator_results.results) == limit and search["more_results"]:
             # Because we are going back and forth between DBs there is a small
             # chance that we will hand the SequencePaginator exactly `limit`
             # items. In this case the paginator will assume there are no more
@@ -542,11 +618,139 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
 
         metrics.timing("snuba.search.num_chunks", num_chunks)
 
+        snuba_cursor = search["snuba_cursor"]
+        if paginator_results.next.has_results and (
+            snuba_cursor is None or not snuba_cursor.is_prev
+        ):
+            # Results of a search started from a `prev` cursor end at that
+            # cursor, so they cannot be continued.
+            self._set_search_state(search_key, paginator_results.next, search)
+
         groups = Group.objects.in_bulk(paginator_results.results)
         paginator_results.results = [groups[k] for k in paginator_results.results if k in groups]
 
         return paginator_results
 
+    def _start_search(
+        self,
+        sort_field,
+        projects,
+        retention_window_start,
+        group_queryset,
+        environments,
+        sort_by,
+        limit,
+        cursor,
+        count_hits,
+        paginator_options,
+        search_filters,
+        start,
+        end,
+    ):
+        """
+        Fetches the Postgres candidates and hits of a search. Returns the state
+        of the search, or ``None`` if it cannot have any results.
+        """
+        # Here we check if all the django filters reduce the set of groups down
+        # to something that we can send down to Snuba in a `group_id IN (...)`
+        # clause.
+        max_candidates = options.get("snuba.search.max-pre-snuba-candidates")
+
+        with sentry_sdk.start_span(op="snuba_group_query") as span:
+            group_ids = list(group_queryset.values_list("id", flat=True)[: max_candidates + 1])
+            span.set_data("Max Candidates", max_candidates)
+            span.set_data("Result Size", len(group_ids))
+        metrics.timing("snuba.search.num_candidates", len(group_ids))
+
+        too_many_candidates = False
+        if not group_ids:
+            # no matches could possibly be found from this point on
+            metrics.incr("snuba.search.no_candidates", skip_internal=False)
+            return None
+        elif len(group_ids) > max_candidates:
+            # If the pre-filter query didn't include anything to significantly
+            # filter down the number of results (from 'first_release', 'query',
+            # 'status', 'bookmarked_by', 'assigned_to', 'unassigned',
+            # 'subscribed_by', 'active_at_from', or 'active_at_to') then it
+            # might have surpassed the `max_candidates`. In this case,
+            # we *don't* want to pass candidates down to Snuba, and instead we
+            # want Snuba to do all the filtering/sorting it can and *then* apply
+            # this queryset to the results from Snuba, which we call
+            # post-filtering.
+            metrics.incr("snuba.search.too_many_candidates", skip_internal=False)
+            too_many_candidates = True
+            group_ids = []
+
+        hits = self.calculate_hits(
+            group_ids,
+            too_many_candidates,
+            sort_field,
+            projects,
+            retention_window_start,
+            group_queryset,
+            environments,
+            sort_by,
+            limit,
+            cursor,
+            count_hits,
+            paginator_options,
+            search_filters,
+            start,
+            end,
+        )
+        if count_hits and hits == 0:
+            return None
+
+        return {
+            "group_ids": group_ids,
+            "hits": hits,
+            "start": start,
+            "end": end,
+            # Snuba is always queried from the cursor the search started
+            # with, so that later pages can continue from `offset`.
+            "snuba_cursor": cursor,
+            "offset": 0,
+            "chunk_limit": limit,
+            "more_results": False,
+            # [(group_id, group_score), ...] in descending order
+            "result_groups": [],
+        }
+
+    def _get_search_key(self, *args):
+        key = repr(_get_search_key_value(args))
+        return "search:snuba:{}".format(md5(key.encode("utf-8")).hexdigest())
+
+    def _get_search_state(self, search_key, cursor):
+        """
+        Returns the state a previous page of the same search left off with,
+        if ``cursor`` points to the page after it.
+        """
+        if cursor is None or not options.get("snuba.search.cursor-cache-ttl"):
+            return None
+
+        search = cache.get(f"{search_key}:{cursor}")
+        metrics.incr(
+            "snuba.search.cursor_cache", tags={"result": "hit" if search is not None else "miss"}
+        )
+        return search
+
+    def _set_search_state(self, search_key, cursor, search):
+        ttl = options.get("snuba.search.cursor-cache-ttl")
+        if ttl:
+            cache.set(f"{search_key}:{cursor}", search, ttl)
+
+    def _submit_snuba_search(self, hub, kwargs):
+        def search():
+            try:
+                with hub:
+                    return self.snuba_search(**kwargs)
+            finally:
+                # Pool threads outlive requests, so Django never closes the
+                # connections they open.
+                connections.close_all()
+
+        return _search_thread_pool.submit(search)
+
     def calculate_hits(
         self,
         group_ids,
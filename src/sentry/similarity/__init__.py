@@ -15,7 +15,7 @@ from sentry.similarity.features import (
     get_application_chunks,
 )
 from sentry.similarity.featuresv2 import GroupingBasedFeatureSet
-from sentry.similarity.signatures import MinHashSignatureBuilder
+from sentry.similarity.signatures import MinHashSignatureBuilder, UniversalHashSignatureBuilder
 from sentry.utils import redis
 from sentry.utils.compat import map
 from sentry.utils.datastructures import BidirectionalMapping
@@ -70,9 +70,17 @@ def _make_index_backend(cluster, namespace="sim:1"):
             logger.info(f"No redis cluster provided for similarity, using {index!r}.")
             return index
 
+    if getattr(settings, "SENTRY_SIMILARITY_UNIVERSAL_HASH_SIGNATURES", False):
+        # These signatures differ from the MinHash ones already stored, they
+        # must not be compared with each other.
+        namespace = f"{namespace}:u"
+        signature_builder = UniversalHashSignatureBuilder(16, 0xFFFF)
+    else:
+        signature_builder = MinHashSignatureBuilder(16, 0xFFFF)
+
     return MetricsWrapper(
         RedisScriptMinHashIndexBackend(
-            cluster, namespace, MinHashSignatureBuilder(16, 0xFFFF), 8, 60 * 60 * 24 * 30, 3, 5000
+            cluster, namespace, signature_builder, 8, 60 * 60 * 24 * 30, 3, 5000
         ),
         scope_tag_name=None,
     )
@@ -140,3 +148,32 @@ def _build_dispatcher(methodname):
 merge = _build_dispatcher("merge")
 record = _build_dispatcher("record")
 delete = _build_dispatcher("delete")
+
+
+def record_multi(events):
+    """
+    Record events of any number of projects and groups, in the indexes that
+    are enabled for their projects.
+    """
+    # TODO: Delete when features2 supersedes features.
+    v1_events = []
+    v2_events = []
+    enabled = {}
+    for event in events:
+        if event.project_id not in enabled:
+            enabled[event.project_id] = (
+                feature_flags.has("projects:similarity-indexing", event.project),
+                feature_flags.has("projects:similarity-indexing-v2", event.project),
+            )
+
+        v1_enabled, v2_enabled = enabled[event.project_id]
+        if v1_enabled:
+            v1_events.append(event)
+        if v2_enabled:
+            v2_events.append(event)
+
+    if v1_events:
+        features.record_multi(v1_events)
+
+    if v2_events:
+        features2.record_multi(v2_events)
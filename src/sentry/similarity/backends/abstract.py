@@ -14,6 +14,17 @@ class AbstractIndexBackend(metaclass=ABCMeta):
     def record(self, scope, key, items, timestamp=None):
         pass
 
+    def record_multi(self, scope, items):
+        """
+        Record the items of many keys at once, one per
+        ``(key, items, timestamp)`` entry, returning the results in the same
+        order as the keys.
+        """
+        return [
+            self.record(scope, key, signatures, timestamp=timestamp)
+            for key, signatures, timestamp in items
+        ]
+
     @abstractmethod
     def merge(self, scope, destination, items, timestamp=None):
         pass
@@ -28,6 +28,9 @@ class MetricsWrapper(AbstractIndexBackend):
     def compare(self, *args, **kwargs):
         return self.__instrumented_method_call("compare", *args, **kwargs)
 
+    def record_multi(self, *args, **kwargs):
+        return self.__instrumented_method_call("record_multi", *args, **kwargs)
+
     def merge(self, *args, **kwargs):
         return self.__instrumented_method_call("merge", *args, **kwargs)
 
@@ -145,6 +145,30 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
 
         return self.__index(scope, arguments)
 
+    def record_multi(self, scope, items):
+        if not any(signatures for _, signatures, _ in items):
+            return [None] * len(items)  # nothing to do
+
+        now = int(time.time())
+        arguments = [
+            "RECORD_MULTI",
+            now,
+            self.namespace,
+            self.bands,
+            self.interval,
+            self.retention,
+            self.candidate_set_limit,
+            scope,
+        ]
+
+        for key, signatures, timestamp in items:
+            arguments.extend([timestamp if timestamp is not None else now, key, len(signatures)])
+            for idx, features in signatures:
+                arguments.append(idx)
+                arguments.extend(self._build_signature_arguments(features))
+
+        return self.__index(scope, arguments)
+
     def merge(self, scope, destination, items, timestamp=None):
         if timestamp is None:
             timestamp = int(time.time())
@@ -96,6 +96,18 @@ class FeatureSet:
                 )
         return results
 
+    def __encode(self, event, label, features):
+        try:
+            return map(self.encoder.dumps, features)
+        except Exception as error:
+            log = (
+                logger.debug
+                if isinstance(error, self.expected_encoding_errors)
+                else functools.partial(logger.warning, exc_info=True)
+            )
+            log("Could not encode features from %r for %r due to error: %r", event, label, error)
+            return None
+
     def record(self, events):
         if not events:
             return []
@@ -122,26 +134,41 @@ class FeatureSet:
                         self.__get_key(event.group) == key
                     ), "all events must be associated with the same group"
 
-                try:
-                    features = map(self.encoder.dumps, features)
-                except Exception as error:
-                    log = (
-                        logger.debug
-                        if isinstance(error, self.expected_encoding_errors)
-                        else functools.partial(logger.warning, exc_info=True)
-                    )
-                    log(
-                        "Could not encode features from %r for %r due to error: %r",
-                        event,
-                        label,
-                        error,
-                    )
-                else:
-                    if features:
-                        items.append((self.aliases[label], features))
+                features = self.__encode(event, label, features)
+                if features:
+                    items.append((self.aliases[label], features))
 
         return self.index.record(scope, key, items, timestamp=int(to_timestamp(event.datetime)))
 
+    def record_multi(self, events):
+        """
+        Record the features of every event for its own group, with one index
+        call per project rather than per event. Returns the result of every
+        event, or ``None`` for events that are not recorded.
+        """
+        scopes = {}
+        for i, event in enumerate(events):
+            if not event.group_id:
+                continue
+
+            items = []
+            for label, features in self.extract(event).items():
+                features = self.__encode(event, label, features)
+                if features:
+                    items.append((self.aliases[label], features))
+
+            scopes.setdefault(self.__get_scope(event.project), []).append(
+                (i, (self.__get_key(event.group), items, int(to_timestamp(event.datetime))))
+            )
+
+        results = [None] * len(events)
+        for scope, entries in scopes.items():
+            scope_results = self.index.record_multi(scope, [entry for _, entry in entries])
+            for (i, _), result in zip(entries, scope_results):
+                results[i] = result
+
+        return results
+
     def classify(self, events, limit=None, thresholds=None):
         if not events:
             return []
@@ -162,24 +189,10 @@ class FeatureSet:
                         self.__get_scope(event.project) == scope
                     ), "all events must be associated with the same project"
 
-                try:
-                    features = map(self.encoder.dumps, features)
-                except Exception as error:
-                    log = (
-                        logger.debug
-                        if isinstance(error, self.expected_encoding_errors)
-                        else functools.partial(logger.warning, exc_info=True)
-                    )
-                    log(
-                        "Could not encode features from %r for %r due to error: %r",
-                        event,
-                        label,
-                        error,
-                    )
-                else:
-                    if features:
-                        items.append((self.aliases[label], thresholds.get(label, 0), features))
-                        labels.append(label)
+                features = self.__encode(event, label, features)
+                if features:
+                    items.append((self.aliases[label], thresholds.get(label, 0), features))
+                    labels.append(label)
 
         return map(
             lambda key__scores: (int(key__scores[0]), dict(zip(labels, key__scores[1]))),
@@ -1,5 +1,28 @@
+"""
+MinHash signatures of feature sets.
+
+``MinHashSignatureBuilder`` hashes every feature once per column, with the
+column as the seed of ``mmh3.hash``. The signatures stored in the existing
+similarity indexes were built this way, so it must keep being used for them:
+switching an index to another builder requires a new index namespace.
+
+``UniversalHashSignatureBuilder`` hashes every feature once, and derives the
+hash of every column from it with a multiply-shift universal hash function.
+The columns are computed for all features at once with NumPy when it is
+installed, and with the same arithmetic in Python otherwise, so signatures
+are the same either way. Without NumPy it is no faster than
+``MinHashSignatureBuilder``. The similarity indexes only use it with
+``SENTRY_SIMILARITY_UNIVERSAL_HASH_SIGNATURES``, under their own namespaces.
+"""
+
 import mmh3
-from sentry.utils.compat import map
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MASK_64 = 0xFFFFFFFFFFFFFFFF
 
 
 class MinHashSignatureBuilder:
@@ -8,9 +31,48 @@ class MinHashSignatureBuilder:
         self.rows = rows
 
     def __call__(self, features):
-        return map(
-            lambda column: min(
-                map(lambda feature: mmh3.hash(feature, column) % self.rows, features)
-            ),
-            range(self.columns),
-        )
+        # Duplicate features do not change the minimum of a column.
+        features = set(features)
+        rows = self.rows
+        return [
+            min(mmh3.hash(feature, column) % rows for feature in features)
+            for column in range(self.columns)
+        ]
+
+
+class UniversalHashSignatureBuilder:
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+
+        # The coefficients of every column are derived from the column number
+        # so that they are the same in every process. Multipliers are odd.
+        self.coefficients = []
+        for column in range(columns):
+            value = mmh3.hash128(f"minhash:{column}")
+            self.coefficients.append(((value & MASK_64) | 1, value >> 64))
+
+        if np is not None:
+            self._multipliers = np.array([a for a, _ in self.coefficients], dtype=np.uint64)
+            self._increments = np.array([b for _, b in self.coefficients], dtype=np.uint64)
+
+    def _hash_features(self, features):
+        return [mmh3.hash128(feature) & MASK_64 for feature in set(features)]
+
+    def __call__(self, features):
+        hashes = self._hash_features(features)
+
+        if np is not None:
+            # Unsigned integer arrays wrap around on overflow, which is the
+            # modulo 2 ** 64 of the hash function.
+            values = np.array(hashes, dtype=np.uint64)
+            columns = (
+                np.outer(self._multipliers, values) + self._increments[:, np.newaxis]
+            ) >> np.uint64(32)
+            return (columns % np.uint64(self.rows)).min(axis=1).tolist()
+
+        rows = self.rows
+        return [
+            min(((((a * value) + b) & MASK_64) >> 32) % rows for value in hashes)
+            for a, b in self.coefficients
+        ]
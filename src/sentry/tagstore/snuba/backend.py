@@ -3,8 +3,6 @@ from collections import defaultdict, Iterable, OrderedDict
 from dateutil.parser import parse as parse_datetime
 from pytz import UTC
 
-from django.core.cache import cache
-
 from sentry import options
 from sentry.api.event_search import FIELD_ALIASES, PROJECT_ALIAS, USER_DISPLAY_ALIAS
 from sentry.models import Project, ReleaseProjectEnvironment
@@ -18,9 +16,9 @@ from sentry.tagstore.exceptions import (
     TagKeyNotFound,
     TagValueNotFound,
 )
+from sentry.tagstore.snuba import cache as tagstore_cache
 from sentry.tagstore.types import TagKey, TagValue, GroupTagKey, GroupTagValue
-from sentry.utils import snuba, metrics
-from sentry.utils.hashlib import md5_text
+from sentry.utils import snuba
 from sentry.utils.dates import to_timestamp
 from sentry_relay.consts import SPAN_STATUS_CODE_TO_NAME
 
@@ -56,6 +54,23 @@ def get_project_list(project_id):
 
 
 class SnubaTagStorage(TagStorage):
+    def __query(self, start, end, use_cache=False, **query):
+        """
+        `snuba.query` over the window from `start` to `end`. With `use_cache`,
+        the result is cached by query and the window rounded to a time bucket
+        for the `snuba.tagstore.cache-tagkeys-rate` of the queries, see
+        `sentry.tagstore.snuba.cache`.
+        """
+        if not use_cache or not tagstore_cache.should_cache(
+            options.get("snuba.tagstore.cache-tagkeys-rate"), **query
+        ):
+            return snuba.query(start=start, end=end, **query)
+
+        cache_key, start, end = tagstore_cache.get_cache_key(query["referrer"], start, end, **query)
+        return tagstore_cache.get_or_compute(
+            cache_key, lambda: snuba.query(start=start, end=end, **query)
+        )
+
     def __get_tag_key(self, project_id, group_id, environment_id, key):
         tag = f"tags[{key}]"
         filters = {"project_id": get_project_list(project_id)}
@@ -103,9 +118,10 @@ class SnubaTagStorage(TagStorage):
             ["max", SEEN_COLUMN, "last_seen"],
         ]
 
-        result, totals = snuba.query(
-            start=kwargs.get("start"),
-            end=kwargs.get("end"),
+        result, totals = self.__query(
+            kwargs.get("start"),
+            kwargs.get("end"),
+            use_cache=kwargs.get("use_cache", False),
             groupby=[tag],
             conditions=conditions,
             filter_keys=filters,
@@ -163,6 +179,7 @@ class SnubaTagStorage(TagStorage):
             limit,
             keys,
             include_values_seen=include_values_seen,
+            use_cache=kwargs.get("use_cache", False),
         )
 
     def __get_tag_keys_for_projects(
@@ -180,17 +197,9 @@ class SnubaTagStorage(TagStorage):
     ):
         """Query snuba for tag keys based on projects
 
-        When use_cache is passed, we'll attempt to use the cache. There's an exception if group_id was passed
-        which refines the query enough caching isn't required.
-        The cache key is based on the filters being passed so that different queries don't hit the same cache, with
-        exceptions for start and end dates. Since even a microsecond passing would result in a different caching
-        key, which means always missing the cache.
-        Instead, to keep the cache key the same for a short period we append the duration, and the end time rounded
-        with a certain jitter to the cache key.
-        This jitter is based on the hash of the key before duration/end time is added for consistency per query.
-        The jitter's intent is to avoid a dogpile effect of many queries being invalidated at the same time.
-        This is done by changing the rounding of the end key to a random offset. See snuba.quantize_time for
-        further explanation of how that is done.
+        When use_cache is passed, the query goes through the tagstore cache,
+        which rounds start and end to a time bucket so that overlapping
+        windows share results. See `sentry.tagstore.snuba.cache`.
         """
         default_start, default_end = default_start_end_dates()
         if start is None:
@@ -212,48 +221,19 @@ class SnubaTagStorage(TagStorage):
         conditions = [DEFAULT_TYPE_CONDITION]
         conditions = []
 
-        should_cache = use_cache and group_id is None
-        result = None
-
-        if should_cache:
-            filtering_strings = [f"{key}={value}" for key, value in filters.items()]
-            cache_key = "tagstore.__get_tag_keys:{}".format(
-                md5_text(*filtering_strings).hexdigest()
-            )
-            key_hash = hash(cache_key)
-            should_cache = (key_hash % 1000) / 1000.0 <= options.get(
-                "snuba.tagstore.cache-tagkeys-rate"
-            )
-
-        # If we want to continue attempting to cache after checking against the cache rate
-        if should_cache:
-            # Needs to happen before creating the cache suffix otherwise rounding will cause different durations
-            duration = (end - start).total_seconds()
-            # Cause there's rounding to create this cache suffix, we want to update the query end so results match
-            end = snuba.quantize_time(end, key_hash)
-            cache_key += f":{duration}@{end.isoformat()}"
-            result = cache.get(cache_key, None)
-            if result is not None:
-                metrics.incr("testing.tagstore.cache_tag_key.hit")
-            else:
-                metrics.incr("testing.tagstore.cache_tag_key.miss")
-
-        if result is None:
-            result = snuba.query(
-                start=start,
-                end=end,
-                groupby=["tags_key"],
-                conditions=conditions,
-                filter_keys=filters,
-                aggregations=aggregations,
-                limit=limit,
-                orderby="-count",
-                referrer="tagstore.__get_tag_keys",
-                **kwargs,
-            )
-            if should_cache:
-                cache.set(cache_key, result, 300)
-                metrics.incr("testing.tagstore.cache_tag_key.len", amount=len(result))
+        result = self.__query(
+            start,
+            end,
+            use_cache=use_cache,
+            groupby=["tags_key"],
+            conditions=conditions,
+            filter_keys=filters,
+            aggregations=aggregations,
+            limit=limit,
+            orderby="-count",
+            referrer="tagstore.__get_tag_keys",
+            **kwargs,
+        )
 
         if group_id is None:
             ctor = TagKey
@@ -462,7 +442,13 @@ class SnubaTagStorage(TagStorage):
         # num_keys * limit.
 
         # First get totals and unique counts by key.
-        keys_with_counts = self.get_group_tag_keys(project_id, group_id, environment_ids, keys=keys)
+        keys_with_counts = self.get_group_tag_keys(
+            project_id,
+            group_id,
+            environment_ids,
+            keys=keys,
+            use_cache=kwargs.get("use_cache", False),
+        )
 
         # Then get the top values with first_seen/last_seen/count for each
         filters = {"project_id": get_project_list(project_id)}
@@ -481,9 +467,10 @@ class SnubaTagStorage(TagStorage):
             ["max", SEEN_COLUMN, "last_seen"],
         ]
 
-        values_by_key = snuba.query(
-            start=kwargs.get("start"),
-            end=kwargs.get("end"),
+        values_by_key = self.__query(
+            kwargs.get("start"),
+            kwargs.get("end"),
+            use_cache=kwargs.get("use_cache", False),
             groupby=["tags_key", "tags_value"],
             conditions=conditions,
             filter_keys=filters,
@@ -0,0 +1,136 @@
+"""
+Cache for the tag key and top value listings of the Snuba tagstore.
+
+The tag autocomplete of the search bar and the tag facets of the issue details
+send near-identical queries over and over. Their results are cached by query,
+with the start and end of the queried window rounded to time buckets so that
+windows that only differ by a few seconds or minutes share a cache entry. The
+rounding has a jitter per query, see ``snuba.quantize_time``, so that the
+entries of different queries do not all roll over at the same time.
+
+Two things keep a popular entry from stampeding Snuba when it expires:
+
+* Probabilistic early refresh (XFetch): every read may recompute the entry
+  before it expires, with a probability that grows as the expiry approaches
+  and with the time the query took. One request usually refreshes a hot entry
+  while every other request is still served from the cache.
+* Single-flight locking: only the request holding the lock of an entry queries
+  Snuba. Concurrent requests serve the previous value if there is one, or wait
+  for the lock holder to store the new one.
+"""
+
+import math
+import random
+import time
+
+from django.core.cache import cache
+
+from sentry.utils import json, metrics, snuba
+from sentry.utils.dates import to_timestamp
+from sentry.utils.hashlib import md5_text
+
+# The start and end of cached queries are rounded to buckets of this size.
+TIME_BUCKET_SIZE = 300
+
+CACHE_TTL = 300
+
+# Values above 1.0 favor earlier refreshes, values below 1.0 later ones.
+EARLY_REFRESH_BETA = 1.0
+
+# How long the lock of an entry is held at most, in case the process holding
+# it dies while querying.
+LOCK_TIMEOUT = 30
+
+# How long to wait for the lock holder to store a missing entry before
+# querying anyway.
+LOCK_WAIT = 2.0
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _get_query_digest(query):
+    return md5_text(json.dumps(query, sort_keys=True)).hexdigest()
+
+
+def should_cache(rate, **query):
+    """
+    Returns whether the query with the parameters ``query`` is cached when a
+    ``rate`` of the queries are. A given query is either always or never
+    cached, whatever its window.
+    """
+    return int(_get_query_digest(query)[:8], 16) % 1000 / 1000.0 < rate
+
+
+def get_cache_key(name, start, end, **query):
+    """
+    Returns the cache key of the query ``name`` with the parameters ``query``
+    over the window from ``start`` to ``end``, along with the window rounded
+    to its time bucket. The query should be sent with the rounded window for
+    its result to match the key.
+    """
+    digest = _get_query_digest(query)
+    # Python's ``hash`` is salted per process, the jitter must not be.
+    key_hash = int(digest[:8], 16)
+    if start is not None:
+        start = snuba.quantize_time(start, key_hash, TIME_BUCKET_SIZE)
+    if end is not None:
+        end = snuba.quantize_time(end, key_hash, TIME_BUCKET_SIZE)
+
+    cache_key = "tagstore.snuba:{}:{}:{}:{}".format(
+        name,
+        digest,
+        int(to_timestamp(start)) if start is not None else "",
+        int(to_timestamp(end)) if end is not None else "",
+    )
+    return cache_key, start, end
+
+
+def _get_lock_key(cache_key):
+    return f"{cache_key}:lock"
+
+
+def _compute(cache_key, compute, ttl):
+    start = time.time()
+    value = compute()
+    delta = time.time() - start
+    cache.set(cache_key, (value, delta, time.time() + ttl), ttl)
+    return value
+
+
+def get_or_compute(cache_key, compute, ttl=CACHE_TTL, beta=EARLY_REFRESH_BETA):
+    """
+    Returns the cached value of ``cache_key``, calling ``compute`` to refresh
+    it when it is missing or about to expire.
+    """
+    entry = cache.get(cache_key)
+    if entry is not None:
+        value, delta, expires_at = entry
+        # ``1.0 - random()`` is in (0, 1], ``log`` of it is negative or zero.
+        if time.time() - delta * beta * math.log(1.0 - random.random()) < expires_at:
+            metrics.incr("tagstore.snuba.cache", tags={"result": "hit"})
+            return value
+
+    lock_key = _get_lock_key(cache_key)
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        metrics.incr(
+            "tagstore.snuba.cache", tags={"result": "miss" if entry is None else "refresh"}
+        )
+        try:
+            return _compute(cache_key, compute, ttl)
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        # Another request is refreshing the entry, which is still valid.
+        metrics.incr("tagstore.snuba.cache", tags={"result": "stale"})
+        return entry[0]
+
+    deadline = time.time() + LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(cache_key)
+        if entry is not None:
+            metrics.incr("tagstore.snuba.cache", tags={"result": "coalesced"})
+            return entry[0]
+
+    metrics.incr("tagstore.snuba.cache", tags={"result": "lock_timeout"})
+    return _compute(cache_key, compute, ttl)
@@ -0,0 +1,20 @@
+import logging
+
+from sentry.nodestore import compression
+from sentry.tasks.base import instrumented_task
+
+logger = logging.getLogger(__name__)
+
+
+@instrumented_task(name="sentry.tasks.nodestore.train_nodestore_dictionaries", queue="cleanup")
+def train_nodestore_dictionaries(**kwargs):
+    """
+    Train a new zstd dictionary for every platform with sampled payloads.
+    """
+    for platform in compression.get_sampled_platforms():
+        node_dictionary = compression.train_dictionary(platform)
+        if node_dictionary is not None:
+            logger.info(
+                "nodestore.dictionary.trained",
+                extra={"platform": platform, "dictionary_id": node_dictionary.id},
+            )
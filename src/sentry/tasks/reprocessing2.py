@@ -10,6 +10,11 @@ from sentry.tasks.base import instrumented_task, retry
 
 GROUP_REPROCESSING_CHUNK_SIZE = 100
 
+# Time limits of reprocess_events per event of a batch, those of the
+# reprocess_event task it replaces.
+REPROCESS_EVENT_SOFT_TIME_LIMIT = 20
+REPROCESS_EVENT_TIME_LIMIT = 30
+
 nodestore_stats_logger = logging.getLogger("sentry.nodestore.stats")
 
 
@@ -49,25 +54,27 @@ def reprocess_group(
         batch_size=GROUP_REPROCESSING_CHUNK_SIZE,
         state=query_state,
         referrer="reprocessing2.reprocess_group",
+        fetch_events=False,
     )
 
     if not events:
         return
 
+    event_ids = []
     remaining_event_ids = []
 
     for event in events:
         if max_events is None or max_events > 0:
-            reprocess_event.delay(
-                project_id=project_id,
-                event_id=event.event_id,
-                start_time=start_time,
-            )
+            event_ids.append(event.event_id)
             if max_events is not None:
                 max_events -= 1
         else:
             remaining_event_ids.append(event.event_id)
 
+    # len(event_ids) is upper-bounded by GROUP_REPROCESSING_CHUNK_SIZE
+    if event_ids:
+        enqueue_reprocess_events(project_id, event_ids, start_time, group_id)
+
     # len(remaining_event_ids) is upper-bounded by GROUP_REPROCESSING_CHUNK_SIZE
     if remaining_event_ids:
         handle_remaining_events.delay(
@@ -135,11 +142,42 @@ def handle_remaining_events(project_id, new_group_id, event_ids, remaining_event
     soft_time_limit=20,
 )
 def reprocess_event(project_id, event_id, start_time):
+    # Superseded by reprocess_events, kept for tasks that are already queued.
     from sentry.reprocessing2 import reprocess_event as reprocess_event_impl
 
     reprocess_event_impl(project_id=project_id, event_id=event_id, start_time=start_time)
 
 
+@instrumented_task(
+    name="sentry.tasks.reprocessing2.reprocess_events",
+    queue="events.reprocessing.process_event",
+    time_limit=GROUP_REPROCESSING_CHUNK_SIZE * REPROCESS_EVENT_TIME_LIMIT,
+    soft_time_limit=GROUP_REPROCESSING_CHUNK_SIZE * REPROCESS_EVENT_SOFT_TIME_LIMIT,
+)
+def reprocess_events(project_id, event_ids, start_time, group_id=None):
+    from sentry.reprocessing2 import reprocess_events as reprocess_events_impl
+
+    reprocess_events_impl(
+        project_id=project_id, event_ids=event_ids, start_time=start_time, group_id=group_id
+    )
+
+
+def enqueue_reprocess_events(project_id, event_ids, start_time, group_id):
+    """
+    Enqueue reprocess_events with time limits for the number of events.
+    """
+    reprocess_events.apply_async(
+        kwargs={
+            "project_id": project_id,
+            "event_ids": event_ids,
+            "start_time": start_time,
+            "group_id": group_id,
+        },
+        time_limit=len(event_ids) * REPROCESS_EVENT_TIME_LIMIT,
+        soft_time_limit=len(event_ids) * REPROCESS_EVENT_SOFT_TIME_LIMIT,
+    )
+
+
 @instrumented_task(
     name="sentry.tasks.reprocessing2.finish_reprocessing",
     queue="events.reprocessing.process_event",
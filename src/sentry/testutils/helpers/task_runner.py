@@ -27,7 +27,7 @@ def BurstTaskRunner():
 
     queue = []
 
-    def apply_async(self, args=(), kwargs=(), countdown=None):
+    def apply_async(self, args=(), kwargs=(), countdown=None, **options):
         queue.append((self, args, kwargs))
 
     def work(max_jobs=None):
@@ -108,6 +108,7 @@ class BaseTSDB(Service):
             "get_most_frequent_series",
             "get_frequency_series",
             "get_frequency_totals",
+            "read_batch",
         ]
     )
 
@@ -124,6 +125,7 @@ class BaseTSDB(Service):
             "record_frequency_multi",
             "merge_frequencies",
             "delete_frequencies",
+            "write_batch",
             "flush",
         ]
     )
@@ -429,6 +431,35 @@ class BaseTSDB(Service):
         """
         raise NotImplementedError
 
+    def read_batch(self, sums=(), distinct_counts_totals=(), use_cache=False):
+        """
+        Read counter sums and distinct counter totals, each with their own
+        time range and environment, at once. Backends may issue fewer round
+        trips than the individual read methods.
+
+        The items use these structures:
+
+        - ``sums``: ``(model, keys, start, end, environment_id)``
+        - ``distinct_counts_totals``: ``(model, keys, start, end, environment_id)``
+
+        Returns a list of results for each, in the same order as the items and
+        shaped like the results of ``get_sums`` and
+        ``get_distinct_counts_totals``.
+        """
+        sum_results = [
+            self.get_sums(
+                model, keys, start, end, environment_id=environment_id, use_cache=use_cache
+            )
+            for model, keys, start, end, environment_id in sums
+        ]
+        distinct_counts_results = [
+            self.get_distinct_counts_totals(
+                model, keys, start, end, environment_id=environment_id, use_cache=use_cache
+            )
+            for model, keys, start, end, environment_id in distinct_counts_totals
+        ]
+        return sum_results, distinct_counts_results
+
     def get_distinct_counts_union(
         self, model, keys, start, end=None, rollup=None, environment_id=None
     ):
@@ -464,6 +495,31 @@ class BaseTSDB(Service):
         """
         raise NotImplementedError
 
+    def write_batch(self, incrs=(), records=(), frequencies=()):
+        """
+        Apply counter increments, distinct counter records and frequency
+        table updates, each with their own timestamp and environment, at
+        once. Backends may coalesce identical keys and issue fewer round
+        trips than the individual write methods.
+
+        The items use these structures:
+
+        - ``incrs``: ``(model, key, count, timestamp, environment_id)``
+        - ``records``: ``(model, key, values, timestamp, environment_id)``
+        - ``frequencies``: ``(model, {key: {item: score, ...}, ...}, timestamp,
+          environment_id)``
+        """
+        for model, key, count, timestamp, environment_id in incrs:
+            self.incr(model, key, timestamp=timestamp, count=count, environment_id=environment_id)
+
+        for model, key, values, timestamp, environment_id in records:
+            self.record(model, key, values, timestamp=timestamp, environment_id=environment_id)
+
+        for model, request, timestamp, environment_id in frequencies:
+            self.record_frequency_multi(
+                [(model, request)], timestamp=timestamp, environment_id=environment_id
+            )
+
     def get_most_frequent(
         self, model, keys, start, end=None, rollup=None, limit=None, environment_id=None
     ):
@@ -12,6 +12,7 @@ from django.utils.encoding import force_bytes
 from pkg_resources import resource_string
 
 from sentry.tsdb.base import BaseTSDB
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.redis import check_cluster_versions, get_cluster_from_options, SentryScript
 from sentry.utils.versioning import Version
@@ -50,6 +51,33 @@ class SuppressionWrapper:
         return True
 
 
+class CounterKeyLayout:
+    """\
+    The counter keys of a single rollup bucket.
+
+    All counters written to the same rollup and bucket share the epoch and
+    the expiry of their hash keys, and counters of the same model and vnode
+    share the hash key itself. Computing those once per bucket keeps the
+    timestamp arithmetic and string formatting out of the inner loop of
+    ``incr_multi``.
+    """
+
+    def __init__(self, prefix, epoch, expiry):
+        self.prefix = prefix
+        self.epoch = epoch
+        self.expiry = expiry
+        self.__hash_keys = {}
+
+    def get_hash_key(self, model, vnode):
+        try:
+            return self.__hash_keys[(model, vnode)]
+        except KeyError:
+            hash_key = self.__hash_keys[(model, vnode)] = "{prefix}{model}:{epoch}:{vnode}".format(
+                prefix=self.prefix, model=model.value, epoch=self.epoch, vnode=vnode
+            )
+            return hash_key
+
+
 class RedisTSDB(BaseTSDB):
     """
     A time series storage backend for Redis.
@@ -112,6 +140,8 @@ class RedisTSDB(BaseTSDB):
         self.prefix = prefix
         self.vnodes = vnodes
         self.enable_frequency_sketches = options.pop("enable_frequency_sketches", False)
+        # (rollup, bucket) -> CounterKeyLayout
+        self.counter_key_layouts = LRUCache(1000)
         super().__init__(**options)
 
     def validate(self):
@@ -164,12 +194,7 @@ class RedisTSDB(BaseTSDB):
 
         Returns a 2-tuple that contains the hash key and the hash field.
         """
-        model_key = self.get_model_key(key)
-
-        if isinstance(model_key, int):
-            vnode = model_key % self.vnodes
-        else:
-            vnode = crc32(force_bytes(model_key)) % self.vnodes
+        model_key, vnode = self.get_model_key_and_vnode(key)
 
         return (
             "{prefix}{model}:{epoch}:{vnode}".format(
@@ -181,6 +206,28 @@ class RedisTSDB(BaseTSDB):
             self.add_environment_parameter(model_key, environment_id),
         )
 
+    def get_model_key_and_vnode(self, key):
+        model_key = self.get_model_key(key)
+
+        if isinstance(model_key, int):
+            vnode = model_key % self.vnodes
+        else:
+            vnode = crc32(force_bytes(model_key)) % self.vnodes
+
+        return model_key, vnode
+
+    def get_counter_key_layout(self, rollup, max_values, epoch):
+        bucket = (rollup, epoch // rollup)
+        layout = self.counter_key_layouts.get(bucket)
+        if layout is None:
+            layout = CounterKeyLayout(
+                self.prefix,
+                self.normalize_ts_to_rollup(epoch, rollup),
+                self.normalize_ts_to_epoch(epoch, rollup) + (rollup * max_values),
+            )
+            self.counter_key_layouts.set(bucket, layout)
+        return layout
+
     def get_model_key(self, key):
         # We specialize integers so that a pure int-map can be optimized by
         # Redis, whereas long strings (say tag values) will store in a more
@@ -221,6 +268,9 @@ class RedisTSDB(BaseTSDB):
         if default_timestamp is None:
             default_timestamp = timezone.now()
 
+        # key -> (model_key, vnode), many items of a batch share their keys
+        model_keys = {}
+
         for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
             manager = cluster.map()
             if not durable:
@@ -232,27 +282,34 @@ class RedisTSDB(BaseTSDB):
                 # (hash_key) -> "max expiration encountered"
                 key_expiries = defaultdict(lambda: 0.0)
 
-                for rollup, max_values in self.rollups.items():
-                    for item in items:
-                        if len(item) == 2:
-                            model, key = item
-                            options = {}
-                        else:
-                            model, key, options = item
+                for item in items:
+                    if len(item) == 2:
+                        model, key = item
+                        options = {}
+                    else:
+                        model, key, options = item
 
-                        count = options.get("count", default_count)
-                        timestamp = options.get("timestamp", default_timestamp)
+                    count = options.get("count", default_count)
+                    epoch = int(to_timestamp(options.get("timestamp", default_timestamp)))
 
-                        expiry = self.calculate_expiry(rollup, max_values, timestamp)
+                    try:
+                        model_key, vnode = model_keys[key]
+                    except KeyError:
+                        model_key, vnode = model_keys[key] = self.get_model_key_and_vnode(key)
 
-                        for environment_id in environment_ids:
-                            hash_key, hash_field = self.make_counter_key(
-                                model, rollup, timestamp, key, environment_id
-                            )
+                    hash_fields = [
+                        self.add_environment_parameter(model_key, environment_id)
+                        for environment_id in environment_ids
+                    ]
+
+                    for rollup, max_values in self.rollups.items():
+                        layout = self.get_counter_key_layout(rollup, max_values, epoch)
+                        hash_key = layout.get_hash_key(model, vnode)
 
-                            if key_expiries[hash_key] < expiry:
-                                key_expiries[hash_key] = expiry
+                        if key_expiries[hash_key] < layout.expiry:
+                            key_expiries[hash_key] = layout.expiry
 
+                        for hash_field in hash_fields:
                             key_operations[(hash_key, hash_field)] += count
 
                 for (hash_key, hash_field), count in key_operations.items():
@@ -695,6 +752,118 @@ class RedisTSDB(BaseTSDB):
                 if durable:
                     raise
 
+    def write_batch(self, incrs=(), records=(), frequencies=()):
+        """
+        Write counters, distinct counters and frequency tables in a single
+        round trip per Redis node and cluster.
+
+        Identical keys are coalesced before anything is sent: counter
+        increments are summed, distinct counter values are merged and
+        frequency table scores are summed. Keys are routed exactly like the
+        individual write methods route them, so the data can be read back
+        with the regular read methods.
+        """
+        self.validate_arguments(
+            [item[0] for item in itertools.chain(incrs, records, frequencies)],
+            {item[-1] for item in itertools.chain(incrs, records, frequencies)},
+        )
+
+        now = timezone.now()
+
+        # (cluster, durable) -> {(hash_key, hash_field): count}
+        counters = defaultdict(lambda: defaultdict(int))
+        # (cluster, durable) -> {(routing_key, key): set(values)}
+        distinct_counters = defaultdict(lambda: defaultdict(set))
+        # (cluster, durable) -> {(routing_key, keys): {member: score}}
+        frequency_tables = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+        # (cluster, durable) -> {(routing_key, key): max expiry}
+        expiries = defaultdict(lambda: defaultdict(int))
+
+        # key -> (model_key, vnode)
+        model_keys = {}
+
+        for model, key, count, timestamp, environment_id in incrs:
+            epoch = int(to_timestamp(timestamp or now))
+            try:
+                model_key, vnode = model_keys[key]
+            except KeyError:
+                model_key, vnode = model_keys[key] = self.get_model_key_and_vnode(key)
+
+            for cluster_key, environment_ids in self.get_cluster_groups({None, environment_id}):
+                for rollup, max_values in self.rollups.items():
+                    layout = self.get_counter_key_layout(rollup, max_values, epoch)
+                    hash_key = layout.get_hash_key(model, vnode)
+                    for environment_id in environment_ids:
+                        hash_field = self.add_environment_parameter(model_key, environment_id)
+                        counters[cluster_key][(hash_key, hash_field)] += count
+                    expiry_key = (hash_key, hash_key)
+                    expiries[cluster_key][expiry_key] = max(
+                        expiries[cluster_key][expiry_key], layout.expiry
+                    )
+
+        for model, key, values, timestamp, environment_id in records:
+            timestamp = timestamp or now
+            ts = int(to_timestamp(timestamp))
+            for cluster_key, environment_ids in self.get_cluster_groups({None, environment_id}):
+                for rollup, max_values in self.rollups.items():
+                    expiry = self.calculate_expiry(rollup, max_values, timestamp)
+                    for environment_id in environment_ids:
+                        k = self.make_key(model, rollup, ts, key, environment_id)
+                        distinct_counters[cluster_key][(key, k)].update(values)
+                        expiries[cluster_key][(key, k)] = max(
+                            expiries[cluster_key][(key, k)], expiry
+                        )
+
+        if self.enable_frequency_sketches:
+            for model, request, timestamp, environment_id in frequencies:
+                timestamp = timestamp or now
+                ts = int(to_timestamp(timestamp))
+                for cluster_key, environment_ids in self.get_cluster_groups({None, environment_id}):
+                    for key, items in request.items():
+                        keys = []
+                        for rollup, max_values in self.rollups.items():
+                            expiry = self.calculate_expiry(rollup, max_values, timestamp)
+                            for environment_id in environment_ids:
+                                chunk = self.make_frequency_table_keys(
+                                    model, rollup, ts, key, environment_id
+                                )
+                                keys.extend(chunk)
+                                for k in chunk:
+                                    expiries[cluster_key][(key, k)] = max(
+                                        expiries[cluster_key][(key, k)], expiry
+                                    )
+
+                        scores = frequency_tables[cluster_key][(key, tuple(keys))]
+                        for member, score in items.items():
+                            scores[member] += score
+
+        for cluster_key in set(counters) | set(distinct_counters) | set(frequency_tables):
+            cluster, durable = cluster_key
+
+            # routing key -> commands
+            commands = defaultdict(list)
+
+            for (hash_key, hash_field), count in counters[cluster_key].items():
+                commands[hash_key].append(("HINCRBY", hash_key, hash_field, count))
+
+            for (routing_key, k), values in distinct_counters[cluster_key].items():
+                commands[routing_key].append(("PFADD", k) + tuple(values))
+
+            for (routing_key, keys), scores in frequency_tables[cluster_key].items():
+                arguments = ["INCR"] + list(self.DEFAULT_SKETCH_PARAMETERS)
+                for member, score in scores.items():
+                    arguments.extend((score, member))
+                commands[routing_key].append((CountMinScript, list(keys), arguments))
+
+            for (routing_key, k), expiry in expiries[cluster_key].items():
+                commands[routing_key].append(("EXPIREAT", k, expiry))
+
+            try:
+                cluster.execute_commands(commands)
+            except Exception:
+                if durable:
+                    raise
+
     def get_most_frequent(
         self, model, keys, start, end=None, rollup=None, limit=None, environment_id=None
     ):
@@ -34,6 +34,14 @@ method_specifications = {
     "get_most_frequent_series": (READ, single_model_argument),
     "get_frequency_series": (READ, single_model_argument),
     "get_frequency_totals": (READ, single_model_argument),
+    "read_batch": (
+        READ,
+        lambda callargs: {
+            item[0]
+            for items in (callargs["sums"], callargs["distinct_counts_totals"])
+            for item in items
+        },
+    ),
     "incr": (WRITE, single_model_argument),
     "incr_multi": (WRITE, lambda callargs: {item[0] for item in callargs["items"]}),
     "merge": (WRITE, single_model_argument),
@@ -48,6 +56,14 @@ method_specifications = {
     ),
     "merge_frequencies": (WRITE, single_model_argument),
     "delete_frequencies": (WRITE, multiple_model_argument),
+    "write_batch": (
+        WRITE,
+        lambda callargs: {
+            item[0]
+            for items in (callargs["incrs"], callargs["records"], callargs["frequencies"])
+            for item in items
+        },
+    ),
     "flush": (WRITE, dont_do_this),
 }
 
@@ -20,6 +20,15 @@ SnubaModelQuerySettings = collections.namedtuple(
     ["dataset", "groupby", "aggregate", "conditions"],
 )
 
+SnubaDataQuery = collections.namedtuple(
+    # `query` - the arguments to `snuba.query`, or None if there is nothing to query
+    # `groupby` - the order in which the result is nested
+    # `fill_keys` - the keys to zerofill the result with, see `SnubaTSDB.zerofill`
+    # `keys` - the keys to trim the result to, see `SnubaTSDB.trim`
+    "SnubaDataQuery",
+    ["query", "groupby", "fill_keys", "keys"],
+)
+
 # combine DEFAULT, ERROR, and SECURITY as errors. We are now recording outcome by
 # category, and these TSDB models and where they're used assume only errors.
 # see relay: py/sentry_relay/consts.py and relay-cabi/include/relay.h
@@ -252,6 +261,37 @@ class SnubaTSDB(BaseTSDB):
         `group_on_time`: whether to add a GROUP BY clause on the 'time' field.
         `group_on_model`: whether to add a GROUP BY clause on the primary model.
         """
+        data_query = self.prepare_data_query(
+            model,
+            keys,
+            start,
+            end,
+            rollup,
+            environment_ids,
+            aggregation=aggregation,
+            group_on_model=group_on_model,
+            group_on_time=group_on_time,
+            conditions=conditions,
+        )
+        return self.process_data_result(data_query, self.run_data_query(data_query, use_cache))
+
+    def prepare_data_query(
+        self,
+        model,
+        keys,
+        start,
+        end,
+        rollup=None,
+        environment_ids=None,
+        aggregation="count()",
+        group_on_model=True,
+        group_on_time=False,
+        conditions=None,
+    ):
+        """
+        Normalizes all the TSDB parameters into a `SnubaDataQuery`, see
+        `get_data`.
+        """
         # XXX: to counteract the hack in project_key_stats.py
         if model in [
             TSDBModel.key_total_received,
@@ -312,7 +352,7 @@ class SnubaTSDB(BaseTSDB):
             orderby.append(model_group)
 
         if keys:
-            result = snuba.query(
+            query = dict(
                 dataset=model_query_settings.dataset,
                 start=start,
                 end=end,
@@ -325,17 +365,38 @@ class SnubaTSDB(BaseTSDB):
                 orderby=orderby,
                 referrer=f"tsdb-modelid:{model.value}",
                 is_grouprelease=(model == TSDBModel.frequent_releases_by_group),
-                use_cache=use_cache,
             )
         else:
-            result = {}
+            query = None
 
+        fill_keys = dict(keys_map)
         if group_on_time:
-            keys_map["time"] = series
+            fill_keys["time"] = series
+
+        return SnubaDataQuery(query, groupby, fill_keys, keys)
 
-        self.zerofill(result, groupby, keys_map)
-        self.trim(result, groupby, keys)
+    def run_data_query(self, data_query, use_cache=False):
+        if data_query.query is None:
+            return {}
+        return snuba.query(use_cache=use_cache, **data_query.query)
 
+    def get_data_query_params(self, data_query):
+        """
+        The `SnubaQueryParams` of a `SnubaDataQuery` to send with
+        `snuba.bulk_raw_query`, its response body is turned into a result
+        with `nest_data_body`.
+        """
+        return snuba.SnubaQueryParams(**data_query.query)
+
+    def nest_data_body(self, data_query, body):
+        return snuba.nest_groups(body["data"], data_query.groupby, ["aggregate"])
+
+    def process_data_result(self, data_query, result):
+        """
+        Zerofills and trims the nested `result` of a `SnubaDataQuery`.
+        """
+        self.zerofill(result, data_query.groupby, data_query.fill_keys)
+        self.trim(result, data_query.groupby, data_query.keys)
         return result
 
     def zerofill(self, result, groups, flat_keys):
@@ -386,6 +447,19 @@ class SnubaTSDB(BaseTSDB):
         conditions=None,
         use_cache=False,
     ):
+        data_query = self.prepare_range_query(
+            model, keys, start, end, rollup, environment_ids, conditions=conditions
+        )
+        result = self.process_data_result(data_query, self.run_data_query(data_query, use_cache))
+        return self.convert_range_result(result)
+
+    def prepare_range_query(
+        self, model, keys, start, end, rollup=None, environment_ids=None, conditions=None
+    ):
+        """
+        The `SnubaDataQuery` of `get_range`, its result is converted with
+        `convert_range_result`.
+        """
         # 10s is the only rollup under an hour that we support
         if rollup and rollup == 10 and model in self.lower_rollup_query_settings:
             model_query_settings = self.lower_rollup_query_settings.get(model)
@@ -394,29 +468,30 @@ class SnubaTSDB(BaseTSDB):
 
         assert model_query_settings is not None, f"Unsupported TSDBModel: {model.name}"
 
-        if model_query_settings.dataset == snuba.Dataset.Outcomes:
-            aggregate_function = "sum"
-        else:
-            aggregate_function = "count()"
-
-        result = self.get_data(
+        return self.prepare_data_query(
             model,
             keys,
             start,
             end,
             rollup,
             environment_ids,
-            aggregation=aggregate_function,
+            aggregation=self.get_range_aggregation(model_query_settings),
             group_on_time=True,
             conditions=conditions,
-            use_cache=use_cache,
         )
+
+    def convert_range_result(self, result):
         # convert
         #    {group:{timestamp:count, ...}}
         # into
         #    {group: [(timestamp, count), ...]}
         return {k: sorted(result[k].items()) for k in result}
 
+    def get_range_aggregation(self, model_query_settings):
+        if model_query_settings.dataset == snuba.Dataset.Outcomes:
+            return "sum"
+        return "count()"
+
     def get_distinct_counts_series(
         self, model, keys, start, end=None, rollup=None, environment_id=None
     ):
@@ -450,6 +525,61 @@ class SnubaTSDB(BaseTSDB):
             use_cache=use_cache,
         )
 
+    def read_batch(self, sums=(), distinct_counts_totals=(), use_cache=False):
+        sums, distinct_counts_totals = list(sums), list(distinct_counts_totals)
+
+        data_queries = []
+        for model, keys, start, end, environment_id in sums:
+            data_queries.append(
+                self.prepare_range_query(
+                    model,
+                    keys,
+                    start,
+                    end,
+                    environment_ids=[environment_id] if environment_id is not None else None,
+                )
+            )
+        for model, keys, start, end, environment_id in distinct_counts_totals:
+            data_queries.append(
+                self.prepare_data_query(
+                    model,
+                    keys,
+                    start,
+                    end,
+                    environment_ids=[environment_id] if environment_id is not None else None,
+                    aggregation="uniq",
+                )
+            )
+
+        to_query = [data_query for data_query in data_queries if data_query.query is not None]
+        try:
+            # Every query is sent under the tsdb-modelid referrer of its model.
+            bodies = snuba.bulk_raw_query(
+                [self.get_data_query_params(data_query) for data_query in to_query],
+                use_cache=use_cache,
+            )
+        except (snuba.QueryOutsideRetentionError, snuba.QueryOutsideGroupActivityError):
+            # A single query outside of the retention or group activity fails
+            # the whole batch, whereas it yields an empty result on its own.
+            return super().read_batch(
+                sums=sums, distinct_counts_totals=distinct_counts_totals, use_cache=use_cache
+            )
+
+        bodies = iter(bodies)
+        results = []
+        for data_query in data_queries:
+            if data_query.query is not None:
+                result = self.nest_data_body(data_query, next(bodies))
+            else:
+                result = {}
+            results.append(self.process_data_result(data_query, result))
+
+        sum_results = [
+            {key: sum(series.values()) for key, series in result.items()}
+            for result in results[: len(sums)]
+        ]
+        return sum_results, results[len(sums) :]
+
     def get_distinct_counts_union(
         self, model, keys, start, end=None, rollup=None, environment_id=None
     ):
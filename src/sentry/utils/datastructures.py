@@ -1,4 +1,5 @@
-from collections import Hashable, MutableMapping
+import threading
+from collections import Hashable, MutableMapping, OrderedDict
 
 __unset__ = object()
 
@@ -59,3 +60,63 @@ class BidirectionalMapping(MutableMapping):
 
     def inverse(self):
         return self.__inverse.copy()
+
+
+class LRUCache:
+    """\
+    A thread safe cache that holds at most ``max_size`` worth of values and
+    evicts the least recently used ones first.
+
+    The size of a value is determined by ``get_size`` and defaults to one per
+    value, making ``max_size`` the maximum number of entries. A single value
+    larger than ``max_size`` is never stored.
+    """
+
+    def __init__(self, max_size, get_size=None):
+        assert max_size > 0
+        self.max_size = max_size
+        self.get_size = get_size or (lambda value: 1)
+        self.size = 0
+        self.__data = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.__lock:
+            try:
+                value, _ = self.__data[key]
+            except KeyError:
+                return default
+            self.__data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = self.get_size(value)
+        with self.__lock:
+            self.__discard(key)
+            if size > self.max_size:
+                return
+            self.__data[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self.__data.popitem(last=False)
+                self.size -= evicted_size
+
+    def delete(self, key):
+        with self.__lock:
+            self.__discard(key)
+
+    def clear(self):
+        with self.__lock:
+            self.__data.clear()
+            self.size = 0
+
+    def __discard(self, key):
+        entry = self.__data.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def __contains__(self, key):
+        return key in self.__data
+
+    def __len__(self):
+        return len(self.__data)
@@ -11,12 +11,14 @@ import functools
 import os
 import pytz
 import re
+import threading
 import time
 import urllib3
+import zlib
 import sentry_sdk
 from sentry_sdk import Hub
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 from django.conf import settings
 from django.core.cache import cache
 from urllib.parse import urlparse
@@ -319,6 +321,16 @@ _snuba_pool = connection_from_url(
 )
 _query_thread_pool = ThreadPoolExecutor(max_workers=10)
 
+# Identical cacheable queries running concurrently in this process share a
+# single request to snuba. Maps query cache keys to the future of the query
+# that is currently in flight.
+_inflight_queries = {}
+_inflight_queries_lock = threading.Lock()
+
+# Queries over a time window that ended less than this many seconds ago may
+# still see late arriving events and are only cached for the base TTL.
+QUERY_CACHE_SETTLE_SECONDS = 300
+
 
 epoch_naive = datetime(1970, 1, 1, tzinfo=None)
 
@@ -569,6 +581,9 @@ class SnubaQueryParams:
     `aggregations` a list of (aggregation_function, column, alias) tuples to be
     passed to the query.
 
+    `referrer`: The referrer of this query, which takes precedence over the
+    referrer its batch is sent with by `bulk_raw_query`.
+
     The rest of the args are passed directly into the query JSON unmodified.
     See the snuba schema for details.
     """
@@ -639,9 +654,12 @@ def raw_query(
 
 
 def bulk_raw_query(snuba_param_list, referrer=None, use_cache=False):
-    headers = {}
-    if referrer:
-        headers["referer"] = referrer
+    """
+    Sends the queries `snuba_param_list` to Snuba concurrently, each with its
+    own referrer if it has one and with `referrer` otherwise.
+    """
+    snuba_param_list = list(snuba_param_list)
+    referrers = [snuba_params.referrer or referrer for snuba_params in snuba_param_list]
 
     # Store the original position of the query so that we can maintain the order
     query_param_list = list(enumerate(map(_prepare_query_params, snuba_param_list)))
@@ -649,58 +667,143 @@ def bulk_raw_query(snuba_param_list, referrer=None, use_cache=False):
     results = []
 
     if use_cache:
-        # sqc - Snuba Query Cache
-        cache_keys = [
-            f"sqc:{sha1(json.dumps(query_params[0], sort_keys=True).encode('utf-8')).hexdigest()}"
-            for _, query_params in query_param_list
-        ]
+        cache_keys = [_get_query_cache_key(query_params[0]) for _, query_params in query_param_list]
         cache_data = cache.get_many(cache_keys)
         to_query = []
+        to_wait = []
         for (query_pos, query_params), cache_key in zip(query_param_list, cache_keys):
+            query_referrer = referrers[query_pos]
+            metric_tags = {"referrer": query_referrer} if query_referrer else None
             cached_result = cache_data.get(cache_key)
-            metric_tags = {"referrer": referrer} if referrer else None
-            if cached_result is None:
+            if cached_result is not None:
+                metrics.incr("snuba.query_cache.hit", tags=metric_tags)
+                results.append((query_pos, _decode_cached_result(cached_result)))
+                continue
+
+            with _inflight_queries_lock:
+                future = _inflight_queries.get(cache_key)
+                if future is None:
+                    _inflight_queries[cache_key] = Future()
+
+            if future is None:
                 metrics.incr("snuba.query_cache.miss", tags=metric_tags)
                 to_query.append((query_pos, query_params, cache_key))
             else:
-                metrics.incr("snuba.query_cache.hit", tags=metric_tags)
-                results.append((query_pos, json.loads(cached_result)))
+                metrics.incr("snuba.query_cache.coalesced", tags=metric_tags)
+                to_wait.append((query_pos, future))
     else:
         to_query = [(query_pos, query_params, None) for query_pos, query_params in query_param_list]
+        to_wait = []
 
     if to_query:
-        query_results = _bulk_snuba_query(map(itemgetter(1), to_query), headers)
-        for result, (query_pos, _, cache_key) in zip(query_results, to_query):
-            if cache_key:
-                cache.set(cache_key, json.dumps(result), settings.SENTRY_SNUBA_CACHE_TTL_SECONDS)
-            results.append((query_pos, result))
+        pending_keys = {cache_key for _, _, cache_key in to_query if cache_key}
+        try:
+            query_results = _bulk_snuba_query(
+                map(itemgetter(1), to_query),
+                [_get_query_headers(referrers[query_pos]) for query_pos, _, _ in to_query],
+            )
+            for result, (query_pos, query_params, cache_key) in zip(query_results, to_query):
+                if cache_key:
+                    cache.set(
+                        cache_key,
+                        _encode_cached_result(result),
+                        _get_query_cache_ttl(query_params[0]),
+                    )
+                    pending_keys.discard(cache_key)
+                    _resolve_inflight_query(cache_key, result=result)
+                results.append((query_pos, result))
+        except BaseException as e:
+            # Waiters on queries we did not get to must not block forever.
+            for cache_key in pending_keys:
+                _resolve_inflight_query(cache_key, exception=e)
+            raise
+
+    for query_pos, future in to_wait:
+        # The result is shared with the query that ran it, hand out a copy
+        # so callers are free to modify it.
+        results.append((query_pos, deepcopy(future.result())))
 
     # Sort so that we get the results back in the original param list order
-    results.sort()
+    results.sort(key=itemgetter(0))
     # Drop the sort order val
     return map(itemgetter(1), results)
 
 
-def _bulk_snuba_query(snuba_param_list, headers):
+def _get_query_headers(referrer):
+    headers = {}
+    if referrer:
+        headers["referer"] = referrer
+    return headers
+
+
+def _get_query_cache_key(query_params):
+    # sqc - Snuba Query Cache
+    return f"sqc:v2:{sha1(json.dumps(query_params, sort_keys=True).encode('utf-8')).hexdigest()}"
+
+
+def _encode_cached_result(result):
+    return zlib.compress(json.dumps(result).encode("utf-8"))
+
+
+def _decode_cached_result(value):
+    return json.loads(zlib.decompress(value))
+
+
+def _get_query_cache_ttl(query_params):
+    """
+    Returns how long the result of a query may be cached for. Results over
+    time windows that ended long ago no longer change, so the TTL grows with
+    the distance of the window end from now, up to a maximum.
+    """
+    ttl = settings.SENTRY_SNUBA_CACHE_TTL_SECONDS
+    try:
+        end = parse_datetime(query_params["to_date"])
+    except (KeyError, ValueError):
+        return ttl
+
+    age = (datetime.utcnow() - end.replace(tzinfo=None)).total_seconds()
+    if age <= QUERY_CACHE_SETTLE_SECONDS:
+        return ttl
+    return int(min(max(ttl, age / 10), settings.SENTRY_SNUBA_CACHE_MAX_TTL_SECONDS))
+
+
+def _resolve_inflight_query(cache_key, result=None, exception=None):
+    with _inflight_queries_lock:
+        future = _inflight_queries.pop(cache_key, None)
+    if future is None:
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+def _bulk_snuba_query(snuba_param_list, headers_list):
+    referrers = {headers.get("referer", "<unknown>") for headers in headers_list}
     with sentry_sdk.start_span(
         op="start_snuba_query",
         description=f"running {len(snuba_param_list)} snuba queries",
     ) as span:
-        span.set_tag("referrer", headers.get("referer", "<unknown>"))
+        span.set_tag("referrer", ",".join(sorted(referrers)))
         if len(snuba_param_list) > 1:
             query_results = list(
                 _query_thread_pool.map(
                     _snuba_query,
-                    [params + (Hub(Hub.current), headers) for params in snuba_param_list],
+                    [
+                        params + (Hub(Hub.current), headers)
+                        for params, headers in zip(snuba_param_list, headers_list)
+                    ],
                 )
             )
         else:
             # No need to submit to the thread pool if we're just performing a
             # single query
-            query_results = [_snuba_query(snuba_param_list[0] + (Hub(Hub.current), headers))]
+            query_results = [
+                _snuba_query(snuba_param_list[0] + (Hub(Hub.current), headers_list[0]))
+            ]
 
     results = []
-    for response, _, reverse in query_results:
+    for (response, _, reverse), headers in zip(query_results, headers_list):
         try:
             body = json.loads(response.data)
             if SNUBA_INFO:
@@ -953,7 +1056,12 @@ def aliased_query(**kwargs):
         return _aliased_query_impl(**kwargs)
 
 
-def _aliased_query_impl(
+def _aliased_query_impl(referrer=None, use_cache=False, **kwargs):
+    snuba_params = aliased_query_params(**kwargs)
+    return bulk_raw_query([snuba_params], referrer=referrer, use_cache=use_cache)[0]
+
+
+def aliased_query_params(
     start=None,
     end=None,
     groupby=None,
@@ -968,6 +1076,10 @@ def _aliased_query_impl(
     condition_resolver=None,
     **kwargs,
 ):
+    """
+    Resolves the column aliases of an `aliased_query` into `SnubaQueryParams`,
+    so that the query can be sent with others using `bulk_raw_query`.
+    """
     if dataset is None:
         raise ValueError("A dataset is required, and is no longer automatically detected.")
 
@@ -1006,7 +1118,7 @@ def _aliased_query_impl(
             updated_order.append("{}{}".format("-" if order.startswith("-") else "", order_field))
         orderby = updated_order
 
-    return raw_query(
+    return SnubaQueryParams(
         start=start,
         end=end,
         groupby=groupby,
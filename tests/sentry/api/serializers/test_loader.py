@@ -0,0 +1,95 @@
+from sentry.api.serializers.loader import AttrsLoader
+from sentry.testutils import TestCase
+from sentry.utils import snuba
+from sentry.utils.compat.mock import patch
+
+
+class AttrsLoaderTest(TestCase):
+    def test_load(self):
+        loader = AttrsLoader("test")
+        loader.add("double", lambda values: [v * 2 for v in values], [1, 2])
+        loader.add_snuba("first", snuba.SnubaQueryParams(), lambda body: body["data"][0], "test")
+        loader.add_snuba("second", snuba.SnubaQueryParams(), lambda body: body["data"][1], "test")
+
+        with patch(
+            "sentry.utils.snuba.bulk_raw_query",
+            return_value=[{"data": ["a", "b"]}, {"data": ["c", "d"]}],
+        ) as bulk_raw_query:
+            results = loader.load()
+
+        assert bulk_raw_query.call_count == 1
+        assert [params.referrer for params in bulk_raw_query.call_args[0][0]] == ["test", "test"]
+        assert results == {"double": [2, 4], "first": "a", "second": "d"}
+
+        # Sources added later are loaded on their own
+        loader.add("dependent", lambda first: first.upper(), results["first"])
+        with patch("sentry.utils.snuba.bulk_raw_query") as bulk_raw_query:
+            loader.load()
+        assert bulk_raw_query.call_count == 0
+        assert loader.results["dependent"] == "A"
+
+    def test_outside_retention(self):
+        def bulk_raw_query(snuba_param_list, referrer=None, use_cache=False):
+            if any(params.start is None for params in snuba_param_list):
+                raise snuba.QueryOutsideRetentionError()
+            return [{"data": [params.kwargs["value"]]} for params in snuba_param_list]
+
+        loader = AttrsLoader("test")
+        loader.add_snuba("expired", snuba.SnubaQueryParams(), lambda body: body["data"], "test")
+        loader.add_snuba(
+            "expired_empty",
+            snuba.SnubaQueryParams(),
+            lambda body: body["data"],
+            "test",
+            empty_outside_retention=True,
+        )
+        loader.add_snuba(
+            "valid",
+            snuba.SnubaQueryParams(value=1),
+            lambda body: body["data"],
+            "test",
+        )
+
+        # SnubaQueryParams defaults the start, unset it to have it "expire"
+        loader._snuba_sources["expired"][0].start = None
+        loader._snuba_sources["expired_empty"][0].start = None
+
+        with patch("sentry.utils.snuba.bulk_raw_query", side_effect=bulk_raw_query):
+            with self.assertRaises(snuba.QueryOutsideRetentionError):
+                loader.load()
+
+        loader = AttrsLoader("test")
+        loader.add_snuba(
+            "expired_empty",
+            snuba.SnubaQueryParams(),
+            lambda body: body["data"],
+            "test",
+            empty_outside_retention=True,
+        )
+        loader.add_snuba(
+            "valid", snuba.SnubaQueryParams(value=1), lambda body: body["data"], "test"
+        )
+        loader._snuba_sources["expired_empty"][0].start = None
+
+        with patch("sentry.utils.snuba.bulk_raw_query", side_effect=bulk_raw_query):
+            assert loader.load() == {"expired_empty": [], "valid": [1]}
+
+    def test_load_referrers_concurrently(self):
+        loader = AttrsLoader("test")
+        loader.add_snuba("first", snuba.SnubaQueryParams(value=1), lambda body: body["data"], "a")
+        loader.add_snuba("second", snuba.SnubaQueryParams(value=2), lambda body: body["data"], "b")
+        loader.add_snuba("third", snuba.SnubaQueryParams(value=3), lambda body: body["data"], "a")
+
+        def bulk_raw_query(snuba_param_list, referrer=None, use_cache=False):
+            return [
+                {"data": [params.referrer, params.kwargs["value"]]} for params in snuba_param_list
+            ]
+
+        with patch(
+            "sentry.utils.snuba.bulk_raw_query", side_effect=bulk_raw_query
+        ) as mock_bulk_raw_query:
+            results = loader.load()
+
+        # All the queries are sent in one batch, each with its own referrer
+        assert mock_bulk_raw_query.call_count == 1
+        assert results == {"first": ["a", 1], "second": ["b", 2], "third": ["a", 3]}
@@ -72,3 +72,39 @@ class BufferTest(TestCase):
         self.buf.process(Group, columns, filters, {"last_seen": the_date}, signal_only=True)
         group.refresh_from_db()
         assert group.times_seen == prev_times_seen
+
+    def test_process_batch(self):
+        group = Group.objects.create(project=Project(id=1))
+        other_group = Group.objects.create(project=Project(id=1))
+        the_date = timezone.now() + timedelta(days=5)
+
+        self.buf.process_batch(
+            [
+                (Group, {"times_seen": 2}, {"id": group.id}, {"last_seen": the_date}, None),
+                (Group, {"times_seen": 3}, {"pk": other_group.id}, None, None),
+                (Group, {"times_seen": 1}, {"message": "foo bar", "project_id": 1}, None, None),
+            ]
+        )
+
+        group_ = Group.objects.get(id=group.id)
+        assert group_.times_seen == group.times_seen + 2
+        assert group_.last_seen == the_date
+
+        other_group_ = Group.objects.get(id=other_group.id)
+        assert other_group_.times_seen == other_group.times_seen + 3
+        assert other_group_.last_seen == other_group.last_seen
+
+        assert Group.objects.get(message="foo bar").times_seen == 2
+
+    def test_process_batch_without_existing_row(self):
+        group = Group.objects.create(project=Project(id=1))
+
+        self.buf.process_batch(
+            [
+                (Group, {"times_seen": 1}, {"id": group.id}, None, None),
+                (Group, {"times_seen": 1}, {"id": group.id + 1000}, {"project_id": 1}, None),
+            ]
+        )
+
+        assert Group.objects.get(id=group.id).times_seen == group.times_seen + 1
+        assert Group.objects.get(id=group.id + 1000).times_seen == 2
@@ -1,10 +1,13 @@
 from datetime import datetime
+import os
 import pickle
 
 from sentry.utils.compat import mock
 
+from celery.signals import worker_process_shutdown
 from django.utils import timezone
 from django.utils.encoding import force_text
+from sentry.buffer import codec
 from sentry.buffer.redis import RedisBuffer
 from sentry.models import Group, Project
 from sentry.testutils import TestCase
@@ -86,9 +89,34 @@ class RedisBufferTest(TestCase):
         self.buf.process("foo")
         process.assert_called_once_with(Group, columns, filters, extra, signal_only)
 
+    @mock.patch("sentry.buffer.base.Buffer.process_batch")
+    def test_process_bulk(self, process_batch):
+        buf = RedisBuffer(bulk_process=True)
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        buf.incr(Group, {"times_seen": 1}, {"pk": 1}, extra={"last_seen": now})
+        buf.incr(Group, {"times_seen": 1}, {"pk": 1})
+        buf.incr(Group, {"times_seen": 3}, {"pk": 2}, signal_only=True)
+
+        keys = [buf._make_key(Group, {"pk": 1}), buf._make_key(Group, {"pk": 2}), "missing"]
+        buf.process(batch_keys=keys)
+
+        process_batch.assert_called_once_with(
+            [
+                (Group, {"times_seen": 2}, {"pk": 1}, {"last_seen": now}, None),
+                (Group, {"times_seen": 3}, {"pk": 2}, {}, True),
+            ]
+        )
+
+        client = buf.cluster.get_routing_client()
+        for key in keys:
+            assert not client.exists(key)
+            assert not client.exists(f"l:{key}")
+        assert client.zrange("b:p", 0, -1) == []
+
     @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
     @mock.patch("sentry.buffer.redis.process_incr", mock.Mock())
     def test_incr_saves_to_redis(self):
+        self.buf.write_pickle = False
         now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
         client = self.buf.cluster.get_routing_client()
         model = mock.Mock()
@@ -101,9 +129,10 @@ class RedisBufferTest(TestCase):
         result = {force_text(k): v for k, v in result.items()}
 
         f = result.pop("f")
-        assert pickle.loads(f) == {"pk": 1, "datetime": now}
-        assert pickle.loads(result.pop("e+datetime")) == now
-        assert pickle.loads(result.pop("e+foo")) == "bar"
+        assert f.startswith(codec.VERSION_1)
+        assert codec.decode(f) == {"pk": 1, "datetime": now}
+        assert codec.decode(result.pop("e+datetime")) == now
+        assert codec.decode(result.pop("e+foo")) == "bar"
         assert result == {"i+times_seen": b"1", "m": b"mock.mock.Mock"}
 
         pending = client.zrange("b:p", 0, -1)
@@ -113,14 +142,106 @@ class RedisBufferTest(TestCase):
         # Force keys to strings
         result = {force_text(k): v for k, v in result.items()}
         f = result.pop("f")
-        assert pickle.loads(f) == {"pk": 1, "datetime": now}
-        assert pickle.loads(result.pop("e+datetime")) == now
-        assert pickle.loads(result.pop("e+foo")) == "baz"
+        assert codec.decode(f) == {"pk": 1, "datetime": now}
+        assert codec.decode(result.pop("e+datetime")) == now
+        assert codec.decode(result.pop("e+foo")) == "baz"
         assert result == {"i+times_seen": b"2", "m": b"mock.mock.Mock"}
 
         pending = client.zrange("b:p", 0, -1)
         assert pending == [b"foo"]
 
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_incr_write_pickle(self, process):
+        buf = RedisBuffer()
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        client = buf.cluster.get_routing_client()
+        buf.incr(Group, {"times_seen": 1}, {"pk": 1}, extra={"last_seen": now})
+
+        result = client.hgetall("foo")
+        assert pickle.loads(result[b"f"]) == {"pk": 1}
+        assert pickle.loads(result[b"e+last_seen"]) == now
+
+        buf.process("foo")
+        process.assert_called_once_with(
+            Group, {"times_seen": 1}, {"pk": 1}, {"last_seen": now}, None
+        )
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    def test_incr_local_buffer_merges(self):
+        buf = RedisBuffer(local_flush_interval=60, local_flush_size=10)
+        self.addCleanup(buf.local_buffer.close)
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        filters = {"pk": 1}
+        buf.incr(model, {"times_seen": 1}, filters, extra={"foo": "bar"})
+        buf.incr(model, {"times_seen": 2}, filters, extra={"foo": "baz", "datetime": now})
+
+        # nothing is written until the local buffer is flushed
+        assert client.hgetall("foo") == {}
+        assert client.zrange("b:p", 0, -1) == []
+
+        buf.local_buffer.flush()
+
+        result = client.hgetall("foo")
+        result = {force_text(k): v for k, v in result.items()}
+        assert codec.decode(result.pop("f")) == filters
+        assert codec.decode(result.pop("e+datetime")) == now
+        assert codec.decode(result.pop("e+foo")) == "baz"
+        assert result == {"i+times_seen": b"3", "m": b"mock.mock.Mock"}
+        assert client.zrange("b:p", 0, -1) == [b"foo"]
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    def test_incr_local_buffer_flushes_on_size(self):
+        buf = RedisBuffer(local_flush_interval=60, local_flush_size=1)
+        self.addCleanup(buf.local_buffer.close)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        buf.incr(model, {"times_seen": 1}, {"pk": 1}, signal_only=True)
+
+        result = client.hgetall("foo")
+        assert result[b"i+times_seen"] == b"1"
+        assert result[b"s"] == b"1"
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    def test_incr_local_buffer_flush_failure(self):
+        buf = RedisBuffer(local_flush_interval=60, local_flush_size=10)
+        self.addCleanup(buf.local_buffer.close)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        buf.incr(model, {"times_seen": 1}, {"pk": 1}, extra={"foo": "bar"})
+
+        with mock.patch.object(buf.cluster, "get_local_client", side_effect=Exception("boom")):
+            buf.local_buffer.flush()
+        assert client.hgetall("foo") == {}
+
+        # the increments that failed are merged with the ones added since
+        buf.incr(model, {"times_seen": 2}, {"pk": 1}, extra={"foo": "baz"})
+        buf.local_buffer.flush()
+
+        result = client.hgetall("foo")
+        assert result[b"i+times_seen"] == b"3"
+        assert codec.decode(result[b"e+foo"]) == "baz"
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    def test_incr_local_buffer_flushes_on_worker_process_shutdown(self):
+        buf = RedisBuffer(local_flush_interval=60, local_flush_size=10)
+        self.addCleanup(buf.local_buffer.close)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        assert client.hgetall("foo") == {}
+
+        # celery prefork children exit without running atexit handlers
+        worker_process_shutdown.send(sender=None, pid=os.getpid(), exitcode=0)
+
+        assert client.hgetall("foo")[b"i+times_seen"] == b"1"
+
     @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
     @mock.patch("sentry.buffer.redis.process_incr")
     @mock.patch("sentry.buffer.redis.process_pending")
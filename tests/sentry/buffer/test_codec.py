@@ -0,0 +1,98 @@
+import os
+import pickle
+import timeit
+from datetime import datetime
+
+import pytest
+from django.utils import timezone
+
+from sentry.buffer import codec
+from sentry.event_manager import ScoreClause
+from sentry.testutils import TestCase
+
+
+class CodecTest(TestCase):
+    def test_roundtrip(self):
+        now = datetime(2017, 5, 3, 6, 6, 6, 123456, tzinfo=timezone.utc)
+        value = {
+            "pk": 1,
+            "datetime": now,
+            "message": "”",
+            "level": 40,
+            "data": {"metadata": {"type": "ValueError"}, "last_received": 1.5},
+        }
+        payload = codec.encode(value)
+        assert payload.startswith(codec.VERSION_1)
+        assert codec.decode(payload) == value
+
+    def test_model_reference(self):
+        payload = codec.encode({"project": self.project})
+        assert codec.decode(payload) == {"project": self.project}
+
+    def test_score_clause(self):
+        result = codec.decode(codec.encode(ScoreClause(self.group)))
+        assert isinstance(result, ScoreClause)
+        assert result.group is None
+
+    def test_pickle_fallback(self):
+        value = {"set": frozenset([1, 2])}
+        assert codec.decode(codec.encode(value)) == value
+
+    def test_legacy_pickle(self):
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        assert codec.decode(pickle.dumps({"pk": 1, "datetime": now})) == {"pk": 1, "datetime": now}
+        assert codec.decode(b"(dp1\nS'pk'\np2\nI1\ns.") == {"pk": 1}
+
+    def test_deleted_model_reference(self):
+        project = self.create_project()
+        payload = codec.encode({"project": project})
+        project_id = project.id
+        project.delete()
+
+        result = codec.decode(payload)["project"]
+        assert result.id == project_id
+        assert result._state.adding
+
+    def test_smaller_than_pickle(self):
+        values = [
+            {"id": 1234567},
+            timezone.now(),
+            "ValueError: invalid literal for int() with base 10",
+            {
+                "metadata": {"type": "ValueError", "value": "invalid literal"},
+                "type": "error",
+                "last_received": 1600000000.0,
+            },
+        ]
+        for value in values:
+            assert len(codec.encode(value)) < len(pickle.dumps(value))
+
+    @pytest.mark.skipif(
+        not os.environ.get("SENTRY_BENCHMARK"), reason="benchmark, set SENTRY_BENCHMARK to run"
+    )
+    def test_benchmark_against_pickle(self):
+        now = timezone.now()
+        filters = {"id": 1234567}
+        extra = {
+            "last_seen": now,
+            "message": "ValueError: invalid literal for int() with base 10",
+            "culprit": "sentry.tasks.store in process_event",
+            "data": {
+                "metadata": {"type": "ValueError", "value": "invalid literal"},
+                "type": "error",
+                "last_received": 1600000000.0,
+            },
+        }
+
+        for name, dumps, loads in (
+            ("pickle", pickle.dumps, pickle.loads),
+            ("codec", codec.encode, codec.decode),
+        ):
+            payloads = [dumps(filters)] + [dumps(v) for v in extra.values()]
+            size = sum(len(p) for p in payloads)
+            dump_time = timeit.timeit(lambda: [dumps(v) for v in extra.values()], number=1000)
+            load_time = timeit.timeit(lambda: [loads(p) for p in payloads], number=1000)
+            print(  # NOQA
+                f"{name}: {size} bytes, "
+                f"dump {dump_time * 1000:.3f}us, load {load_time * 1000:.3f}us"
+            )
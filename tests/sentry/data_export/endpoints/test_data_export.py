@@ -5,6 +5,7 @@ from sentry.data_export.models import ExportedData
 from sentry.search.utils import parse_datetime_string
 from sentry.utils.snuba import MAX_FIELDS
 from sentry.testutils import APITestCase
+from sentry.utils.compat.mock import patch
 
 
 class DataExportTest(APITestCase):
@@ -80,6 +81,24 @@ class DataExportTest(APITestCase):
             "fileName": None,
         }
 
+    @patch("sentry.data_export.endpoints.data_export.assemble_download")
+    def test_export_format(self, mock_assemble_download):
+        payload = self.make_payload("discover")
+        with self.feature("organizations:discover-query"):
+            response = self.get_valid_response(
+                self.org.slug, status_code=201, export_format="jsonl", compress=True, **payload
+            )
+        mock_assemble_download.delay.assert_called_once_with(
+            data_export_id=response.data["id"],
+            export_limit=None,
+            environment_id=None,
+            export_format="jsonl",
+            compress=True,
+        )
+
+        with self.feature("organizations:discover-query"):
+            self.get_valid_response(self.org.slug, status_code=400, export_format="xml", **payload)
+
     def test_progress_export(self):
         """
         Checks to make sure that identical requests (same payload, organization, user)
@@ -1,11 +1,15 @@
+import gzip
+
 from django.db import IntegrityError
-from sentry.data_export.base import ExportQueryType
+from sentry.data_export.base import ExportFormat, ExportQueryType
 from sentry.data_export.models import ExportedData
 from sentry.data_export.tasks import assemble_download, merge_export_blobs
 from sentry.models import File
 from sentry.snuba.discover import InvalidSearchQuery
 from sentry.testutils import TestCase, SnubaTestCase
+from sentry.snuba import discover
 from sentry.testutils.helpers.datetime import iso_format, before_now
+from sentry.utils import json
 from sentry.utils.compat.mock import patch
 from sentry.utils.samples import load_data
 from sentry.utils.snuba import (
@@ -218,6 +222,58 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
 
         assert emailer.called
 
+    @patch("sentry.data_export.models.ExportedData.email_success")
+    def test_discover_paginated_by_cursor(self, emailer):
+        de = ExportedData.objects.create(
+            user=self.user,
+            organization=self.org,
+            query_type=ExportQueryType.DISCOVER,
+            query_info={"project": [self.project.id], "field": ["title"], "query": ""},
+        )
+        with patch("sentry.snuba.discover.query", wraps=discover.query) as mock_query:
+            with self.tasks():
+                assemble_download(de.id, batch_size=1)
+
+        # 3 pages and the empty one after them
+        assert mock_query.call_count == 4
+        first_call, next_calls = mock_query.call_args_list[0], mock_query.call_args_list[1:]
+        assert first_call[1]["offset"] == 0
+        assert first_call[1]["conditions"] is None
+        for call in next_calls:
+            assert call[1]["orderby"] == ["-timestamp", "-id"]
+            assert call[1]["offset"] is None
+            assert call[1]["conditions"][0][0] == "timestamp"
+
+        de = ExportedData.objects.get(id=de.id)
+        header, raw1, raw2, raw3 = de.file.getfile().read().strip().split(b"\r\n")
+        assert header == b"title"
+        assert emailer.called
+
+    @patch("sentry.data_export.models.ExportedData.email_success")
+    def test_discover_aggregates_paginated_by_offset(self, emailer):
+        de = ExportedData.objects.create(
+            user=self.user,
+            organization=self.org,
+            query_type=ExportQueryType.DISCOVER,
+            query_info={
+                "project": [self.project.id],
+                "field": ["environment", "count()"],
+                "query": "",
+            },
+        )
+        with patch("sentry.snuba.discover.query", wraps=discover.query) as mock_query:
+            with self.tasks():
+                assemble_download(de.id, batch_size=1)
+
+        assert [call[1]["offset"] for call in mock_query.call_args_list] == [0, 1, 2]
+        assert all(call[1]["conditions"] is None for call in mock_query.call_args_list)
+
+        de = ExportedData.objects.get(id=de.id)
+        header, raw1, raw2 = de.file.getfile().read().strip().split(b"\r\n")
+        assert header == b"environment,count"
+        assert sorted([raw1, raw2]) == [b"dev,1", b"prod,2"]
+        assert emailer.called
+
     @patch("sentry.data_export.models.ExportedData.email_success")
     def test_discover_respects_selected_environment(self, emailer):
         de = ExportedData.objects.create(
@@ -590,6 +646,31 @@ class AssembleDownloadLargeTest(TestCase, SnubaTestCase):
 
         assert emailer.called
 
+    @patch("sentry.data_export.tasks.MAX_BATCH_SIZE", 200)
+    @patch("sentry.data_export.models.ExportedData.email_success")
+    def test_discover_large_batch_compressed_jsonl(self, emailer):
+        """
+        Every batch is written as its own gzip member, which gzip decompresses
+        as one stream.
+        """
+        de = ExportedData.objects.create(
+            user=self.user,
+            organization=self.org,
+            query_type=ExportQueryType.DISCOVER,
+            query_info={"project": [self.project.id], "field": ["title"], "query": ""},
+        )
+        with self.tasks():
+            assemble_download(de.id, batch_size=3, export_format=ExportFormat.JSONL, compress=True)
+        de = ExportedData.objects.get(id=de.id)
+        assert de.file.name.endswith(".jsonl.gz")
+        assert de.file.headers == {"Content-Type": "application/gzip"}
+
+        lines = gzip.decompress(de.file.getfile().read()).splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {"title": f"/event/{i:03d}/"} for i in range(50)
+        ]
+        assert emailer.called
+
 
 class MergeExportBlobsTest(TestCase, SnubaTestCase):
     def test_task_persistent_name(self):
@@ -4,6 +4,7 @@ from django.utils import timezone
 from sentry.db.deletion import BulkDeleteQuery
 from sentry.models import Group, Project
 from sentry.testutils import TestCase, TransactionTestCase
+from sentry.utils.compat import mock
 
 
 class BulkDeleteQueryTest(TestCase):
@@ -33,6 +34,68 @@ class BulkDeleteQueryTest(TestCase):
         assert not Group.objects.filter(id=group1_2.id).exists()
         assert Group.objects.filter(id=group1_3.id).exists()
 
+    def test_get_id_ranges(self):
+        project = self.create_project()
+        group_ids = sorted(self.create_group(project).id for _ in range(5))
+        query = BulkDeleteQuery(model=Group, project_id=project.id)
+
+        width = (group_ids[-1] - group_ids[0] + 2) // 2
+        assert query.get_id_ranges(2) == [
+            (group_ids[0], group_ids[0] + width),
+            (group_ids[0] + width, group_ids[-1] + 1),
+        ]
+
+        assert len(query.get_id_ranges(100)) == group_ids[-1] - group_ids[0] + 1
+        assert (
+            BulkDeleteQuery(model=Group, project_id=self.create_project().id).get_id_ranges(2) == []
+        )
+
+    def test_execute_range(self):
+        now = timezone.now()
+        project = self.create_project()
+        old_ids = sorted(
+            self.create_group(project, last_seen=now - timedelta(days=2)).id for _ in range(5)
+        )
+        recent = self.create_group(project, last_seen=now)
+        query = BulkDeleteQuery(model=Group, dtfield="last_seen", days=1)
+
+        deleted, _ = query.execute_range((old_ids[0], old_ids[3]), chunk_size=2)
+        assert deleted == 3
+        assert set(Group.objects.filter(project=project).values_list("id", flat=True)) == {
+            old_ids[3],
+            old_ids[4],
+            recent.id,
+        }
+
+        deleted, _ = query.execute_range((old_ids[0], recent.id + 1))
+        assert deleted == 2
+        assert list(Group.objects.filter(project=project).values_list("id", flat=True)) == [
+            recent.id
+        ]
+
+    @mock.patch("sentry.db.deletion.MIN_CHUNK_SIZE", 1)
+    def test_execute_range_adapts_chunk_size(self):
+        project = self.create_project()
+        group_ids = sorted(self.create_group(project).id for _ in range(5))
+        query = BulkDeleteQuery(model=Group, project_id=project.id)
+
+        # Statements that take longer than the target shrink the chunks
+        with mock.patch("sentry.db.deletion.TARGET_STATEMENT_DURATION", 0):
+            deleted, chunk_size = query.execute_range(
+                (group_ids[0], group_ids[-1] + 1), chunk_size=4
+            )
+        assert deleted == 5
+        assert chunk_size == 2
+
+        # Statements that are faster than the target grow them
+        group_ids = sorted(self.create_group(project).id for _ in range(5))
+        with mock.patch("sentry.db.deletion.TARGET_STATEMENT_DURATION", 60):
+            deleted, chunk_size = query.execute_range(
+                (group_ids[0], group_ids[-1] + 1), chunk_size=1
+            )
+        assert deleted == 5
+        assert chunk_size == 4
+
 
 class BulkDeleteQueryIteratorTestCase(TransactionTestCase):
     def test_iteration(self):
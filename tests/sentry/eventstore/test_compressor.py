@@ -1,6 +1,19 @@
 import copy
+from datetime import timedelta
 
-from sentry.eventstore.compressor import deduplicate, assemble
+from django.core.cache import cache
+
+from sentry.eventstore.compressor import (
+    SHARED_BLOB_REFRESH_INTERVAL,
+    _shared_blob_cache,
+    assemble,
+    deduplicate,
+    deduplicate_for_storage,
+    get_shared_blob_id,
+    get_shared_blobs,
+)
+from sentry.utils import json
+from sentry.utils.compat import mock
 
 
 def _assert_roundtrip(data, assert_extra_keys=None):
@@ -52,3 +65,89 @@ def test_basic():
             }
         },
     )
+
+
+def test_modules():
+    _assert_roundtrip({"modules": {}})
+    _assert_roundtrip({"modules": None})
+
+    data = {"modules": {"django": "1.11", "sentry-sdk": "0.19.1"}}
+    new_data, extra_keys = deduplicate(copy.deepcopy(data))
+    assert new_data["__nodestore_patchsets"][0][2] is None
+    assert list(extra_keys.values()) == [data["modules"]]
+    _assert_roundtrip(data)
+
+
+def test_contexts():
+    _assert_roundtrip({"contexts": {}})
+    _assert_roundtrip({"contexts": None})
+
+    data = {
+        "contexts": {
+            "device": {"type": "device", "model": "iPhone10,6", "battery_level": 42},
+            "os": {"type": "os", "name": "iOS", "version": "14.0"},
+            "trace": {"type": "trace", "trace_id": "a" * 32},
+            "unknown": "value",
+        }
+    }
+    new_data, extra_keys = deduplicate(copy.deepcopy(data))
+    assert list(extra_keys.values()) == [
+        {
+            "device": {"type": "device", "model": "iPhone10,6"},
+            "os": {"type": "os", "name": "iOS", "version": "14.0"},
+        }
+    ]
+    _assert_roundtrip(data)
+
+
+@mock.patch("sentry.eventstore.compressor.nodestore")
+def test_shared_blobs(nodestore):
+    _shared_blob_cache.clear()
+    cache.clear()
+    nodestore.default_ttl = timedelta(days=30)
+
+    data = {"modules": {"django": "1.11"}, "message": "hello"}
+    new_data = deduplicate_for_storage(data)
+    assert data == {"modules": {"django": "1.11"}, "message": "hello"}
+    ((checksum, _, _),) = [patchset[1:] for patchset in new_data["__nodestore_patchsets"]]
+
+    # Blobs outlive the events written until they are written again
+    nodestore.set_subkeys_multi.assert_called_once_with(
+        {get_shared_blob_id(checksum): {None: {"django": "1.11"}}},
+        ttl=timedelta(days=30) + SHARED_BLOB_REFRESH_INTERVAL,
+    )
+
+    # The blob is written at most once per refresh interval
+    deduplicate_for_storage(data)
+    assert nodestore.set_subkeys_multi.call_count == 1
+
+    # Hot blobs are read from memory
+    assert assemble(copy.deepcopy(new_data), get_shared_blobs) == data
+    assert not nodestore.get_multi.called
+
+    _shared_blob_cache.clear()
+    nodestore.get_multi.return_value = {get_shared_blob_id(checksum): {"django": "1.11"}}
+    assert assemble(copy.deepcopy(new_data), get_shared_blobs) == data
+    nodestore.get_multi.assert_called_once_with([get_shared_blob_id(checksum)])
+
+    # Events outliving their shared blobs lose the deduplicated parts only
+    _shared_blob_cache.clear()
+    nodestore.get_multi.return_value = {get_shared_blob_id(checksum): None}
+    assert assemble(copy.deepcopy(new_data), get_shared_blobs) == {
+        "modules": None,
+        "message": "hello",
+    }
+
+
+def test_shared_blob_cache_size():
+    _shared_blob_cache.clear()
+    blob = {"images": ["x" * 1024]}
+    size = len(json.dumps(blob, sort_keys=True))
+
+    with mock.patch.object(_shared_blob_cache, "max_size", size * 2):
+        for checksum in ("a", "b", "c"):
+            _shared_blob_cache.set(checksum, blob)
+
+        assert _shared_blob_cache.get("a") is None
+        assert _shared_blob_cache.get("b") == blob
+        assert _shared_blob_cache.get("c") == blob
@@ -200,3 +200,44 @@ def test_package_matching():
     assert not bool(
         bundled_rule.get_matching_frame_actions({"package": "/usr/lib/linux-gate.so"}, "native")
     )
+
+
+@pytest.mark.parametrize("platform", ["native", "javascript", "java"])
+def test_compiled_matches_rule_scan(platform):
+    enhancement = Enhancements.from_config_string(
+        """
+        function:panic_handler                          ^-group -group
+        function:std::*                                 -app
+        module:core::*                                  -app
+        !function:main module:app                       +app
+        family:javascript path:**/test.js app:no        +app
+        family:native package:**/*.app/Contents/**      +app
+        app:yes                                         v+group
+        family:native                                   max-frames=3
+        """,
+        bases=["common:v1"],
+    )
+    frames = [
+        {"function": "std::rt::lang_start", "module": "std::rt", "in_app": True},
+        {"function": "main", "module": "app", "package": "/Applications/Foo.app/Contents/Foo"},
+        {"function": "helper", "module": "app", "in_app": False},
+        {"function": "panic_handler", "module": "core::panicking"},
+        {"abs_path": "http://example.com/test.js", "in_app": False, "platform": "javascript"},
+        {"function": "java.lang.Thread.run", "module": "java.lang.Thread"},
+    ]
+
+    expected = []
+    for rule in enhancement.iter_rules():
+        for idx, frame in enumerate(frames):
+            actions = rule.get_matching_frame_actions(frame, platform)
+            if actions:
+                expected.append((rule, idx, actions))
+
+    compiled = enhancement._get_compiled()
+    assert list(compiled.iter_matching_actions(frames, platform)) == expected
+    assert enhancement._get_compiled() is compiled
+
+
+def test_loads_is_cached():
+    dumped = Enhancements.from_config_string("function:foo -app", bases=["common:v1"]).dumps()
+    assert Enhancements.loads(dumped) is Enhancements.loads(dumped)
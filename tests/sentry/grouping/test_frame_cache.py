@@ -0,0 +1,53 @@
+from sentry import eventstore
+from sentry.event_manager import EventManager
+from sentry.grouping.api import get_default_grouping_config_dict
+from sentry.grouping.strategies import newstyle
+from sentry.utils.compat import mock
+
+
+def _get_event(grouping_config):
+    mgr = EventManager(
+        data={
+            "platform": "python",
+            "exception": {
+                "values": [
+                    {
+                        "type": "ValueError",
+                        "stacktrace": {
+                            "frames": [
+                                {"module": "foo", "function": "bar", "in_app": True},
+                                {"module": "foo", "function": "bar", "in_app": True},
+                                {"module": "baz", "function": "qux", "in_app": False},
+                            ]
+                        },
+                    }
+                ]
+            },
+        },
+        grouping_config=grouping_config,
+    )
+    mgr.normalize()
+    return eventstore.create_event(data=mgr.get_data())
+
+
+@mock.patch("sentry.grouping.strategies.newstyle.metrics")
+def test_frame_components_are_cached(metrics):
+    newstyle._frame_component_cache.clear()
+    grouping_config = get_default_grouping_config_dict("newstyle:2019-10-29")
+
+    first = _get_event(grouping_config).get_grouping_variants(grouping_config)
+    expected = {k: v.as_dict() for k, v in first.items()}
+    misses = metrics.incr.call_count
+    assert misses > 0
+    assert all(c[1]["tags"]["result"] == "miss" for c in metrics.incr.call_args_list)
+    metrics.reset_mock()
+
+    # modifying returned components must not affect the cached ones
+    for variant in first.values():
+        for frame in variant.component.iter_subcomponents("frame", recursive=True):
+            frame.update(contributes=False, hint="modified")
+
+    second = _get_event(grouping_config).get_grouping_variants(grouping_config)
+    assert metrics.incr.call_count == misses
+    assert all(c[1]["tags"]["result"] == "hit" for c in metrics.incr.call_args_list)
+    assert {k: v.as_dict() for k, v in second.items()} == expected
@@ -3,8 +3,11 @@ import pytest
 import time
 
 from sentry.utils import json
+from sentry.utils.compat import mock
 from sentry.ingest.ingest_consumer import (
+    IngestConsumerWorker,
     process_event,
+    process_events,
     process_attachment_chunk,
     process_individual_attachment,
     process_userreport,
@@ -311,3 +314,119 @@ def test_individual_attachments_missing_chunks(default_project, factories, monke
     attachments = list(EventAttachment.objects.filter(project_id=project_id, event_id=event_id))
 
     assert not attachments
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("concurrency", [None, 4], ids=["serial", "threaded"])
+def test_flush_batch_ordering(default_project, factories, monkeypatch, concurrency):
+    other_project = factories.create_project(organization=default_project.organization)
+    calls = []
+
+    def process_events(messages, projects):
+        for message in messages:
+            calls.append(("event", message["project_id"], message["event_id"]))
+
+    def process_attachment_chunk(message, projects):
+        calls.append(("attachment_chunk", message["project_id"], message["event_id"]))
+
+    monkeypatch.setattr("sentry.ingest.ingest_consumer.process_events", process_events)
+    monkeypatch.setattr(
+        "sentry.ingest.ingest_consumer.process_attachment_chunk", process_attachment_chunk
+    )
+
+    batch = []
+    for i in range(10):
+        for project in (default_project, other_project):
+            batch.append({"type": "event", "project_id": project.id, "event_id": i})
+            batch.append({"type": "attachment_chunk", "project_id": project.id, "event_id": i})
+
+    worker = IngestConsumerWorker(concurrency=concurrency)
+    try:
+        worker.flush_batch(batch)
+    finally:
+        worker.shutdown()
+
+    assert len(calls) == len(batch)
+
+    # all chunks are stored before any event referencing them is processed
+    kinds = [name for name, _, _ in calls]
+    assert kinds == ["attachment_chunk"] * 20 + ["event"] * 20
+
+    # ordering within a project is preserved
+    for project in (default_project, other_project):
+        for kind in ("attachment_chunk", "event"):
+            assert [
+                event_id
+                for name, project_id, event_id in calls
+                if name == kind and project_id == project.id
+            ] == list(range(10))
+
+
+@pytest.mark.django_db
+def test_deduplication_within_batch(default_project, preprocess_event):
+    payload = get_normalized_event({"message": "hello world"}, default_project)
+    other_payload = get_normalized_event({"message": "hello world"}, default_project)
+    start_time = time.time() - 3600
+
+    process_events(
+        [
+            {
+                "payload": json.dumps(p),
+                "start_time": start_time,
+                "event_id": p["event_id"],
+                "project_id": default_project.id,
+                "remote_addr": "127.0.0.1",
+            }
+            for p in (payload, other_payload, payload)
+        ],
+        projects={default_project.id: default_project},
+    )
+
+    assert [kwargs["event_id"] for kwargs in preprocess_event] == [
+        payload["event_id"],
+        other_payload["event_id"],
+    ]
+    assert [kwargs["data"] for kwargs in preprocess_event] == [payload, other_payload]
+
+
+@pytest.mark.django_db
+def test_flush_batch_closes_thread_connections(default_project, monkeypatch):
+    monkeypatch.setattr(
+        "sentry.ingest.ingest_consumer.process_events", lambda messages, projects: None
+    )
+
+    worker = IngestConsumerWorker(concurrency=4)
+    try:
+        with mock.patch("sentry.ingest.ingest_consumer.connections") as connections:
+            worker.flush_batch(
+                [{"type": "event", "project_id": default_project.id, "event_id": uuid.uuid4().hex}]
+            )
+    finally:
+        worker.shutdown()
+
+    assert connections.close_all.call_count == 1
+
+
+@pytest.mark.django_db
+def test_process_events_metrics(default_project, preprocess_event):
+    payloads = [get_normalized_event({"message": "hello world"}, default_project) for _ in range(2)]
+
+    with mock.patch("sentry.utils.metrics.timing") as timing:
+        process_events(
+            [
+                {
+                    "payload": json.dumps(payload),
+                    "start_time": time.time() - 3600,
+                    "event_id": payload["event_id"],
+                    "project_id": default_project.id,
+                    "remote_addr": "127.0.0.1",
+                }
+                for payload in payloads
+            ],
+            projects={default_project.id: default_project},
+        )
+
+    # The batch is timed, and every event still reports its own timing
+    keys = [args[0] for args, _ in timing.call_args_list]
+    assert keys.count("ingest_consumer.process_event_batch") == 1
+    assert keys.count("ingest_consumer.process_event") == 2
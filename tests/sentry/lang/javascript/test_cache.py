@@ -1,4 +1,4 @@
-from sentry.lang.javascript.cache import SourceCache
+from sentry.lang.javascript.cache import ParsedViewCache, SourceCache
 from unittest import TestCase
 
 
@@ -36,3 +36,27 @@ class BasicCacheTest(TestCase):
         # fall back to utf-8
         cache.add(url, "foobar".encode("utf-32"), encoding="utf-32")
         assert cache.get(url)[0] == "foobar"
+
+
+class ParsedViewCacheTest(TestCase):
+    def test_get_or_parse(self):
+        cache = ParsedViewCache(max_size=10)
+        parsed = []
+
+        def parse(body):
+            parsed.append(body)
+            return object()
+
+        key = ("source", 1, None, "http://example.com/foo.js")
+        view = cache.get_or_parse(key, b"foo", parse)
+        assert cache.get_or_parse(key, b"foo", parse) is view
+        assert parsed == [b"foo"]
+
+        # a changed payload under the same url is parsed again
+        assert cache.get_or_parse(key, b"bar", parse) is not view
+        assert parsed == [b"foo", b"bar"]
+
+        # payloads are accounted for by size, evicting the oldest views
+        cache.get_or_parse(("source", 1, None, "http://example.com/bar.js"), b"x" * 8, parse)
+        cache.get_or_parse(key, b"foo", parse)
+        assert parsed == [b"foo", b"bar", b"x" * 8, b"foo"]
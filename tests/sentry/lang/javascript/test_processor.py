@@ -686,6 +686,9 @@ class FetchSourcemapTest(TestCase):
         assert sv.get_source() == 'console.log("hello, World!")'
         assert smap_view.get_source_name(0) == "/test.js"
 
+    def test_parsed_view_is_reused(self):
+        assert fetch_sourcemap(base64_sourcemap) is fetch_sourcemap(base64_sourcemap)
+
     def test_broken_base64(self):
         with pytest.raises(UnparseableSourcemap):
             fetch_sourcemap("data:application/json;base64,xxx")
@@ -1,4 +1,7 @@
+import struct
+
 import pytest
+import zstandard
 
 from sentry.nodestore.bigtable.backend import BigtableNodeStorage
 from sentry.utils.cache import memoize
@@ -49,7 +52,7 @@ class MockedBigtableNodeStorage(BigtableNodeStorage):
 
         def mutate_rows(self, rows):
             # commits not implemented, changes are applied immediately
-            pass
+            return [mock.Mock(code=0) for _ in rows]
 
     @memoize
     def connection(self):
@@ -91,6 +94,28 @@ def test_get(ns, compression, expected_prefix):
     assert raw_data.startswith(expected_prefix)
 
 
+def test_get_with_dictionary(ns):
+    dictionary = zstandard.ZstdCompressionDict(
+        b'{"foo":"bar","platform":"python"}' * 10, dict_type=zstandard.DICT_TYPE_RAWCONTENT
+    )
+    ns.compression = "zstd"
+    ns.cache = None
+    data = {"foo": "bar", "platform": "python"}
+
+    with mock.patch(
+        "sentry.nodestore.compression.get_active_dictionary_id", return_value=1234
+    ), mock.patch.dict("sentry.nodestore.compression._dictionaries", {1234: dictionary}):
+        ns.set("node_id", data)
+
+        flags = ns.connection.read_row("node_id").cells["x"][b"f"][0].value
+        assert flags == struct.pack(
+            "<BI", ns._FLAG_COMPRESSED_ZSTD | ns._FLAG_ZSTD_DICTIONARY, 1234
+        )
+
+        ns.compression = lambda: 1 / 0
+        assert ns.get("node_id") == data
+
+
 def test_cache(ns):
     node_1 = ("a" * 32, {"foo": "a"})
     node_2 = ("b" * 32, {"foo": "b"})
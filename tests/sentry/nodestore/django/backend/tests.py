@@ -2,8 +2,10 @@ from datetime import timedelta
 import pickle
 
 import pytest
+import zstandard
 
 from django.utils import timezone
+from sentry.eventstore.compressor import SHARED_BLOB_REFRESH_INTERVAL, get_shared_blob_id
 from sentry.nodestore.base import json_dumps
 from sentry.nodestore.django.models import Node
 from sentry.nodestore.django.backend import DjangoNodeStorage
@@ -48,9 +50,37 @@ class TestDjangoNodeStorage:
     def test_set(self):
         self.ns.set("d2502ebbd7df41ceba8d3275595cac33", {"foo": "bar"})
         assert Node.objects.get(id="d2502ebbd7df41ceba8d3275595cac33").data == compress(
-            b'{"foo":"bar"}'
+            self.ns._encode({None: {"foo": "bar"}})
         )
 
+    def test_set_zstd(self):
+        dictionary = zstandard.ZstdCompressionDict(
+            b'{"foo":"bar","platform":"python"}' * 10, dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+        ns = DjangoNodeStorage(compression="zstd")
+        ns.cache = None
+        data = {"foo": "bar", "platform": "python"}
+
+        with mock.patch(
+            "sentry.nodestore.compression.get_active_dictionary_id", return_value=1234
+        ), mock.patch.dict("sentry.nodestore.compression._dictionaries", {1234: dictionary}):
+            ns.set("d2502ebbd7df41ceba8d3275595cac33", data)
+            ns.set_subkeys_multi({"d2502ebbd7df41ceba8d3275595cac34": {None: {"foo": "baz"}}})
+
+            assert Node.objects.get(id="d2502ebbd7df41ceba8d3275595cac33").data.startswith(
+                "zstd:1234:"
+            )
+            assert Node.objects.get(id="d2502ebbd7df41ceba8d3275595cac34").data.startswith(
+                "zstd:0:"
+            )
+            # zstd nodes are readable by backends configured with zlib
+            assert self.ns.get_multi(
+                ["d2502ebbd7df41ceba8d3275595cac33", "d2502ebbd7df41ceba8d3275595cac34"]
+            ) == {
+                "d2502ebbd7df41ceba8d3275595cac33": data,
+                "d2502ebbd7df41ceba8d3275595cac34": {"foo": "baz"},
+            }
+
     def test_delete(self):
         node = Node.objects.create(id="d2502ebbd7df41ceba8d3275595cac33", data=b'{"foo": "bar"}')
 
@@ -80,6 +110,29 @@ class TestDjangoNodeStorage:
         assert Node.objects.filter(id=node.id).exists()
         assert not Node.objects.filter(id=node2.id).exists()
 
+    def test_cleanup_shared_blobs(self):
+        now = timezone.now()
+        blob_id = get_shared_blob_id("a" * 32)
+        event_id = "d2502ebbd7df41ceba8d3275595cac33"
+
+        with mock.patch("django.utils.timezone.now", return_value=now - timedelta(days=3)):
+            self.ns.set_subkeys_multi({blob_id: {None: {"foo": "bar"}}})
+
+        # An event referencing the blob is written just before the blob is due
+        # to be written again
+        written = now - timedelta(days=3) + SHARED_BLOB_REFRESH_INTERVAL - timedelta(minutes=1)
+        with mock.patch("django.utils.timezone.now", return_value=written):
+            self.ns.set(event_id, {"foo": "baz"})
+
+        # The blob is kept as long as the event
+        self.ns.cleanup(now - timedelta(days=3))
+        assert Node.objects.filter(id=event_id).exists()
+        assert Node.objects.filter(id=blob_id).exists()
+
+        self.ns.cleanup(now - timedelta(days=2))
+        assert not Node.objects.filter(id=event_id).exists()
+        assert not Node.objects.filter(id=blob_id).exists()
+
     def test_cache(self):
         node_1 = ("a" * 32, {"foo": "a"})
         node_2 = ("b" * 32, {"foo": "b"})
@@ -3,8 +3,10 @@ Testsuite of backend-independent nodestore tests. Add your backend to the
 `ns` fixture to have it tested.
 """
 
+from sentry.nodestore.base import ENCODING_V1
 from sentry.nodestore.django.backend import DjangoNodeStorage
 from sentry.nodestore.bigtable.backend import BigtableNodeStorage
+from sentry.testutils.helpers import override_options
 from tests.sentry.nodestore.bigtable.backend.tests import MockedBigtableNodeStorage
 
 import pytest
@@ -63,6 +65,41 @@ def test_delete_multi(ns):
     assert not ns.get(nodes[1][0])
 
 
+def test_set_subkeys_multi(ns):
+    ns.set("node_1", {"foo": "old"})
+
+    ns.set_subkeys_multi(
+        {
+            "node_1": {None: {"foo": "a"}},
+            "node_2": {None: {"foo": "b"}, "other": {"foo": "c"}},
+        }
+    )
+
+    ns.cache = None
+    assert ns.get_multi(["node_1", "node_2"]) == {"node_1": {"foo": "a"}, "node_2": {"foo": "b"}}
+    assert ns.get("node_2", subkey="other") == {"foo": "c"}
+
+
+def test_get_legacy_subkeys(ns):
+    ns._set_bytes("node_1", b'{"foo":"a"}\nother\n{"foo":"b"}')
+
+    ns.cache = None
+    assert ns.get("node_1") == {"foo": "a"}
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+    assert ns.get("node_1", subkey="missing") is None
+
+
+def test_get_indexed_subkeys(ns):
+    with override_options({"nodestore.indexed-encoding": True}):
+        ns.set_subkeys("node_1", {None: {"foo": "a"}, "other": {"foo": "b"}})
+
+    ns.cache = None
+    assert ns._get_bytes("node_1")[:1] == ENCODING_V1
+    assert ns.get("node_1") == {"foo": "a"}
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+    assert ns.get("node_1", subkey="missing") is None
+
+
 def test_set_subkeys(ns):
     """
     Subkeys are used to store multiple JSON payloads under the same main key.
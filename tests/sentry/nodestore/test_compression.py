@@ -0,0 +1,167 @@
+import os
+import random
+import timeit
+import zlib
+
+import pytest
+import zstandard
+
+from sentry.nodestore import compression
+from sentry.nodestore.base import json_dumps
+from sentry.testutils import TestCase
+from sentry.testutils.helpers import override_options
+
+
+def make_payloads(count, seed=0):
+    """
+    Payloads resembling Python events: the same handful of modules and
+    functions with varying ids, timestamps, values and line numbers.
+    """
+    rng = random.Random(seed)
+    modules = [f"app.views.{name}" for name in ("auth", "billing", "projects", "teams")]
+    functions = ["dispatch", "get", "post", "handle", "serialize", "validate"]
+    exceptions = ["ValueError", "KeyError", "TypeError", "OperationalError"]
+
+    payloads = []
+    for i in range(count):
+        frames = []
+        for _ in range(rng.randint(5, 20)):
+            module = rng.choice(modules)
+            frames.append(
+                {
+                    "abs_path": "/srv/app/src/{}.py".format(module.replace(".", "/")),
+                    "context_line": f"    return {rng.choice(functions)}(request, *args)",
+                    "filename": "{}.py".format(module.replace(".", "/")),
+                    "function": rng.choice(functions),
+                    "in_app": True,
+                    "lineno": rng.randint(1, 500),
+                    "module": module,
+                    "vars": {"request": "<WSGIRequest>", "pk": str(rng.randint(1, 10 ** 6))},
+                }
+            )
+        event = {
+            "event_id": "%032x" % rng.getrandbits(128),
+            "platform": "python",
+            "timestamp": 1600000000 + i,
+            "level": "error",
+            "sdk": {"name": "sentry.python", "version": "0.19.5"},
+            "contexts": {"runtime": {"type": "runtime", "name": "CPython", "version": "3.6.12"}},
+            "exception": {
+                "values": [
+                    {
+                        "type": rng.choice(exceptions),
+                        "value": f"invalid literal for int() with base 10: '{rng.random()}'",
+                        "stacktrace": {"frames": frames},
+                    }
+                ]
+            },
+            "tags": [["server_name", f"web-{rng.randint(1, 40)}"], ["environment", "prod"]],
+        }
+        payloads.append(json_dumps(event).encode("utf-8"))
+
+    return payloads
+
+
+class CompressionTest(TestCase):
+    def setUp(self):
+        compression._dictionaries.clear()
+        compression._active_dictionaries.clear()
+        compression._local.__dict__.clear()
+
+    def test_without_dictionary(self):
+        data = make_payloads(1)[0]
+        compressed, dict_id = compression.compress(data)
+        assert dict_id == 0
+        assert compressed.startswith(b"\x28\xb5\x2f\xfd")
+        assert compression.decompress(compressed) == data
+
+        with override_options({"nodestore.zstd-dictionaries": False}):
+            assert compression.compress(data, platform="python")[1] == 0
+
+    def test_train_dictionary(self):
+        payloads = make_payloads(compression.MIN_SAMPLES)
+
+        with override_options(
+            {"nodestore.zstd-dictionaries": True, "nodestore.zstd-dictionary-sample-rate": 1.0}
+        ):
+            for payload in payloads:
+                _, dict_id = compression.compress(payload, platform="python")
+                assert dict_id == 0
+
+            assert "python" in compression.get_sampled_platforms()
+            node_dictionary = compression.train_dictionary("python")
+            assert node_dictionary.platform == "python"
+
+            # The active dictionary is cached for a while
+            assert compression.compress(payloads[0], platform="python")[1] == 0
+            compression._active_dictionaries.clear()
+
+            compressed, dict_id = compression.compress(payloads[0], platform="python")
+            assert dict_id == node_dictionary.id
+            assert zstandard.get_frame_parameters(compressed).dict_id == node_dictionary.id
+
+        # Another process can read the node regardless of options
+        self.setUp()
+        assert compression.decompress(compressed, dict_id) == payloads[0]
+
+    def test_train_dictionary_without_samples(self):
+        assert compression.train_dictionary("cocoa") is None
+
+    def test_sample_truncated(self):
+        data = b"x" * (compression.MAX_SAMPLE_SIZE + 1)
+
+        with override_options({"nodestore.zstd-dictionary-sample-rate": 1.0}):
+            compression.sample(data, "python")
+
+        client = compression._get_samples_cluster()
+        samples = client.lrange(compression._get_samples_key("python"), 0, -1)
+        assert samples[0] == data[: compression.MAX_SAMPLE_SIZE]
+
+    def test_dictionary_ratio(self):
+        samples = make_payloads(1000, seed=1)
+        payloads = make_payloads(200, seed=2)
+        dictionary = zstandard.train_dictionary(compression.DICTIONARY_SIZE, samples)
+
+        cctx = zstandard.ZstdCompressor(level=compression.COMPRESSION_LEVEL)
+        dict_cctx = zstandard.ZstdCompressor(
+            level=compression.COMPRESSION_LEVEL, dict_data=dictionary
+        )
+        dict_dctx = zstandard.ZstdDecompressor(dict_data=dictionary)
+
+        compressed = [dict_cctx.compress(p) for p in payloads]
+        assert [dict_dctx.decompress(c) for c in compressed] == payloads
+
+        size = sum(len(c) for c in compressed)
+        assert size < sum(len(cctx.compress(p)) for p in payloads)
+        assert size < sum(len(zlib.compress(p)) for p in payloads)
+
+    @pytest.mark.skipif(
+        not os.environ.get("SENTRY_BENCHMARK"), reason="benchmark, set SENTRY_BENCHMARK to run"
+    )
+    def test_benchmark_dictionary(self):
+        samples = make_payloads(1000, seed=1)
+        payloads = make_payloads(200, seed=2)
+        dictionary = zstandard.train_dictionary(compression.DICTIONARY_SIZE, samples)
+
+        cctx = zstandard.ZstdCompressor(level=compression.COMPRESSION_LEVEL)
+        dctx = zstandard.ZstdDecompressor()
+        dict_cctx = zstandard.ZstdCompressor(
+            level=compression.COMPRESSION_LEVEL, dict_data=dictionary
+        )
+        dict_dctx = zstandard.ZstdDecompressor(dict_data=dictionary)
+
+        raw_size = sum(len(p) for p in payloads)
+        for name, compress, decompress in (
+            ("zlib", zlib.compress, zlib.decompress),
+            ("zstd", cctx.compress, dctx.decompress),
+            ("zstd+dictionary", dict_cctx.compress, dict_dctx.decompress),
+        ):
+            compressed = [compress(p) for p in payloads]
+            size = sum(len(c) for c in compressed)
+            compress_time = timeit.timeit(lambda: [compress(p) for p in payloads], number=5)
+            decompress_time = timeit.timeit(lambda: [decompress(c) for c in compressed], number=5)
+            print(  # NOQA
+                f"{name}: ratio {raw_size / size:.2f}, "
+                f"compress {raw_size * 5 / compress_time / 2 ** 20:.1f}MB/s, "
+                f"decompress {raw_size * 5 / decompress_time / 2 ** 20:.1f}MB/s"
+            )
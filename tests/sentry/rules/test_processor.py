@@ -17,6 +17,13 @@ EMAIL_ACTION_DATA = {
 
 EVERY_EVENT_COND_DATA = {"id": "sentry.rules.conditions.every_event.EveryEventCondition"}
 
+FIRST_SEEN_COND_DATA = {"id": "sentry.rules.conditions.first_seen_event.FirstSeenEventCondition"}
+
+EVENT_FREQUENCY_COND_ID = "sentry.rules.conditions.event_frequency.EventFrequencyCondition"
+EVENT_UNIQUE_USER_FREQUENCY_COND_ID = (
+    "sentry.rules.conditions.event_frequency.EventUniqueUserFrequencyCondition"
+)
+
 
 class RuleProcessorTest(TestCase):
     def setUp(self):
@@ -83,6 +90,115 @@ class RuleProcessorTest(TestCase):
         results = list(rp.apply())
         assert len(results) == 0
 
+    def test_rule_statuses_prefetched(self):
+        other_rule = Rule.objects.create(
+            project=self.event.project,
+            data={"conditions": [EVERY_EVENT_COND_DATA], "actions": [EMAIL_ACTION_DATA]},
+        )
+        GroupRuleStatus.objects.create(
+            rule=self.rule,
+            group=self.event.group,
+            project=self.project,
+            last_active=timezone.now(),
+        )
+
+        rp = RuleProcessor(
+            self.event,
+            is_new=True,
+            is_regression=True,
+            is_new_group_environment=True,
+            has_reappeared=True,
+        )
+        with patch.object(GroupRuleStatus.objects, "get_or_create") as get_or_create:
+            results = list(rp.apply())
+        assert get_or_create.call_count == 0
+        assert len(results) == 1
+        callback, futures = results[0]
+        assert [future.rule for future in futures] == [other_rule]
+        assert GroupRuleStatus.objects.filter(group=self.event.group).count() == 2
+
+        # the statuses are cached from now on
+        rp = RuleProcessor(
+            self.event,
+            is_new=True,
+            is_regression=True,
+            is_new_group_environment=True,
+            has_reappeared=True,
+        )
+        with patch.object(GroupRuleStatus.objects, "filter") as filter:
+            rp.bulk_get_rule_status([self.rule, other_rule])
+        assert filter.call_count == 0
+
+    def test_frequency_conditions_batched(self):
+        Rule.objects.filter(project=self.event.project).delete()
+        rules = [
+            Rule.objects.create(
+                project=self.event.project,
+                data={"conditions": [condition], "actions": [EMAIL_ACTION_DATA]},
+            )
+            for condition in (
+                {"id": EVENT_FREQUENCY_COND_ID, "interval": "1h", "value": 3},
+                {"id": EVENT_FREQUENCY_COND_ID, "interval": "1h", "value": 10},
+                {"id": EVENT_UNIQUE_USER_FREQUENCY_COND_ID, "interval": "1h", "value": 1},
+            )
+        ]
+
+        rp = RuleProcessor(
+            self.event,
+            is_new=True,
+            is_regression=True,
+            is_new_group_environment=True,
+            has_reappeared=True,
+        )
+        group_id = self.event.group_id
+        with patch(
+            "sentry.tsdb.read_batch", return_value=([{group_id: 5}], [{group_id: 2}])
+        ) as read_batch:
+            results = list(rp.apply())
+
+        assert read_batch.call_count == 1
+        assert len(read_batch.call_args[1]["sums"]) == 1
+        assert len(read_batch.call_args[1]["distinct_counts_totals"]) == 1
+        assert len(results) == 1
+        callback, futures = results[0]
+        assert {future.rule for future in futures} == {rules[0], rules[2]}
+
+    def test_frequency_conditions_not_reached(self):
+        Rule.objects.filter(project=self.event.project).delete()
+        frequency_condition = {"id": EVENT_FREQUENCY_COND_ID, "interval": "1h", "value": 3}
+        for action_match, conditions in (
+            # decided by the failing first seen condition
+            ("all", [FIRST_SEEN_COND_DATA, frequency_condition]),
+            # decided by the passing every event condition
+            ("any", [EVERY_EVENT_COND_DATA, frequency_condition]),
+            # only the first frequency condition is certain to be evaluated
+            ("all", [frequency_condition, dict(frequency_condition, interval="1d")]),
+        ):
+            Rule.objects.create(
+                project=self.event.project,
+                data={
+                    "action_match": action_match,
+                    "conditions": conditions,
+                    "actions": [EMAIL_ACTION_DATA],
+                },
+            )
+
+        rp = RuleProcessor(
+            self.event,
+            is_new=False,
+            is_regression=True,
+            is_new_group_environment=True,
+            has_reappeared=True,
+        )
+        group_id = self.event.group_id
+        with patch("sentry.tsdb.read_batch", return_value=([{group_id: 5}], [])) as read_batch:
+            rates = rp.get_condition_rates(list(rp.get_rules()))
+
+        assert read_batch.call_count == 1
+        ((_, _, start, end, _),) = read_batch.call_args[1]["sums"]
+        assert end - start == timedelta(hours=1)
+        assert list(rates.values()) == [5]
+
 
 # mock filter which always passes
 class MockFilterTrue(EventFilter):
@@ -189,3 +189,27 @@ class MinHashIndexBackendTestMixin:
     @abc.abstractmethod
     def test_export_import(self):
         pass
+
+    def test_multi(self):
+        results = self.index.record_multi(
+            "example",
+            [
+                ("1", [("index:a", "hello world"), ("index:b", "hello world")], None),
+                ("2", [("index:a", "hello world")], None),
+                ("3", [], None),
+                ("4", [("index:b", "pizza world")], None),
+            ],
+        )
+        assert len(results) == 4
+
+        # the same as recording every key on its own
+        self.index.record("example", "5", [("index:a", "hello world")])
+        assert self.index.compare("example", "2", [("index:a", 0)])[:3] == [
+            ("1", [1.0]),
+            ("2", [1.0]),
+            ("5", [1.0]),
+        ]
+
+        # Every key is recorded at its own timestamp, this one long expired
+        self.index.record_multi("example", [("6", [("index:a", "hello world")], 0)])
+        assert "6" not in [key for key, _ in self.index.compare("example", "2", [("index:a", 0)])]
@@ -0,0 +1,79 @@
+from sentry import similarity
+from sentry.similarity.encoder import Encoder
+from sentry.similarity.features import FeatureSet, InterfaceDoesNotExist, MessageFeature
+from sentry.testutils import TestCase
+from sentry.testutils.helpers import Feature
+from sentry.testutils.helpers.datetime import before_now, iso_format
+from sentry.utils.compat import mock
+from sentry.utils.datastructures import BidirectionalMapping
+from sentry.utils.dates import to_timestamp
+
+
+class FeatureSetTest(TestCase):
+    def setUp(self):
+        self.index = mock.Mock()
+        self.features = FeatureSet(
+            self.index,
+            Encoder(),
+            BidirectionalMapping({"message:words": "a"}),
+            {"message:words": MessageFeature(lambda message: message.formatted.split())},
+            expected_extraction_errors=(InterfaceDoesNotExist,),
+            expected_encoding_errors=(),
+        )
+        other_project = self.create_project(organization=self.organization)
+        self.messages = ["hello world", "goodbye world", "hello there"]
+        self.events = [
+            self.store_event(
+                data={"message": message, "timestamp": iso_format(before_now(minutes=minutes))},
+                project_id=project.id,
+            )
+            for message, minutes, project in zip(
+                self.messages, (1, 60 * 24, 5), (self.project, self.project, other_project)
+            )
+        ]
+
+    def get_entry(self, i):
+        event = self.events[i]
+        features = [word.encode("utf8") for word in self.messages[i].split()]
+        return str(event.group_id), features, int(to_timestamp(event.datetime))
+
+    def test_record_multi(self):
+        self.index.record_multi.side_effect = lambda scope, items: [
+            f"{scope}:{key}" for key, _, _ in items
+        ]
+
+        results = self.features.record_multi(self.events)
+
+        # Events are recorded with one call per project, each at its own
+        # timestamp
+        entries = [self.get_entry(i) for i in range(3)]
+        assert self.index.record_multi.call_args_list == [
+            mock.call(
+                str(self.project.id),
+                [(key, [("a", features)], timestamp) for key, features, timestamp in entries[:2]],
+            ),
+            mock.call(
+                str(self.events[2].project_id),
+                [(key, [("a", features)], timestamp) for key, features, timestamp in entries[2:]],
+            ),
+        ]
+        assert results == [f"{event.project_id}:{event.group_id}" for event in self.events]
+
+
+class RecordMultiTest(TestCase):
+    def test_record_multi(self):
+        other_project = self.create_project(organization=self.organization)
+        events = [
+            self.store_event(data={"message": "hello world"}, project_id=project.id)
+            for project in (self.project, other_project)
+        ]
+
+        with mock.patch.object(similarity, "features") as features, mock.patch.object(
+            similarity, "features2"
+        ) as features2, Feature(
+            {"projects:similarity-indexing": True, "projects:similarity-indexing-v2": False}
+        ):
+            similarity.record_multi(events)
+
+        features.record_multi.assert_called_once_with(events)
+        assert not features2.record_multi.called
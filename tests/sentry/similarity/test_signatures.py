@@ -1,16 +1,25 @@
+import os
+import timeit
 from collections import Counter
 from unittest import TestCase
 
-from sentry.similarity.signatures import MinHashSignatureBuilder
-from sentry.utils.compat import map
+import mmh3
+import pytest
+from django.test import override_settings
+
+from sentry.similarity import _make_index_backend, signatures
+from sentry.similarity.signatures import MinHashSignatureBuilder, UniversalHashSignatureBuilder
+from sentry.utils.compat import map, mock
 from sentry.utils.compat import zip
 
 
 class MinHashSignatureBuilderTestCase(TestCase):
+    builder = MinHashSignatureBuilder
+
     def test_signatures(self):
         n = 32
         r = 0xFFFF
-        get_signature = MinHashSignatureBuilder(n, r)
+        get_signature = self.builder(n, r)
         get_signature({"foo", "bar", "baz"}) == get_signature({"foo", "bar", "baz"})
 
         assert len(get_signature("hello world")) == n
@@ -30,3 +39,49 @@ class MinHashSignatureBuilderTestCase(TestCase):
         self.assertAlmostEqual(
             similarity, estimation, delta=0.1  # totally made up constant, seems reasonable
         )
+
+    def test_compatibility(self):
+        features = ["foo", "bar", "foo", "baz"]
+        assert MinHashSignatureBuilder(16, 0xFFFF)(features) == [
+            min(mmh3.hash(feature, column) % 0xFFFF for feature in features) for column in range(16)
+        ]
+
+
+class UniversalHashSignatureBuilderTestCase(MinHashSignatureBuilderTestCase):
+    builder = UniversalHashSignatureBuilder
+
+    def test_compatibility(self):
+        pytest.importorskip("numpy")
+        features = {f"feature:{i}".encode("utf8") for i in range(100)}
+        signature = UniversalHashSignatureBuilder(16, 0xFFFF)(features)
+        assert all(isinstance(value, int) for value in signature)
+
+        # The same signatures with or without NumPy
+        with mock.patch.object(signatures, "np", None):
+            assert UniversalHashSignatureBuilder(16, 0xFFFF)(features) == signature
+
+    @pytest.mark.skipif(
+        not os.environ.get("SENTRY_BENCHMARK"), reason="benchmark, set SENTRY_BENCHMARK to run"
+    )
+    def test_benchmark(self):
+        pytest.importorskip("numpy")
+        feature_sets = [{f"feature:{i}:{j}".encode("utf8") for j in range(200)} for i in range(20)]
+
+        for builder in (MinHashSignatureBuilder, UniversalHashSignatureBuilder):
+            get_signature = builder(16, 0xFFFF)
+            duration = timeit.timeit(lambda: list(map(get_signature, feature_sets)), number=10)
+            print(  # NOQA
+                f"{builder.__name__}: {duration / (10 * len(feature_sets)) * 1000:.3f}ms per set"
+            )
+
+
+class MakeIndexBackendTestCase(TestCase):
+    def test_signature_builder(self):
+        index = _make_index_backend(mock.Mock(), namespace="sim:1")
+        assert index.namespace == "sim:1"
+        assert isinstance(index.signature_builder, MinHashSignatureBuilder)
+
+        with override_settings(SENTRY_SIMILARITY_UNIVERSAL_HASH_SIGNATURES=True):
+            index = _make_index_backend(mock.Mock(), namespace="sim:1")
+        assert index.namespace == "sim:1:u"
+        assert isinstance(index.signature_builder, UniversalHashSignatureBuilder)
@@ -0,0 +1,103 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from pytz import UTC
+
+from sentry.tagstore.snuba import cache as tagstore_cache
+from sentry.testutils import TestCase
+from sentry.utils.compat import mock
+
+
+class GetCacheKeyTest(TestCase):
+    def test_overlapping_windows(self):
+        end = datetime(2020, 10, 1, 12, 0, 0, tzinfo=UTC)
+        start = end - timedelta(days=14)
+        cache_key, bucket_start, bucket_end = tagstore_cache.get_cache_key(
+            "tag_keys", start, end, filter_keys={"project_id": [1]}
+        )
+        assert bucket_start <= start
+        assert bucket_end <= end
+        assert end - bucket_end < timedelta(seconds=tagstore_cache.TIME_BUCKET_SIZE)
+
+        # A few seconds later, the window rounds to the same bucket
+        assert (
+            tagstore_cache.get_cache_key(
+                "tag_keys",
+                bucket_start + timedelta(seconds=5),
+                bucket_end + timedelta(seconds=5),
+                filter_keys={"project_id": [1]},
+            )
+            == (cache_key, bucket_start, bucket_end)
+        )
+
+        # Another bucket, or another query, does not
+        assert (
+            tagstore_cache.get_cache_key(
+                "tag_keys", start, end + timedelta(minutes=5), filter_keys={"project_id": [1]}
+            )[0]
+            != cache_key
+        )
+        assert (
+            tagstore_cache.get_cache_key("tag_keys", start, end, filter_keys={"project_id": [2]})[0]
+            != cache_key
+        )
+
+    def test_without_window(self):
+        cache_key, start, end = tagstore_cache.get_cache_key("top_values", None, None, limit=9)
+        assert start is None
+        assert end is None
+        assert cache_key.startswith("tagstore.snuba:top_values:")
+
+
+class ShouldCacheTest(TestCase):
+    def test_rate(self):
+        queries = [{"filter_keys": {"project_id": [project_id]}} for project_id in range(100)]
+        assert not any(tagstore_cache.should_cache(0.0, **query) for query in queries)
+        assert all(tagstore_cache.should_cache(1.0, **query) for query in queries)
+        assert 0 < sum(tagstore_cache.should_cache(0.5, **query) for query in queries) < 100
+
+    def test_consistent(self):
+        query = {"filter_keys": {"project_id": [1]}, "limit": 9}
+        assert len({tagstore_cache.should_cache(0.5, **query) for _ in range(10)}) == 1
+
+
+class GetOrComputeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.compute = mock.Mock(return_value={"foo": 1})
+
+    def test_hit(self):
+        assert tagstore_cache.get_or_compute("key", self.compute) == {"foo": 1}
+        assert tagstore_cache.get_or_compute("key", self.compute) == {"foo": 1}
+        assert self.compute.call_count == 1
+        # The lock is released once the value is stored
+        assert cache.get("key:lock") is None
+
+    @mock.patch("sentry.tagstore.snuba.cache.random.random", return_value=0.5)
+    def test_early_refresh(self, mock_random):
+        # The last query took so long that the entry is refreshed right away
+        cache.set("key", ({"foo": 0}, 3600, time.time() + 60), 60)
+        assert tagstore_cache.get_or_compute("key", self.compute) == {"foo": 1}
+        assert self.compute.call_count == 1
+
+    @mock.patch("sentry.tagstore.snuba.cache.random.random", return_value=0.5)
+    def test_stale_while_refreshing(self, mock_random):
+        cache.set("key", ({"foo": 0}, 3600, time.time() + 60), 60)
+        cache.add("key:lock", 1, 60)
+        assert tagstore_cache.get_or_compute("key", self.compute) == {"foo": 0}
+        assert self.compute.call_count == 0
+
+    @mock.patch("sentry.tagstore.snuba.cache.time.sleep")
+    def test_miss_while_computing(self, mock_sleep):
+        cache.add("key:lock", 1, 60)
+        mock_sleep.side_effect = lambda _: cache.set("key", ({"foo": 2}, 0.1, time.time() + 60))
+        assert tagstore_cache.get_or_compute("key", self.compute) == {"foo": 2}
+        assert self.compute.call_count == 0
+
+    @mock.patch("sentry.tagstore.snuba.cache.LOCK_WAIT", 0.01)
+    @mock.patch("sentry.tagstore.snuba.cache.LOCK_POLL_INTERVAL", 0.001)
+    def test_lock_timeout(self):
+        cache.add("key:lock", 1, 60)
+        assert tagstore_cache.get_or_compute("key", self.compute) == {"foo": 1}
+        assert self.compute.call_count == 1
@@ -3,6 +3,8 @@ from time import time
 import pytest
 import uuid
 
+import sentry.reprocessing2
+from celery.exceptions import SoftTimeLimitExceeded
 from sentry import eventstore
 from sentry.attachments import attachment_cache
 from sentry.models import Group, GroupAssignee, Activity, EventAttachment, File, UserReport
@@ -355,3 +357,106 @@ def test_nodestore_missing(
     assert new_event.group_id != event.group_id
 
     assert is_group_finished(event.group_id)
+
+
+@pytest.mark.django_db
+@pytest.mark.snuba
+def test_batched(
+    default_project,
+    reset_snuba,
+    register_event_preprocessor,
+    process_and_save,
+    burst_task_runner,
+    monkeypatch,
+):
+    monkeypatch.setattr("sentry.tasks.reprocessing2.GROUP_REPROCESSING_CHUNK_SIZE", 10)
+
+    @register_event_preprocessor
+    def event_preprocessor(data):
+        extra = data.setdefault("extra", {})
+        extra.setdefault("processing_counter", 0)
+        extra["processing_counter"] += 1
+        return data
+
+    event_ids = [process_and_save({"message": "hello world"}, seconds_ago=i + 1) for i in range(3)]
+    (group_id,) = {
+        eventstore.get_event_by_id(default_project.id, event_id).group_id for event_id in event_ids
+    }
+
+    batches = []
+    reprocess_events = sentry.reprocessing2.reprocess_events
+
+    def record_batch(project_id, event_ids, start_time, group_id=None):
+        batches.append(event_ids)
+        return reprocess_events(project_id, event_ids, start_time, group_id=group_id)
+
+    monkeypatch.setattr("sentry.reprocessing2.reprocess_events", record_batch)
+
+    with burst_task_runner() as burst:
+        reprocess_group(default_project.id, group_id)
+
+    burst(max_jobs=100)
+
+    # All events are reprocessed by a single task
+    assert len(batches) == 1
+    assert sorted(batches[0]) == sorted(event_ids)
+
+    for event_id in event_ids:
+        event = eventstore.get_event_by_id(default_project.id, event_id)
+        assert event.group_id != group_id
+        assert int(event.data["contexts"]["reprocessing"]["original_issue_id"]) == group_id
+
+    assert is_group_finished(group_id)
+
+
+@pytest.mark.django_db
+@pytest.mark.snuba
+@pytest.mark.parametrize("error", (ValueError, SoftTimeLimitExceeded), ids=("error", "timeout"))
+def test_batched_failure(
+    default_project,
+    reset_snuba,
+    register_event_preprocessor,
+    process_and_save,
+    burst_task_runner,
+    monkeypatch,
+    error,
+):
+    monkeypatch.setattr("sentry.tasks.reprocessing2.GROUP_REPROCESSING_CHUNK_SIZE", 10)
+
+    @register_event_preprocessor
+    def event_preprocessor(data):
+        return data
+
+    event_ids = [process_and_save({"message": "hello world"}, seconds_ago=i + 1) for i in range(3)]
+    (group_id,) = {
+        eventstore.get_event_by_id(default_project.id, event_id).group_id for event_id in event_ids
+    }
+
+    failed_event_ids = []
+    reprocess_event = sentry.reprocessing2._reprocess_event
+
+    def fail_first_event(event, *args):
+        if not failed_event_ids:
+            failed_event_ids.append(event.event_id)
+            raise error()
+        return reprocess_event(event, *args)
+
+    monkeypatch.setattr("sentry.reprocessing2._reprocess_event", fail_first_event)
+
+    with burst_task_runner() as burst:
+        reprocess_group(default_project.id, group_id)
+
+        try:
+            burst(max_jobs=100)
+        except SoftTimeLimitExceeded:
+            # The events after the one running out of time are left to a new
+            # task
+            burst(max_jobs=100)
+
+    (failed_event_id,) = failed_event_ids
+    for event_id in event_ids:
+        event = eventstore.get_event_by_id(default_project.id, event_id)
+        assert (event.group_id == group_id) == (event_id == failed_event_id)
+
+    # The failed event does not keep the group from finishing
+    assert is_group_finished(group_id)
@@ -1,10 +1,13 @@
+import os
 import pytest
 import pytz
+import timeit
 
 from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 from sentry.testutils import TestCase
+from sentry.utils.compat import mock
 from sentry.tsdb.base import TSDBModel, ONE_MINUTE, ONE_HOUR, ONE_DAY
 from sentry.tsdb.redis import RedisTSDB, CountMinScript, SuppressionWrapper
 from sentry.utils.dates import to_datetime, to_timestamp
@@ -61,6 +64,75 @@ class RedisTSDBTest(TestCase):
         result = self.db.make_counter_key(TSDBModel.project, 1, to_datetime(1368889980), "foo", 1)
         assert result == ("ts:1:1368889980:46", self.db.get_model_key("foo") + "?e=1")
 
+    def test_counter_key_layout(self):
+        timestamp = to_datetime(1368889985)
+        epoch = int(to_timestamp(timestamp))
+
+        for rollup, max_values in self.db.rollups.items():
+            layout = self.db.get_counter_key_layout(rollup, max_values, epoch)
+            assert layout is self.db.get_counter_key_layout(rollup, max_values, epoch)
+            assert layout.expiry == self.db.calculate_expiry(rollup, max_values, timestamp)
+
+            for key in (1, "foo"):
+                model_key, vnode = self.db.get_model_key_and_vnode(key)
+                assert (
+                    layout.get_hash_key(TSDBModel.project, vnode),
+                    self.db.add_environment_parameter(model_key, 1),
+                ) == self.db.make_counter_key(TSDBModel.project, rollup, timestamp, key, 1)
+
+    def test_incr_multi_key_computations(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        items = [
+            (model, key, {"timestamp": now - timedelta(seconds=key % 10)})
+            for key in range(100)
+            for model in (TSDBModel.project, TSDBModel.group, TSDBModel.release)
+        ]
+
+        with mock.patch.object(
+            self.db, "get_model_key_and_vnode", wraps=self.db.get_model_key_and_vnode
+        ) as get_model_key_and_vnode, mock.patch.object(
+            self.db, "make_counter_key", wraps=self.db.make_counter_key
+        ) as make_counter_key:
+            self.db.incr_multi(items, environment_id=1)
+
+        # Model keys are computed once per key, and hash keys once per model,
+        # vnode and rollup bucket, rather than both once per model, rollup and
+        # environment of every item.
+        assert get_model_key_and_vnode.call_count == 100
+        assert make_counter_key.call_count == 0
+
+    @pytest.mark.skipif(
+        not os.environ.get("SENTRY_BENCHMARK"), reason="benchmark, set SENTRY_BENCHMARK to run"
+    )
+    def test_benchmark_incr_multi(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        items = [
+            (model, key, {"timestamp": now - timedelta(seconds=key % 10)})
+            for key in range(100)
+            for model in (TSDBModel.project, TSDBModel.group, TSDBModel.release)
+        ]
+        increments = len(items) * len(self.db.rollups) * 2
+
+        def compute_keys():
+            # the key computation incr_multi performed before key layouts
+            for rollup, max_values in self.db.rollups.items():
+                for model, key, options in items:
+                    self.db.calculate_expiry(rollup, max_values, options["timestamp"])
+                    for environment_id in (None, 1):
+                        self.db.make_counter_key(
+                            model, rollup, options["timestamp"], key, environment_id
+                        )
+
+        # Only measure the Python side, the commands are sent nowhere.
+        with mock.patch.object(self.db.cluster, "map"):
+            baseline = timeit.timeit(compute_keys, number=10)
+            elapsed = timeit.timeit(lambda: self.db.incr_multi(items, environment_id=1), number=10)
+
+        print(  # NOQA
+            "incr_multi: %.2fus per increment, key computation alone used to take %.2fus"
+            % (elapsed / (increments * 10) * 1e6, baseline / (increments * 10) * 1e6)
+        )
+
     def test_get_model_key(self):
         result = self.db.get_model_key(1)
         assert result == 1
@@ -587,6 +659,63 @@ class RedisTSDBTest(TestCase):
             model, ("organization:1", "organization:2"), now, environment_id=1
         ) == {"organization:1": [], "organization:2": []}
 
+    def test_write_batch(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(2)]
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        frequency_model = TSDBModel.frequent_environments_by_group
+
+        self.db.write_batch(
+            incrs=[
+                (TSDBModel.project, 1, 1, dts[0], 1),
+                (TSDBModel.project, 1, 2, dts[0], 1),
+                (TSDBModel.project, 1, 1, dts[1], 2),
+                (TSDBModel.group, 2, 1, dts[1], None),
+            ],
+            records=[
+                (TSDBModel.users_affected_by_group, 2, ("foo", "bar"), dts[0], 1),
+                (TSDBModel.users_affected_by_group, 2, ("bar", "baz"), dts[0], None),
+                (TSDBModel.users_affected_by_group, 2, ("foo",), dts[1], 2),
+            ],
+            frequencies=[
+                (frequency_model, {2: {"1": 1, "2": 2}}, dts[0], None),
+                (frequency_model, {2: {"1": 2}}, dts[0], None),
+            ],
+        )
+
+        assert self.db.get_range(TSDBModel.project, [1], dts[0], dts[-1]) == {
+            1: [(timestamp(dts[0]), 3), (timestamp(dts[1]), 1)]
+        }
+        assert self.db.get_range(TSDBModel.project, [1], dts[0], dts[-1], environment_ids=[1]) == {
+            1: [(timestamp(dts[0]), 3), (timestamp(dts[1]), 0)]
+        }
+        assert self.db.get_range(TSDBModel.group, [2], dts[0], dts[-1]) == {
+            2: [(timestamp(dts[0]), 0), (timestamp(dts[1]), 1)]
+        }
+
+        assert self.db.get_distinct_counts_series(
+            TSDBModel.users_affected_by_group, [2], dts[0], dts[-1], rollup=3600
+        ) == {2: [(timestamp(dts[0]), 3), (timestamp(dts[1]), 1)]}
+        assert (
+            self.db.get_distinct_counts_series(
+                TSDBModel.users_affected_by_group,
+                [2],
+                dts[0],
+                dts[-1],
+                rollup=3600,
+                environment_id=1,
+            )
+            == {2: [(timestamp(dts[0]), 2), (timestamp(dts[1]), 0)]}
+        )
+
+        assert self.db.get_most_frequent(frequency_model, [2], dts[0], rollup=3600) == {
+            2: [("1", 3.0), ("2", 2.0)]
+        }
+
     def test_frequency_table_import_export_no_estimators(self):
         client = self.db.cluster.get_local_client_for_key("key")
 
@@ -1,6 +1,6 @@
 import pytest
 
-from sentry.utils.datastructures import BidirectionalMapping
+from sentry.utils.datastructures import BidirectionalMapping, LRUCache
 
 
 def test_bidirectional_mapping():
@@ -30,3 +30,44 @@ def test_bidirectional_mapping():
     del value["c"]
 
     assert len(value) == len(value.inverse()) == 2
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    # "b" is the least recently used entry now
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("b", "missing") == "missing"
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+    cache.delete("a")
+    assert "a" not in cache
+    assert len(cache) == 1
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_lru_cache_size():
+    cache = LRUCache(10, get_size=len)
+    cache.set("a", b"12345")
+    cache.set("b", b"1234")
+    assert cache.size == 9
+
+    cache.set("c", b"12")
+    assert "a" not in cache
+    assert cache.size == 6
+
+    cache.set("b", b"1")
+    assert cache.size == 3
+
+    cache.set("d", b"12345678901")
+    assert "d" not in cache
+    assert cache.size == 3
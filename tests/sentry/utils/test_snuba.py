@@ -10,12 +10,15 @@ from sentry.models import GroupRelease, Release, Project
 from sentry.testutils import TestCase
 from sentry.utils.compat import mock
 from sentry.utils.snuba import (
+    _get_query_cache_ttl,
     _prepare_query_params,
+    bulk_raw_query,
     get_query_params_to_update_for_projects,
     get_snuba_translators,
     get_json_type,
     get_snuba_column_name,
     Dataset,
+    SnubaError,
     SnubaQueryParams,
     UnqualifiedQueryError,
     quantize_time,
@@ -319,3 +322,55 @@ class QuantizeTimeTest(unittest.TestCase):
                 break
 
         assert i != j
+
+
+class BulkRawQueryCacheTest(TestCase):
+    def setUp(self):
+        # Identical queries must have the same time range to share a cache key
+        self.end = timezone.now()
+        self.start = self.end - timedelta(days=1)
+
+    def get_params(self):
+        return SnubaQueryParams(
+            start=self.start,
+            end=self.end,
+            filter_keys={"project_id": [self.project.id]},
+            aggregations=[["count()", "", "count"]],
+        )
+
+    @mock.patch("sentry.utils.snuba._bulk_snuba_query")
+    def test_caches_and_coalesces(self, _bulk_snuba_query):
+        _bulk_snuba_query.side_effect = lambda params, headers: [{"data": [{"count": 1}]}] * len(
+            params
+        )
+
+        results = bulk_raw_query([self.get_params(), self.get_params()], use_cache=True)
+        assert results == [{"data": [{"count": 1}]}] * 2
+        # identical queries in flight at the same time share a single request
+        assert _bulk_snuba_query.call_count == 1
+        assert len(_bulk_snuba_query.call_args[0][0]) == 1
+        assert results[0] is not results[1]
+
+        assert bulk_raw_query([self.get_params()], use_cache=True) == [{"data": [{"count": 1}]}]
+        assert _bulk_snuba_query.call_count == 1
+
+    @mock.patch("sentry.utils.snuba._bulk_snuba_query")
+    def test_coalesced_failure(self, _bulk_snuba_query):
+        _bulk_snuba_query.side_effect = SnubaError("boom")
+
+        with pytest.raises(SnubaError):
+            bulk_raw_query([self.get_params(), self.get_params()], use_cache=True)
+
+        # the failed query is neither cached nor left in flight
+        _bulk_snuba_query.side_effect = lambda params, headers: [{"data": []}] * len(params)
+        assert bulk_raw_query([self.get_params()], use_cache=True) == [{"data": []}]
+
+    def test_cache_ttl(self):
+        now = datetime.utcnow()
+        with self.settings(
+            SENTRY_SNUBA_CACHE_TTL_SECONDS=60, SENTRY_SNUBA_CACHE_MAX_TTL_SECONDS=3600
+        ):
+            assert _get_query_cache_ttl({"to_date": now.isoformat()}) == 60
+            assert _get_query_cache_ttl({"to_date": (now - timedelta(hours=2)).isoformat()}) == 720
+            assert _get_query_cache_ttl({"to_date": (now - timedelta(days=2)).isoformat()}) == 3600
+            assert _get_query_cache_ttl({}) == 60
@@ -23,6 +23,7 @@ from sentry.models import (
 )
 from sentry.testutils import APITestCase, SnubaTestCase
 from sentry.testutils.helpers.datetime import iso_format, before_now
+from sentry.utils import snuba
 from sentry.utils.compat import mock
 from sentry.utils.compat.mock import patch
 
@@ -356,27 +357,56 @@ class StreamGroupSerializerTestCase(APITestCase, SnubaTestCase):
         environment = Environment.get_or_create(group.project, "production")
 
         with mock.patch(
-            "sentry.api.serializers.models.group.snuba_tsdb.get_range",
-            side_effect=snuba_tsdb.get_range,
-        ) as get_range:
+            "sentry.api.serializers.models.group.snuba_tsdb.prepare_range_query",
+            side_effect=snuba_tsdb.prepare_range_query,
+        ) as prepare_range_query:
             serialize(
                 [group],
                 serializer=StreamGroupSerializerSnuba(
                     environment_ids=[environment.id], stats_period="14d"
                 ),
             )
-            assert get_range.call_count == 1
-            for args, kwargs in get_range.call_args_list:
+            assert prepare_range_query.call_count == 1
+            for args, kwargs in prepare_range_query.call_args_list:
                 assert kwargs["environment_ids"] == [environment.id]
 
         with mock.patch(
-            "sentry.api.serializers.models.group.snuba_tsdb.get_range",
-            side_effect=snuba_tsdb.get_range,
-        ) as get_range:
+            "sentry.api.serializers.models.group.snuba_tsdb.prepare_range_query",
+            side_effect=snuba_tsdb.prepare_range_query,
+        ) as prepare_range_query:
             serialize(
                 [group],
                 serializer=StreamGroupSerializerSnuba(environment_ids=None, stats_period="14d"),
             )
-            assert get_range.call_count == 1
-            for args, kwargs in get_range.call_args_list:
+            assert prepare_range_query.call_count == 1
+            for args, kwargs in prepare_range_query.call_args_list:
                 assert kwargs["environment_ids"] is None
+
+    def test_snuba_query_referrers(self):
+        group = self.group
+        bulk_raw_query = snuba.bulk_raw_query
+
+        with mock.patch(
+            "sentry.utils.snuba.bulk_raw_query", side_effect=bulk_raw_query
+        ) as mock_bulk_raw_query:
+            result = serialize(
+                [group],
+                serializer=StreamGroupSerializerSnuba(stats_period="24h"),
+            )
+
+        batches = [
+            [params.referrer for params in args[0]]
+            for args, kwargs in mock_bulk_raw_query.call_args_list
+        ]
+        # Seen stats and stats are sent concurrently in one batch, then the
+        # unhandled flag which depends on the seen stats. Every source is sent
+        # with its own referrer.
+        assert batches == [
+            [
+                "serializers.GroupSerializerSnuba._execute_seen_stats_query",
+                f"tsdb-modelid:{snuba_tsdb.models.group.value}",
+            ],
+            ["group.unhandled-flag"],
+        ]
+        assert result[0]["stats"]["24h"]
+        assert result[0]["lifetime"]["count"] == result[0]["count"]
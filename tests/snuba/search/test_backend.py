@@ -7,7 +7,7 @@ from django.utils import timezone
 from hashlib import md5
 
 from sentry import options
-from sentry.api.event_search import InvalidSearchQuery
+from sentry.api.event_search import InvalidSearchQuery, SearchFilter, SearchKey, SearchValue
 from sentry.api.issue_search import convert_query_values, IssueSearchVisitor, parse_search_query
 from sentry.models import (
     Environment,
@@ -18,9 +18,11 @@ from sentry.models import (
     GroupStatus,
     GroupSubscription,
     Integration,
+    User,
 )
 from sentry.models.groupinbox import add_group_to_inbox, GroupInboxReason
 from sentry.search.snuba.backend import EventsDatasetSnubaSearchBackend
+from sentry.search.snuba.executors import PostgresSnubaQueryExecutor, _get_queryset_key_value
 from sentry.testutils import SnubaTestCase, TestCase, xfail_if_not_postgres
 from sentry.testutils.helpers.datetime import before_now, iso_format
 from sentry.utils.compat import mock
@@ -552,6 +554,70 @@ class EventsSnubaSearchTest(TestCase, SnubaTestCase):
                 assert results.prev.has_results
                 assert not results.next.has_results
 
+    def test_pagination_resumes_search(self):
+        for options_set in [
+            {"snuba.search.max-pre-snuba-candidates": 5000, "snuba.search.cursor-cache-ttl": 60},
+            # post-filtering
+            {"snuba.search.max-pre-snuba-candidates": 1, "snuba.search.cursor-cache-ttl": 60},
+        ]:
+            with self.options(options_set):
+                results = self.backend.query([self.project], limit=1, sort_by="freq")
+                assert set(results) == {self.group1}
+                assert results.next.has_results
+
+                # The candidates and hits of the first page are reused
+                with mock.patch.object(PostgresSnubaQueryExecutor, "_start_search") as start_search:
+                    results = self.backend.query(
+                        [self.project], cursor=results.next, limit=1, sort_by="freq"
+                    )
+                    assert not start_search.called
+                assert set(results) == {self.group2}
+                assert results.prev.has_results
+                assert not results.next.has_results
+
+        # Disabled by default
+        results = self.backend.query([self.project], limit=1, sort_by="freq")
+        with mock.patch.object(
+            PostgresSnubaQueryExecutor,
+            "_start_search",
+            side_effect=PostgresSnubaQueryExecutor._start_search,
+            autospec=True,
+        ) as start_search:
+            results = self.backend.query(
+                [self.project], cursor=results.next, limit=1, sort_by="freq"
+            )
+            assert start_search.called
+        assert set(results) == {self.group2}
+
+    def test_search_key_is_stable(self):
+        executor = PostgresSnubaQueryExecutor()
+
+        def get_search_key(user):
+            search_filters = [
+                SearchFilter(SearchKey("assigned_to"), "=", SearchValue([user])),
+                SearchFilter(SearchKey("status"), "=", SearchValue(GroupStatus.UNRESOLVED)),
+            ]
+            return executor._get_search_key([self.project.id], None, "date", search_filters)
+
+        # Instances of the same user from different requests
+        key = get_search_key(User.objects.get(id=self.user.id))
+        assert key == get_search_key(User.objects.get(id=self.user.id))
+        assert key != get_search_key(self.create_user())
+
+    def test_search_key_includes_group_queryset(self):
+        def get_queryset_key_value(**filters):
+            return _get_queryset_key_value(Group.objects.filter(project=self.project, **filters))
+
+        now = timezone.now().replace(second=0, microsecond=0)
+        # The retention window moves with every request
+        assert get_queryset_key_value(last_seen__gte=now) == get_queryset_key_value(
+            last_seen__gte=now + timedelta(seconds=1)
+        )
+        assert get_queryset_key_value(status=GroupStatus.UNRESOLVED) != get_queryset_key_value(
+            status=GroupStatus.RESOLVED
+        )
+        assert get_queryset_key_value(id__in=[]) is None
+
     def test_pagination_with_environment(self):
         for dt in [
             self.group1.first_seen + timedelta(days=1),
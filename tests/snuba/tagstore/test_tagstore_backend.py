@@ -12,7 +12,10 @@ from sentry.tagstore.exceptions import (
 )
 from sentry.tagstore.snuba.backend import SnubaTagStorage
 from sentry.testutils import SnubaTestCase, TestCase
+from sentry.testutils.helpers import override_options
 from sentry.testutils.helpers.datetime import iso_format
+from sentry.utils import snuba
+from sentry.utils.compat import mock
 
 
 class TagStorageTest(TestCase, SnubaTestCase):
@@ -162,6 +165,34 @@ class TagStorageTest(TestCase, SnubaTestCase):
         assert {v.value for v in top_release_values} == {"100", "200"}
         assert all(v.times_seen == 1 for v in top_release_values)
 
+    def test_get_group_tag_keys_and_top_values_cached(self):
+        with override_options({"snuba.tagstore.cache-tagkeys-rate": 1.0}), mock.patch(
+            "sentry.utils.snuba.query", wraps=snuba.query
+        ) as mock_query:
+            result = self.ts.get_group_tag_keys_and_top_values(
+                self.proj1.id, self.proj1group1.id, [self.proj1env1.id], use_cache=True
+            )
+            assert mock_query.call_count == 2
+
+            cached_result = self.ts.get_group_tag_keys_and_top_values(
+                self.proj1.id, self.proj1group1.id, [self.proj1env1.id], use_cache=True
+            )
+            assert mock_query.call_count == 2
+
+        result = sorted(result, key=lambda r: r.key)
+        cached_result = sorted(cached_result, key=lambda r: r.key)
+        assert cached_result == result
+        assert [r.top_values for r in cached_result] == [r.top_values for r in result]
+
+    def test_get_group_tag_keys_and_top_values_not_cached(self):
+        with mock.patch("sentry.utils.snuba.query", wraps=snuba.query) as mock_query:
+            for _ in range(2):
+                self.ts.get_group_tag_keys_and_top_values(
+                    self.proj1.id, self.proj1group1.id, [self.proj1env1.id], use_cache=True
+                )
+        # Caching is disabled by default
+        assert mock_query.call_count == 4
+
     def test_get_top_group_tag_values(self):
         resp = self.ts.get_top_group_tag_values(
             self.proj1.id, self.proj1group1.id, self.proj1env1.id, "foo", 1
@@ -8,6 +8,7 @@ from sentry.tsdb.base import TSDBModel
 from sentry.tsdb.snuba import SnubaTSDB
 from sentry.testutils import TestCase, SnubaTestCase
 from sentry.testutils.helpers.datetime import iso_format
+from sentry.utils import snuba
 from sentry.utils.dates import to_timestamp
 
 
@@ -166,6 +167,54 @@ class SnubaTSDBTest(TestCase, SnubaTestCase):
 
         assert self.db.get_range(TSDBModel.group, [], dts[0], dts[-1], rollup=3600) == {}
 
+    def test_read_batch(self):
+        start = self.now
+        end = self.now + timedelta(hours=4)
+        sums = [
+            (TSDBModel.group, [self.proj1group1.id, self.proj1group2.id], start, end, None),
+            (TSDBModel.group, [self.proj1group1.id], start, end, self.env1.id),
+            (TSDBModel.group, [], start, end, None),
+        ]
+        distinct_counts_totals = [
+            (TSDBModel.users_affected_by_group, [self.proj1group1.id], start, end, None),
+        ]
+
+        assert self.db.read_batch(sums=sums, distinct_counts_totals=distinct_counts_totals) == (
+            [
+                self.db.get_sums(model, keys, start, end, environment_id=environment_id)
+                for model, keys, start, end, environment_id in sums
+            ],
+            [
+                self.db.get_distinct_counts_totals(
+                    model, keys, start, end, environment_id=environment_id
+                )
+                for model, keys, start, end, environment_id in distinct_counts_totals
+            ],
+        )
+        assert self.db.read_batch(sums=sums[:1])[0] == [
+            {self.proj1group1.id: 12, self.proj1group2.id: 12}
+        ]
+
+    def test_read_batch_referrers(self):
+        start = self.now
+        end = self.now + timedelta(hours=4)
+
+        with patch(
+            "sentry.utils.snuba._bulk_snuba_query", side_effect=snuba._bulk_snuba_query
+        ) as bulk_snuba_query:
+            self.db.read_batch(
+                sums=[(TSDBModel.group, [self.proj1group1.id], start, end, None)],
+                distinct_counts_totals=[
+                    (TSDBModel.users_affected_by_group, [self.proj1group1.id], start, end, None)
+                ],
+            )
+
+        assert bulk_snuba_query.call_count == 1
+        assert [headers["referer"] for headers in bulk_snuba_query.call_args[0][1]] == [
+            f"tsdb-modelid:{TSDBModel.group.value}",
+            f"tsdb-modelid:{TSDBModel.users_affected_by_group.value}",
+        ]
+
     def test_range_releases(self):
         dts = [self.now + timedelta(hours=i) for i in range(4)]
         assert self.db.get_range(